@@ -0,0 +1,29 @@
+"""
+Benchmarks of the engine, run as a module from the repository root:
+
+    python -m benchmarks [--only games,views] [--quick] [--output results.json]
+    python -m benchmarks --baseline results.json [--threshold 0.1]
+
+Every run plays the same seeded games and keeps the best of --repeat timed runs after
+--warmup discarded ones. Results are written as JSON: {"meta": ..., "results": {metric: value}}.
+With --baseline, metrics that are worse than in the baseline by more than the threshold
+are reported as regressions, and the exit status is 1.
+"""
+from typing import Dict, List
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_second")
+
+
+def compare(baseline: Dict[str, float], results: Dict[str, float], threshold: float) -> List[str]:
+    """ Descriptions of the metrics of results that regressed from baseline by more than threshold (a fraction). """
+    regressions = []
+    for metric, value in sorted(results.items()):
+        base = baseline.get(metric)
+        if not base:
+            continue
+        change = (value - base) / base
+        if (-change if higher_is_better(metric) else change) > threshold:
+            regressions.append("{}: {:.4g} -> {:.4g} ({:+.1%})".format(metric, base, value, change))
+    return regressions
@@ -0,0 +1,69 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks import compare
+from benchmarks.cases import BENCHMARKS, Config
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of the engine.")
+    parser.add_argument("--only", default=None, help="comma separated benchmarks, of: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--games", type=int, default=200, help="games played or replayed per benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs, of which the best is kept")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before timing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="a tenth of the games")
+    parser.add_argument("--output", default=None, help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(unknown))
+    config = Config(args.games, args.repeat, args.warmup, args.seed, args.quick)
+
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results.update(BENCHMARKS[name](config))
+        print("{} done in {:.1f}s".format(name, time.perf_counter() - start), file=sys.stderr)
+    report = {
+        "meta": {"benchmarks": names, "config": config.to_dict(), "python": platform.python_version(),
+                 "platform": platform.platform(), "commit": _commit(), "time": time.time()},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        if regressions:
+            return 1
+        print("no regressions beyond {:.0%}".format(args.threshold), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+The benchmarks. Each takes a Config and returns {metric: value}; metric names end with their
+unit, and only *_per_second metrics are better when higher (see benchmarks.higher_is_better).
+"""
+import gc
+import pickle
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from mutiny.game_object import GameObject
+from mutiny.machine import Machine
+from mutiny.policy import random_policy
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class Config:
+    """ Sizes and timing of a run. quick divides the number of games by 10. """
+    __slots__ = ("games", "repeat", "warmup", "seed", "quick")
+
+    def __init__(self, games: int = 200, repeat: int = 5, warmup: int = 1, seed: int = 0, quick: bool = False):
+        self.games = max(1, games // 10) if quick else games
+        self.repeat = repeat
+        self.warmup = warmup
+        self.seed = seed
+        self.quick = quick
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def best_time(run: Callable[[], object], config: Config) -> float:
+    """ Seconds taken by run(), the best of config.repeat runs after config.warmup discarded ones. """
+    for _ in range(config.warmup):
+        run()
+    best = float("inf")
+    for _ in range(config.repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def play_logs(config: Config) -> List[Tuple[int, List[Tuple[int, int]]]]:
+    """ (seed, [(player_id, action_idx), ...]) of config.games games of random legal commands. """
+    logs = []
+    for seed in range(config.seed, config.seed + config.games):
+        game = GameObject(PLAYERS, seed=seed)
+        rng = random.Random(seed)
+        steps = []
+        while not game.game_is_over():
+            player_id = rng.choice(game.pending_decisions())
+            action_idx = random_policy(game, player_id, rng)
+            game.step_index(player_id, action_idx)
+            steps.append((player_id, action_idx))
+        logs.append((seed, steps))
+    return logs
+
+
+def sample_games(config: Config, n: int = 200) -> List[GameObject]:
+    """ n games stopped after a random number of commands, so that every state is represented. """
+    rng = random.Random(config.seed)
+    games = []
+    for seed, steps in play_logs(config)[:n]:
+        game = GameObject(PLAYERS, seed=seed)
+        for player_id, action_idx in steps[:rng.randrange(len(steps))]:
+            game.step_index(player_id, action_idx)
+        games.append(game)
+    return games
+
+
+def games(config: Config) -> Dict[str, float]:
+    """ End to end: games played by random_policy, with step_index and step_trusted. """
+    def play(trusted: bool) -> int:
+        commands = 0
+        for seed in range(config.seed, config.seed + config.games):
+            game = GameObject(PLAYERS, seed=seed)
+            step = game.step_trusted if trusted else game.step_index
+            rng = random.Random(seed)
+            while not game.game_is_over():
+                player_id = rng.choice(game.pending_decisions())
+                step(player_id, random_policy(game, player_id, rng))
+                commands += 1
+        return commands
+
+    commands = play(False)
+    checked = best_time(lambda: play(False), config)
+    trusted = best_time(lambda: play(True), config)
+    return {
+        "games_per_second": config.games / checked,
+        "steps_per_second": commands / checked,
+        "trusted_games_per_second": config.games / trusted,
+    }
+
+
+def transitions(config: Config) -> Dict[str, float]:
+    """
+    Latency of step_index by the state it is issued on, replaying logged games (the cost of the
+    clock is subtracted), and of the whole replay with GameObject and with Machine.
+    """
+    logs = play_logs(config)
+    n_steps = sum(len(steps) for _, steps in logs)
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(10000):
+        clock()
+    overhead = (clock() - start) / 10000
+
+    def replay_by_state() -> Dict[str, List[float]]:
+        times: Dict[str, List[float]] = {}
+        for seed, steps in logs:
+            game = GameObject(PLAYERS, seed=seed)
+            for player_id, action_idx in steps:
+                name = game.get_state_name.value
+                start = clock()
+                game.step_index(player_id, action_idx)
+                elapsed = clock() - start
+                entry = times.get(name)
+                if entry is None:
+                    entry = times[name] = [0.0, 0]
+                entry[0] += elapsed
+                entry[1] += 1
+        return times
+
+    def replay(cls) -> None:
+        for seed, steps in logs:
+            game = cls(PLAYERS, seed=seed)
+            for player_id, action_idx in steps:
+                game.step_index(player_id, action_idx)
+
+    results = {}
+    for _ in range(config.warmup):
+        replay_by_state()
+    best: Dict[str, float] = {}
+    for _ in range(config.repeat):
+        for name, (total, count) in replay_by_state().items():
+            best[name] = min(best.get(name, float("inf")), total / count - overhead)
+    for name, seconds in sorted(best.items()):
+        results["transition_us." + name] = seconds * 1e6
+    results["replay_step_us"] = best_time(lambda: replay(GameObject), config) / n_steps * 1e6
+    results["machine_replay_step_us"] = best_time(lambda: replay(Machine), config) / n_steps * 1e6
+    return results
+
+
+def views(config: Config) -> Dict[str, float]:
+    """ to_dict, without its cache, from the full perspective and from a player's, and encode_observation. """
+    sampled = sample_games(config)
+
+    def to_dict(player_id) -> None:
+        for game in sampled:
+            game.game_data.clear_view_cache()
+            game.to_dict(player_id)
+
+    def encode() -> None:
+        for game in sampled:
+            game.encode_observation(0)
+
+    return {
+        "to_dict_us.full": best_time(lambda: to_dict(None), config) / len(sampled) * 1e6,
+        "to_dict_us.player": best_time(lambda: to_dict(0), config) / len(sampled) * 1e6,
+        "encode_observation_us": best_time(encode, config) / len(sampled) * 1e6,
+    }
+
+
+def lifecycle(config: Config) -> Dict[str, float]:
+    """ Building, resetting, cloning and serializing games. """
+    sampled = sample_games(config)
+    snapshots = [game.snapshot() for game in sampled]
+    n = len(sampled)
+
+    def new() -> None:
+        for i in range(n):
+            GameObject(PLAYERS, seed=i)
+
+    def reset() -> None:
+        for game in sampled:
+            game.reset()
+
+    def restore() -> None:
+        for game, snapshot in zip(sampled, snapshots):
+            game.restore(snapshot)
+
+    results = {
+        "new_game_us": best_time(new, config) / n * 1e6,
+        "clone_us": best_time(lambda: [game.clone() for game in sampled], config) / n * 1e6,
+        "snapshot_us": best_time(lambda: [game.snapshot() for game in sampled], config) / n * 1e6,
+        "serialize_us": best_time(lambda: [pickle.dumps(game.snapshot(), pickle.HIGHEST_PROTOCOL)
+                                           for game in sampled], config) / n * 1e6,
+        "restore_us": best_time(restore, config) / n * 1e6,
+    }
+    # last, as it leaves the games at the start of a new game
+    results["reset_us"] = best_time(reset, config) / n * 1e6
+    return results
+
+
+def memory(config: Config) -> Dict[str, float]:
+    """ Memory held by a live game partway through play, with its players, state and random generator. """
+    sample_games(config, 1)  # shared per-size data is not counted
+    gc.collect()
+    tracemalloc.start()
+    try:
+        sampled = sample_games(config, 1000)
+        gc.collect()
+        return {"bytes_per_game": tracemalloc.get_traced_memory()[0] / len(sampled)}
+    finally:
+        tracemalloc.stop()
+
+
+BENCHMARKS = {
+    "games": games,
+    "transitions": transitions,
+    "views": views,
+    "lifecycle": lifecycle,
+    "memory": memory,
+}
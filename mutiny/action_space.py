@@ -0,0 +1,170 @@
+from collections import namedtuple
+from itertools import combinations_with_replacement
+from typing import Dict, Tuple, List, Optional
+
+from mutiny.game_enum import ActionEnum, CommandEnum, RoleEnum
+
+UNTARGETED_ACTIONS = (ActionEnum.INCOME, ActionEnum.F_AID, ActionEnum.TAX, ActionEnum.EXCHANGE)
+TARGETED_ACTIONS = (ActionEnum.ASSASSINATE, ActionEnum.STEAL, ActionEnum.COUP)
+BLOCK_ROLES = (RoleEnum.DUKE, RoleEnum.CAPTAIN, RoleEnum.CONTESSA, RoleEnum.AMBASSADOR)
+
+_ROLE_ORDER = {role: i for i, role in enumerate(RoleEnum)}
+
+# StateInterface method called for each action
+_ACTION_METHODS = {
+    ActionEnum.INCOME: "income",
+    ActionEnum.F_AID: "f_aid",
+    ActionEnum.TAX: "tax",
+    ActionEnum.EXCHANGE: "exchange",
+    ActionEnum.ASSASSINATE: "assassinate",
+    ActionEnum.STEAL: "steal",
+    ActionEnum.COUP: "coup",
+}
+
+Command = namedtuple("Command", ["command", "action", "target", "role", "roles"], defaults=(None,) * 4)
+Command.__doc__ = """ Decoded index: fields that do not apply to the command are None. """
+
+# see ActionSpace.shared
+_SHARED: Dict[Tuple[type, int], "ActionSpace"] = {}
+
+
+def sort_roles(roles) -> Tuple[RoleEnum, ...]:
+    """ Canonical order for a set of kept roles: the order of RoleEnum. """
+    return tuple(sorted(roles, key=_ROLE_ORDER.__getitem__))
+
+
+class ActionSpace:
+    """
+    Fixed-length index over every command a player can issue in a game with n_players.
+
+    Layout: noop, untargeted actions, targeted actions (one slot per target, including
+    the player itself), blocks, challenge, allow, reveals, and exchanges (one slot per
+    multiset of one or two kept roles, see sort_roles).
+    """
+
+    def __init__(self, n_players: int):
+        self.n_players = n_players
+        index = 0
+
+        self.noop = index
+        index += 1
+
+        # untargeted actions map to their index, targeted actions to the index of target 0
+        self.actions: Dict[ActionEnum, int] = {}
+        for action in UNTARGETED_ACTIONS:
+            self.actions[action] = index
+            index += 1
+        for action in TARGETED_ACTIONS:
+            self.actions[action] = index
+            index += n_players
+
+        self.blocks: Dict[RoleEnum, int] = {}
+        for role in BLOCK_ROLES:
+            self.blocks[role] = index
+            index += 1
+
+        self.challenge = index
+        index += 1
+        self.allow = index
+        index += 1
+
+        self.reveals: Dict[RoleEnum, int] = {}
+        for role in RoleEnum:
+            self.reveals[role] = index
+            index += 1
+
+        self.replaces: Dict[Tuple[RoleEnum, ...], int] = {}
+        for count in (1, 2):
+            for roles in combinations_with_replacement(RoleEnum, count):
+                self.replaces[roles] = index
+                index += 1
+
+        self.size = index
+
+        # decode[i] is the Command at index i, dispatch[i] the StateInterface method and arguments issuing it
+        self.decode: List[Command] = [None] * self.size
+        self.dispatch: List[Tuple[str, tuple]] = [None] * self.size
+        self.decode[self.noop] = Command(CommandEnum.NOOP)
+        self.dispatch[self.noop] = ("noop", ())
+        for action, base in self.actions.items():
+            targets = range(n_players) if action in TARGETED_ACTIONS else (None,)
+            for i, target_id in enumerate(targets):
+                self.decode[base + i] = Command(CommandEnum.ACTION, action=action, target=target_id)
+                self.dispatch[base + i] = (_ACTION_METHODS[action], () if target_id is None else (target_id,))
+        for role, i in self.blocks.items():
+            self.decode[i] = Command(CommandEnum.BLOCK, role=role)
+            self.dispatch[i] = ("block", (role,))
+        self.decode[self.challenge] = Command(CommandEnum.CHALLENGE)
+        self.dispatch[self.challenge] = ("challenge", ())
+        self.decode[self.allow] = Command(CommandEnum.ALLOW)
+        self.dispatch[self.allow] = ("allow", ())
+        for role, i in self.reveals.items():
+            self.decode[i] = Command(CommandEnum.REVEAL, role=role)
+            self.dispatch[i] = ("reveal", (role,))
+        for roles, i in self.replaces.items():
+            self.decode[i] = Command(CommandEnum.EXCHANGE, roles=roles)
+            self.dispatch[i] = ("replace", (roles,))
+
+        # the same without validation, see GameObject.step_trusted
+        self.trusted_dispatch: List[Tuple[str, tuple]] = [("_apply_" + method, args) for method, args in self.dispatch]
+        self._encode: Dict[Command, int] = {command: i for i, command in enumerate(self.decode)}
+
+    @classmethod
+    def shared(cls, n_players: int) -> "ActionSpace":
+        """ The space of n_players, built once and shared by every game of that size. Must not be modified. """
+        space = _SHARED.get((cls, n_players))
+        if space is None:
+            space = _SHARED[cls, n_players] = cls(n_players)
+        return space
+
+    def __len__(self) -> int:
+        return self.size
+
+    def action_index(self, action: ActionEnum, target_id: int = None) -> int:
+        if action in TARGETED_ACTIONS:
+            return self.actions[action] + target_id
+        return self.actions[action]
+
+    def replace_index(self, roles) -> int:
+        return self.replaces[sort_roles(roles)]
+
+    def encode(self, command: CommandEnum,
+               action: Optional[ActionEnum] = None,
+               target: Optional[int] = None,
+               role: Optional[RoleEnum] = None,
+               roles: Optional[Tuple[RoleEnum, ...]] = None) -> int:
+        """ Index of a command. Raises KeyError for commands outside of the space. """
+        if roles is not None:
+            roles = sort_roles(roles)
+        if action not in TARGETED_ACTIONS:
+            target = None
+        return self._encode[Command(command, action, target, role, roles)]
+
+    def from_emission(self, emission: Dict) -> int:
+        """
+        Index of a treason style command, as taken by GameObject.command. Only the fields the
+        command uses are read, so every command the game applied can be encoded.
+        """
+        command = CommandEnum(emission["command"])
+        action = ActionEnum(emission["action"]) if command == CommandEnum.ACTION else None
+        role = None
+        if command == CommandEnum.BLOCK:
+            role = RoleEnum(emission["blockingRole"])
+        elif command == CommandEnum.REVEAL:
+            role = RoleEnum(emission["role"])
+        roles = tuple(RoleEnum(r) for r in emission["roles"]) if command == CommandEnum.EXCHANGE else None
+        return self.encode(command, action=action, target=emission.get("target"), role=role, roles=roles)
+
+    def to_emission(self, index: int, state_id: int) -> Dict:
+        """ Treason style command for an index, as taken by GameObject.command. """
+        command = self.decode[index]
+        emission = {"command": command.command.value, "stateId": state_id}
+        if command.action is not None:
+            emission["action"] = command.action.value
+        if command.target is not None:
+            emission["target"] = command.target
+        if command.role is not None:
+            emission["blockingRole" if command.command == CommandEnum.BLOCK else "role"] = command.role.value
+        if command.roles is not None:
+            emission["roles"] = [role.value for role in command.roles]
+        return emission
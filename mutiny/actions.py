@@ -1,22 +1,59 @@
 from abc import ABC, abstractmethod
-from typing import Union
+from typing import Optional, Union
 
 from mutiny.game_data import GameData
 from mutiny.game_enum import ActionEnum, RoleEnum
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
 from mutiny.constants import *
+from mutiny.events import CoinsMoved
 import mutiny.states
 from mutiny.state_interface import StateInterface
 
+# roles that may block each action that can be blocked
+BLOCKING_ROLES = {
+    ActionEnum.F_AID: {RoleEnum.DUKE},
+    ActionEnum.STEAL: {RoleEnum.AMBASSADOR, RoleEnum.CAPTAIN},
+    ActionEnum.ASSASSINATE: {RoleEnum.CONTESSA},
+}
+
 
 class QueuedAction(ABC):
     """ An base class for actions to resolve. """
+    __slots__ = ("_data",)
 
     def __init__(self, data: GameData):
         # TODO: Probably should be moved into the resolve method
         # Because the entire state of the application is based on sharing one GameData object :)
         self._data = data
 
+    def snapshot(self) -> tuple:
+        """ Immutable description of this action, see restore. """
+        return type(self), self.target
+
+    @staticmethod
+    def restore(data: GameData, snapshot: tuple) -> "QueuedAction":
+        """ Rebuilds an action from snapshot without validating it again. """
+        cls, target_id = snapshot
+        action = cls.__new__(cls)
+        action._data = data
+        if target_id is not None:
+            action._target_id = target_id
+        return action
+
+    @classmethod
+    def pooled(cls, data: GameData) -> "QueuedAction":
+        """
+        A new action of cls, or with pooling (see GameObject.enable_pooling) the one instance the
+        game keeps. Actions are never changed once built, so they can be shared.
+        """
+        pool = data.pool
+        if pool is None:
+            return cls(data)
+        action = pool.get(cls)
+        if action is None:
+            action = pool[cls] = cls(data)
+        return action
+
     @abstractmethod
     def resolve(self) -> StateInterface:
         """ Override this method. Does not check if still valid. """
@@ -63,20 +100,36 @@ class QueuedAction(ABC):
 
 
 class QueuedTargetAction(QueuedAction):
+    __slots__ = ("_target_id",)
 
-    def __init__(self, data: GameData, target_id: int):
+    def __init__(self, data: GameData, target_id: int, validate: bool = True):
+        """ Raises InvalidMove for an invalid target, unless validate is False (the caller checked error_on_init). """
         super().__init__(data)
-        if (error := self.error_on_init(data, target_id)):
-            raise InvalidMove(error)
+        if validate and (error := self.error_on_init(data, target_id)):
+            raise InvalidMove(error, data.player_turn, detail=target_id)
 
         self._target_id = target_id
 
     @classmethod
-    def error_on_init(cls, data, target_id):
+    def pooled(cls, data: GameData, target_id: int, validate: bool = True) -> "QueuedTargetAction":
+        """ As QueuedAction.pooled, with one instance per target. validate as for the constructor. """
+        pool = data.pool
+        if pool is None:
+            return cls(data, target_id, validate)
+        action = pool.get((cls, target_id))
+        if action is None:
+            action = pool[cls, target_id] = cls(data, target_id, validate)
+        elif validate and (error := cls.error_on_init(data, target_id)):
+            raise InvalidMove(error, data.player_turn, detail=target_id)
+        return action
+
+    @classmethod
+    def error_on_init(cls, data, target_id) -> Optional[ErrorEnum]:
         if not data.player_alive(target_id):
-            return "Target is invalid"
+            return ErrorEnum.INVALID_TARGET
         if data.player_turn == target_id:
-            return "Can not target yourself"
+            return ErrorEnum.SELF_TARGET
+        return None
 
     @property
     def can_be_blocked(self) -> bool:
@@ -93,9 +146,10 @@ class QueuedTargetAction(QueuedAction):
 
 class NoOp(QueuedAction):
     """ If an action fails, or after a reveal or coup state. """
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
-        return mutiny.states.player_turn.PlayerTurn(data=self._data.next_turn())
+        return mutiny.states.player_turn.next_turn(self._data)
 
     @property
     def still_valid(self) -> bool:
@@ -115,10 +169,13 @@ class NoOp(QueuedAction):
 
 
 class Income(QueuedAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
         self._data.players[self._data.player_turn].addCash(INCOME_GAIN)
-        return mutiny.states.player_turn.PlayerTurn(data=self._data.next_turn())
+        if self._data.events is not None:
+            self._data.events.emit(CoinsMoved(self._data.state_id, None, self._data.player_turn, INCOME_GAIN))
+        return mutiny.states.player_turn.next_turn(self._data)
 
     @property
     def action_name(self) -> ActionEnum:
@@ -134,10 +191,13 @@ class Income(QueuedAction):
 
 
 class ForeignAid(QueuedAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
         self._data.players[self._data.player_turn].addCash(F_AID_GAIN)
-        return mutiny.states.player_turn.PlayerTurn(data=self._data.next_turn())
+        if self._data.events is not None:
+            self._data.events.emit(CoinsMoved(self._data.state_id, None, self._data.player_turn, F_AID_GAIN))
+        return mutiny.states.player_turn.next_turn(self._data)
 
     @property
     def action_name(self) -> ActionEnum:
@@ -153,10 +213,13 @@ class ForeignAid(QueuedAction):
 
 
 class Tax(QueuedAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
         self._data.players[self._data.player_turn].addCash(TAX_GAIN)
-        return mutiny.states.player_turn.PlayerTurn(data=self._data.next_turn())
+        if self._data.events is not None:
+            self._data.events.emit(CoinsMoved(self._data.state_id, None, self._data.player_turn, TAX_GAIN))
+        return mutiny.states.player_turn.next_turn(self._data)
 
     @property
     def action_name(self) -> ActionEnum:
@@ -176,9 +239,10 @@ class Tax(QueuedAction):
 
 
 class Assassinate(QueuedTargetAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
-        return mutiny.states.reveal.resolve_reveal(data=self._data, player_id=self._target_id, action=NoOp(self._data))
+        return mutiny.states.reveal.resolve_reveal(data=self._data, player_id=self._target_id, action=NoOp.pooled(self._data))
 
     @property
     def action_name(self) -> ActionEnum:
@@ -194,9 +258,10 @@ class Assassinate(QueuedTargetAction):
 
 
 class Coup(QueuedTargetAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
-        return mutiny.states.reveal.resolve_reveal(data=self._data, player_id=self._target_id, action=NoOp(self._data))
+        return mutiny.states.reveal.resolve_reveal(data=self._data, player_id=self._target_id, action=NoOp.pooled(self._data))
 
     @property
     def action_name(self) -> ActionEnum:
@@ -213,13 +278,16 @@ class Coup(QueuedTargetAction):
 
 
 class Steal(QueuedTargetAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
         target = self._data.players[self._target_id]
         steal_amount = min(target.cash, STEAL_TRADE) # TODO: does treason permit stealing 0 cash?
         target.removeCash(steal_amount)
         self._data.active_player.addCash(steal_amount)
-        return mutiny.states.player_turn.PlayerTurn(data=self._data.next_turn())
+        if self._data.events is not None:
+            self._data.events.emit(CoinsMoved(self._data.state_id, self._target_id, self._data.player_turn, steal_amount))
+        return mutiny.states.player_turn.next_turn(self._data)
 
     @property
     def action_name(self) -> ActionEnum:
@@ -239,13 +307,13 @@ class Steal(QueuedTargetAction):
 
 
 class Exchange(QueuedAction):
+    __slots__ = ()
 
     def resolve(self) -> StateInterface:
         # Return exchange phase
         # pick two cards from the top of the deck for exchange options
-        deck = self._data.deck
-        op1 = deck.pop()
-        op2 = deck.pop()
+        op1 = self._data.draw_card()
+        op2 = self._data.draw_card()
         import mutiny.states.exchange
         exchange_options = tuple([inf.role for inf in self._data.active_player.hand if not inf.revealed]+[op1,op2])
         return mutiny.states.exchange.Exchange(data=self._data, exchange_options=exchange_options)
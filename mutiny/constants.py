@@ -6,3 +6,4 @@ ASSASSINATE_COST = 3
 COUP_COST = 7
 CASH_LIMIT = 10
 CASH_START = 2
+ROLE_COPIES = 3  # copies of each role in the deck, with up to 6 players
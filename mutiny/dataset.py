@@ -0,0 +1,136 @@
+"""
+Fixed-shape training data built from recorded games (see mutiny.record).
+
+export_dataset replays games once and writes one row per recorded command, from the
+perspective of the player who issued it:
+
+    observation: the observation of the player before the command (see mutiny.observation)
+    mask:        the commands the player could issue (see GameObject.legal_actions)
+    action:      the index of the command in mutiny.action_space.ActionSpace
+    player:      the player id
+    reward:      1 if the player went on to win the game, -1 if it lost, 0 if the log ends before the game
+
+Rows are split into shards of at most shard_size rows, one .npy file per field and
+shard, described by index.json. ShardedDataset memory-maps the shards and samples
+minibatches from them.
+"""
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from mutiny.record import Trajectory, check_step
+
+INDEX_FILE = "index.json"
+FIELDS = ("observation", "mask", "action", "player", "reward")
+_DTYPES = {"observation": np.int8, "mask": np.bool_, "action": np.int16, "player": np.int8, "reward": np.float32}
+
+
+def _shard_path(directory: str, shard: int, field: str) -> str:
+    return os.path.join(directory, "shard_{:05d}_{}.npy".format(shard, field))
+
+
+def game_rows(trajectory: Trajectory) -> Dict[str, np.ndarray]:
+    """ Replays trajectory and returns its rows, as one array per field. """
+    game = trajectory.replay(0)
+    n = len(trajectory.steps)
+    rows = {"observation": np.zeros((n, game.observation_layout.size), _DTYPES["observation"]),
+            "mask": np.zeros((n, game.action_space.size), _DTYPES["mask"]),
+            "action": np.fromiter((step.action_idx for step in trajectory.steps), _DTYPES["action"], n),
+            "player": np.fromiter((step.player_id for step in trajectory.steps), _DTYPES["player"], n)}
+    for i, step in enumerate(trajectory.steps):
+        check_step(game, step)
+        game.encode_observation(step.player_id, out=rows["observation"][i])
+        rows["mask"][i] = game.legal_actions(step.player_id)
+        game.step_index(step.player_id, step.action_idx)
+    winner = game.game_data.winner_id
+    if winner is None:
+        rows["reward"] = np.zeros(n, _DTYPES["reward"])
+    else:
+        rows["reward"] = np.where(rows["player"] == winner, 1, -1).astype(_DTYPES["reward"])
+    return rows
+
+
+def export_dataset(trajectories: Iterable[Trajectory], directory: str, shard_size: int = 1 << 16) -> Dict:
+    """
+    Writes the rows of trajectories, which must all have the same number of players, to directory.
+    Only one shard is held in memory at a time. Returns the index, also written to directory/index.json.
+    """
+    os.makedirs(directory, exist_ok=True)
+    index = {"n_players": None, "games": 0, "rows": 0, "shapes": None, "shards": []}
+    buffers = None
+    filled = 0
+
+    def flush():
+        nonlocal filled
+        for field in FIELDS:
+            np.save(_shard_path(directory, len(index["shards"]), field), buffers[field][:filled])
+        index["shards"].append(filled)
+        index["rows"] += filled
+        filled = 0
+
+    for trajectory in trajectories:
+        n_players = len(trajectory.player_names)
+        if index["n_players"] is None:
+            index["n_players"] = n_players
+        elif n_players != index["n_players"]:
+            raise ValueError("Games of {} and {} players can not share a dataset".format(index["n_players"], n_players))
+
+        rows = game_rows(trajectory)
+        if buffers is None:
+            index["shapes"] = {field: list(rows[field].shape[1:]) for field in FIELDS}
+            buffers = {field: np.zeros((shard_size,) + rows[field].shape[1:], _DTYPES[field]) for field in FIELDS}
+        start = 0
+        while start < len(rows["action"]):
+            count = min(shard_size - filled, len(rows["action"]) - start)
+            for field in FIELDS:
+                buffers[field][filled:filled + count] = rows[field][start:start + count]
+            filled += count
+            start += count
+            if filled == shard_size:
+                flush()
+        index["games"] += 1
+    if filled:
+        flush()
+
+    with open(os.path.join(directory, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    return index
+
+
+class ShardedDataset:
+    """
+    Rows written by export_dataset. Shards are memory-mapped, so only the rows that are
+    read are loaded from disk.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.shards = [{field: np.load(_shard_path(directory, shard, field), mmap_mode="r") for field in FIELDS}
+                       for shard in range(len(self.index["shards"]))]
+        # first row of each shard, and the total
+        self._offsets = np.concatenate(([0], np.cumsum(self.index["shards"])))
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def __getitem__(self, rows) -> Dict[str, np.ndarray]:
+        """ The given rows (an integer array of indices into the whole dataset), one array per field. """
+        rows = np.asarray(rows)
+        shard_of_row = np.searchsorted(self._offsets, rows, side="right") - 1
+        batch = {field: np.empty((len(rows),) + tuple(self.index["shapes"][field]), _DTYPES[field])
+                 for field in FIELDS}
+        for shard in np.unique(shard_of_row):
+            selected = np.nonzero(shard_of_row == shard)[0]
+            local = rows[selected] - self._offsets[shard]
+            for field in FIELDS:
+                batch[field][selected] = self.shards[shard][field][local]
+        return batch
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> Dict[str, np.ndarray]:
+        """ A minibatch of batch_size rows drawn uniformly (with replacement) across all shards. """
+        if rng is None:
+            rng = np.random.default_rng()
+        return self[rng.integers(len(self), size=batch_size)]
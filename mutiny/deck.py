@@ -0,0 +1,75 @@
+"""
+Decks of role cards.
+
+By default GameData keeps its deck as a list: proven roles and exchanged cards go back on
+top and the whole deck is shuffled before the next draw. A CountDeck only keeps how many
+copies of each role are left and draws one of the remaining cards uniformly with the
+game's random generator. Draws follow the same distribution, but returning cards needs
+no shuffle and the chance of drawing each role is read directly from the counts.
+"""
+from random import Random
+from typing import Dict, Iterable, Iterator, List
+
+from mutiny.game_enum import RoleEnum
+
+ROLES: List[RoleEnum] = list(RoleEnum)
+ROLE_INDEX: Dict[RoleEnum, int] = {role: i for i, role in enumerate(ROLES)}
+
+
+class CountDeck:
+    """
+    Copies left of each role. Has the list methods GameData uses (pop, append, count, len),
+    except that pop draws a random card rather than the top one.
+    """
+    __slots__ = ("counts", "size", "_rng")
+
+    def __init__(self, roles: Iterable[RoleEnum], rng: Random):
+        self.counts = [0] * len(ROLES)
+        self.size = 0
+        self._rng = rng
+        for role in roles:
+            self.append(role)
+
+    def pop(self) -> RoleEnum:
+        """ Draws one of the remaining cards, each with the same probability. """
+        if not self.size:
+            raise IndexError("Draw from an empty deck")
+        r = self._rng.randrange(self.size)
+        counts = self.counts
+        for i, count in enumerate(counts):
+            if r < count:
+                counts[i] -= 1
+                self.size -= 1
+                return ROLES[i]
+            r -= count
+
+    def append(self, role: RoleEnum) -> None:
+        self.counts[ROLE_INDEX[role]] += 1
+        self.size += 1
+
+    def remove(self, role: RoleEnum) -> None:
+        i = ROLE_INDEX[role]
+        if not self.counts[i]:
+            raise ValueError("{} is not in the deck".format(role))
+        self.counts[i] -= 1
+        self.size -= 1
+
+    def count(self, role: RoleEnum) -> int:
+        return self.counts[ROLE_INDEX[role]]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[RoleEnum]:
+        """ The cards in role order. """
+        for role, count in zip(ROLES, self.counts):
+            for _ in range(count):
+                yield role
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CountDeck):
+            return self.counts == other.counts
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return "CountDeck({})".format({role.value: count for role, count in zip(ROLES, self.counts) if count})
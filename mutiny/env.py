@@ -0,0 +1,224 @@
+"""
+Reinforcement learning environments over GameObject.
+
+Agents are player ids. At every step, only the agents who must act on the current state
+(see GameObject.pending_decisions) are asked for an action: they receive an observation
+(see mutiny.observation) and a mask over mutiny.action_space.ActionSpace. Actions are
+indices into that space.
+
+MutinyEnv follows Ray RLlib's MultiAgentEnv interface and needs NumPy (and Ray, to be
+registered with RLlib). MutinyAEC is a dependency-free agent-environment-cycle
+environment, in which agents act one at a time.
+
+The actions of a step are issued in seat order against the state they were chosen in,
+so like with GameObject.command, actions made stale by an earlier one are ignored.
+A step holding an illegal action raises InvalidMove without issuing any of its actions.
+A player receives a reward of 1 when it wins and -1 when it is eliminated.
+"""
+from typing import Dict, List, Optional
+
+from mutiny.game_object import GameObject, player_names
+from mutiny.rng import stream_seed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from ray.rllib.env.multi_agent_env import MultiAgentEnv
+except ImportError:
+    MultiAgentEnv = object
+
+try:
+    from gym import spaces
+except ImportError:
+    spaces = None
+
+class _Driver:
+    """ Plays a game for an environment, keeping track of who needs to act and who is done. """
+
+    def __init__(self, n_players: int, seed: Optional[int]):
+        self.n_players = n_players
+        self._seed = seed
+        self._episode = 0
+        self.game: Optional[GameObject] = None
+        self.masks: List[Optional[List[bool]]] = []
+        self.acting: List[int] = []
+        self.done: List[bool] = []
+
+    def reset(self) -> None:
+        # with a seed, episode i deals from stream i of the seed
+        seed = None if self._seed is None else stream_seed(self._seed, self._episode)
+        self._episode += 1
+        self.game = GameObject(player_names(self.n_players), seed=seed)
+        self.done = [False] * self.n_players
+        self._update()
+
+    def _update(self) -> None:
+        self.acting = self.game.pending_decisions()
+        self.masks = [None] * self.n_players
+        for player_id in self.acting:
+            self.masks[player_id] = self.game.legal_actions(player_id)
+
+    def mask(self, player_id: int) -> List[bool]:
+        if self.masks[player_id] is None:
+            self.masks[player_id] = self.game.legal_actions(player_id)
+        return self.masks[player_id]
+
+    def apply(self, actions: Dict[int, int]) -> List[int]:
+        """
+        Issues the actions of the acting players, returning the players who are now done.
+        Illegal actions raise InvalidMove before any action is issued, leaving the step undone.
+        """
+        state_id = self.game.get_state_id()
+        issued = [player_id for player_id in self.acting if player_id in actions]
+        for player_id in issued:
+            if not self.mask(player_id)[actions[player_id]]:
+                # refused by the game, as the mask agrees with it
+                self.game.step_index(player_id, actions[player_id], state_id)
+        for player_id in issued:
+            self.game.step_index(player_id, actions[player_id], state_id)
+        return self.refresh()
+
+    def refresh(self) -> List[int]:
+        """ Call after issuing commands to the game. Returns the players who are now done. """
+        over = self.game.game_is_over()
+        newly_done = [p for p in range(self.n_players)
+                      if not self.done[p] and (over or not self.game.game_data.player_alive(p))]
+        for player_id in newly_done:
+            self.done[player_id] = True
+        self._update()
+        return newly_done
+
+    def reward(self, player_id: int) -> float:
+        if not self.done[player_id]:
+            return 0.0
+        return 1.0 if self.game.game_data.winner_id == player_id else -1.0
+
+
+class MutinyEnv(MultiAgentEnv):
+    """
+    RLlib MultiAgentEnv. config may set n_players (default 6) and seed.
+    Observations are dicts of float32 arrays: {"observation": ..., "action_mask": ...}.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        if np is None:
+            raise ImportError("MutinyEnv requires NumPy")
+        super().__init__()
+        config = config or {}
+        self._driver = _Driver(config.get("n_players", 6), config.get("seed"))
+        self._driver.reset()
+        self.observation_size = self._driver.game.observation_layout.size
+        self.action_size = self._driver.game.action_space.size
+        if spaces is not None:
+            self.observation_space = spaces.Dict({
+                "observation": spaces.Box(0, float("inf"), (self.observation_size,), np.float32),
+                "action_mask": spaces.Box(0, 1, (self.action_size,), np.float32)})
+            self.action_space = spaces.Discrete(self.action_size)
+
+    @property
+    def game(self) -> GameObject:
+        return self._driver.game
+
+    def reset(self) -> Dict:
+        self._driver.reset()
+        return self._observations(self._driver.acting)
+
+    def step(self, action_dict: Dict[int, int]):
+        driver = self._driver
+        newly_done = driver.apply(action_dict)
+        agents = driver.acting + [p for p in newly_done if p not in driver.acting]
+        dones = {p: driver.done[p] for p in agents}
+        dones["__all__"] = driver.game.game_is_over()
+        return (self._observations(agents),
+                {p: driver.reward(p) for p in agents},
+                dones,
+                {})
+
+    def _observations(self, agents: List[int]) -> Dict:
+        # one array per field for the whole step, handed out row by row
+        observations = np.zeros((len(agents), self.observation_size), np.float32)
+        masks = np.array([self._driver.mask(p) for p in agents], np.float32).reshape(len(agents), self.action_size)
+        for i, player_id in enumerate(agents):
+            self._driver.game.encode_observation(player_id, out=observations[i])
+        return {player_id: {"observation": observations[i], "action_mask": masks[i]}
+                for i, player_id in enumerate(agents)}
+
+
+class MutinyAEC:
+    """
+    Agent-environment cycle: agent_selection is the next agent to act, observe and
+    action_mask describe what it sees, and step issues its action. step_all instead
+    issues the actions of every agent currently waiting, in one call.
+    Observations and masks are lists, or written into out (e.g. a NumPy array).
+    """
+
+    def __init__(self, n_players: int = 6, seed: Optional[int] = None):
+        self._driver = _Driver(n_players, seed)
+        self.reset()
+
+    @property
+    def game(self) -> GameObject:
+        return self._driver.game
+
+    @property
+    def agents(self) -> List[int]:
+        """ Agents who are not done. """
+        return [p for p in range(self._driver.n_players) if not self._driver.done[p]]
+
+    @property
+    def waiting(self) -> List[int]:
+        """ Agents who still have to act on the current state, agent_selection first. """
+        return self._queue
+
+    @property
+    def agent_selection(self) -> Optional[int]:
+        return self._queue[0] if self._queue else None
+
+    @property
+    def done(self) -> bool:
+        return self._driver.game.game_is_over()
+
+    def reset(self) -> None:
+        self._driver.reset()
+        self._wait()
+
+    def observe(self, agent: int, out=None):
+        return self._driver.game.encode_observation(agent, out)
+
+    def action_mask(self, agent: int) -> List[bool]:
+        return self._driver.mask(agent)
+
+    def reward(self, agent: int) -> float:
+        return self._driver.reward(agent)
+
+    def is_done(self, agent: int) -> bool:
+        return self._driver.done[agent]
+
+    def last(self, out=None):
+        """ Observation, action mask, reward and done of agent_selection. """
+        agent = self.agent_selection
+        return self.observe(agent, out), self.action_mask(agent), self.reward(agent), self.is_done(agent)
+
+    def step(self, action: int) -> None:
+        """ Issues action for agent_selection. An invalid action raises InvalidMove and leaves the agent selected. """
+        agent = self.agent_selection
+        if agent is None:
+            raise RuntimeError("No agent is waiting to act: the game is over, call reset")
+        self._driver.game.step_index(agent, action, self._state_id)
+        self._queue.pop(0)
+        # the other waiting agents keep their masks until the state changes
+        if self._driver.game.get_state_id() != self._state_id or not self._queue:
+            self._driver.refresh()
+            self._wait()
+
+    def step_all(self, actions: Dict[int, int]) -> None:
+        """ Issues the actions of the waiting agents, as MutinyEnv.step. """
+        self._driver.apply(actions)
+        self._wait()
+
+    def _wait(self) -> None:
+        self._state_id = self._driver.game.get_state_id()
+        self._queue = list(self._driver.acting)
@@ -0,0 +1,144 @@
+"""
+Public events of a game, for following or debugging it without diffing states.
+
+While events are enabled (GameObject.enable_events or GameObject.subscribe), the game builds
+one event per public change: actions declared, blocks, challenges and their outcome,
+influences revealed, coins moved, exchanges, turns ended and the win. Events are kept in a
+ring buffer of the last EVENT_CAPACITY (by default) events, and passed to every subscriber as
+they happen. Games without events only check that nobody listens.
+
+state_id is the id of the state the event happened on, i.e. of the command that caused it.
+Events are not taken back by GameObject.undo or restore.
+"""
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, Iterator, List, Optional
+
+from mutiny.game_enum import ActionEnum, RoleEnum
+from mutiny.slots import slotted
+
+# events kept by default
+EVENT_CAPACITY = 256
+
+
+class Event:
+    """ Base class of the events. """
+    __slots__ = ()
+
+    def to_dict(self) -> Dict:
+        """ The event as plain values, with its type under "event". """
+        d = {"event": type(self).__name__}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            d[f.name] = value.value if isinstance(value, (ActionEnum, RoleEnum)) else value
+        return d
+
+
+@slotted
+@dataclass(frozen=True)
+class ActionDeclared(Event):
+    state_id: int
+    player_id: int
+    action: ActionEnum
+    target_id: Optional[int] = None
+
+
+@slotted
+@dataclass(frozen=True)
+class Blocked(Event):
+    """ player_id claims role to block action. """
+    state_id: int
+    player_id: int
+    role: RoleEnum
+    action: ActionEnum
+
+
+@slotted
+@dataclass(frozen=True)
+class Challenged(Event):
+    """ challenger_id challenged the claim of role by claimant_id, and won when the claimant did not hold it. """
+    state_id: int
+    challenger_id: int
+    claimant_id: int
+    role: RoleEnum
+    won: bool
+
+
+@slotted
+@dataclass(frozen=True)
+class InfluenceRevealed(Event):
+    """ player_id lost an influence of role, and the game when eliminated. """
+    state_id: int
+    player_id: int
+    role: RoleEnum
+    eliminated: bool
+
+
+@slotted
+@dataclass(frozen=True)
+class CoinsMoved(Event):
+    """ amount coins went from from_id to to_id, None standing for the treasury. """
+    state_id: int
+    from_id: Optional[int]
+    to_id: Optional[int]
+    amount: int
+
+
+@slotted
+@dataclass(frozen=True)
+class Exchanged(Event):
+    """ player_id exchanged cards with the deck (which cards is not public). """
+    state_id: int
+    player_id: int
+
+
+@slotted
+@dataclass(frozen=True)
+class TurnEnded(Event):
+    """ The turn of player_id ended; next_player_id plays next, None when the game is won. """
+    state_id: int
+    player_id: int
+    next_player_id: Optional[int]
+
+
+@slotted
+@dataclass(frozen=True)
+class GameWon(Event):
+    state_id: int
+    player_id: int
+
+
+class EventLog:
+    """ The last capacity events of a game, oldest first, and the subscribers to its events. """
+    __slots__ = ("_buffer", "subscribers", "count")
+
+    def __init__(self, capacity: int = EVENT_CAPACITY):
+        self._buffer = deque(maxlen=capacity)
+        # called as subscriber(event) for every event
+        self.subscribers: List[Callable[[Event], None]] = []
+        # events emitted, including those no longer in the buffer
+        self.count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.maxlen
+
+    def emit(self, event: Event) -> None:
+        self._buffer.append(event)
+        self.count += 1
+        for subscriber in self.subscribers:
+            subscriber(event)
+
+    def clear(self) -> None:
+        self._buffer.clear()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._buffer)
+
+    def to_list(self) -> List[Dict]:
+        """ The buffered events as plain values, e.g. for json.dump. """
+        return [event.to_dict() for event in self._buffer]
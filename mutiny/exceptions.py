@@ -1,2 +1,88 @@
+from enum import IntEnum, auto
+from typing import Union
+
+
+class ErrorEnum(IntEnum):
+    """ Why a command was refused. The error_on_* methods of states return these (or None when the command is valid). """
+    INVALID_TRANSITION = auto()
+    PLAYER_DONE = auto()
+    NOT_TURN = auto()
+    MUST_MOVE = auto()
+    MUST_COUP = auto()
+    CASH_ASSASSINATE = auto()
+    CASH_COUP = auto()
+    INVALID_TARGET = auto()
+    SELF_TARGET = auto()
+    MUST_RESPOND = auto()
+    MUST_ALLOW_OR_BLOCK = auto()
+    MUST_ALLOW_OR_CHALLENGE = auto()
+    ALREADY_ALLOWED = auto()
+    NOT_CHALLENGEABLE = auto()
+    NOT_BLOCKABLE = auto()
+    WRONG_BLOCK_ROLE = auto()
+    NOT_TARGET = auto()
+    MUST_REVEAL = auto()
+    WRONG_REVEAL_PLAYER = auto()
+    NO_INFLUENCE = auto()
+    MUST_REPLACE = auto()
+    WRONG_EXCHANGE_PLAYER = auto()
+    KEEP_COUNT = auto()
+    KEEP_ROLES = auto()
+    INVALID_BLOCK_ROLE = auto()
+    INVALID_REVEAL_ROLE = auto()
+    INVALID_REPLACE_ROLES = auto()
+
+
+# message of each error, formatted with the player, state and detail given to InvalidMove
+MESSAGES = {
+    ErrorEnum.INVALID_TRANSITION: "Cannot {detail} on {state}",
+    ErrorEnum.PLAYER_DONE: "Player cannot take any more actions in current game state.",
+    ErrorEnum.NOT_TURN: "Not player {player}'s turn",
+    ErrorEnum.MUST_MOVE: "Player {player} must make a move on {state}",
+    ErrorEnum.MUST_COUP: "Player {player} must coup",
+    ErrorEnum.CASH_ASSASSINATE: "Player {player} does not have enough cash to assassinate",
+    ErrorEnum.CASH_COUP: "Player {player} does not have enough cash to coup",
+    ErrorEnum.INVALID_TARGET: "Target is invalid",
+    ErrorEnum.SELF_TARGET: "Can not target yourself",
+    ErrorEnum.MUST_RESPOND: "Player {player} must allow, block, or challenge on {state}",
+    ErrorEnum.MUST_ALLOW_OR_BLOCK: "Player {player} must allow or block on {state}",
+    ErrorEnum.MUST_ALLOW_OR_CHALLENGE: "Player {player} must allow or challenge on {state}",
+    ErrorEnum.ALREADY_ALLOWED: "Player has already or implicitly allowed on {state}",
+    ErrorEnum.NOT_CHALLENGEABLE: "Current action can not be challenged",
+    ErrorEnum.NOT_BLOCKABLE: "Current action can not be blocked",
+    ErrorEnum.WRONG_BLOCK_ROLE: "Cannot block the current action with {detail}",
+    ErrorEnum.NOT_TARGET: "Cannot block if you are not the target",
+    ErrorEnum.MUST_REVEAL: "Player {player} must reveal on {state}",
+    ErrorEnum.WRONG_REVEAL_PLAYER: "Wrong player to reveal",
+    ErrorEnum.NO_INFLUENCE: "Player does not have {detail}",
+    ErrorEnum.MUST_REPLACE: "Player {player} must replace on {state}",
+    ErrorEnum.WRONG_EXCHANGE_PLAYER: "Wrong player to exchange",
+    ErrorEnum.KEEP_COUNT: "Player can only keep as many cards as influence they have.",
+    ErrorEnum.KEEP_ROLES: "Exchange attempt invalid due to role choice.",
+    ErrorEnum.INVALID_BLOCK_ROLE: "Must block with a valid influence",
+    ErrorEnum.INVALID_REVEAL_ROLE: "Must reveal a valid influence",
+    ErrorEnum.INVALID_REPLACE_ROLES: "Must replace with valid influences",
+}
+
+
 class InvalidMove(Exception):
-    pass
+    """
+    A command the game refused. code is an ErrorEnum, the other arguments are kept as
+    given and only formatted into the message when it is asked for (str or message).
+    code may also be the message itself, as raised before error codes, in which case
+    self.code is None.
+    """
+
+    def __init__(self, code: Union[ErrorEnum, str], player_id=None, state=None, detail=None):
+        super().__init__(code, player_id, state, detail)
+        self.code = code if isinstance(code, ErrorEnum) else None
+
+    @property
+    def message(self) -> str:
+        code, player_id, state, detail = self.args
+        if self.code is None:
+            return str(code)
+        return MESSAGES[code].format(player=player_id, state=state, detail=detail)
+
+    def __str__(self) -> str:
+        return self.message
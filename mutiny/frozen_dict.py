@@ -0,0 +1,18 @@
+class FrozenDict(dict):
+    """
+    A dict that can not be modified after construction, so views of the game can be shared and cached
+    without defensive copies. Still a dict, so it can be serialized with json. Use copy() for a mutable copy.
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("{} is immutable".format(type(self).__name__))
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
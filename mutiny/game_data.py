@@ -1,39 +1,111 @@
-from dataclasses import dataclass
-from typing import Tuple, Union, List, Dict
-from random import randrange, shuffle
+from dataclasses import dataclass, field
+from typing import Tuple, Union, List, Dict, Optional, Iterable
+from random import Random
 
+from mutiny.constants import ROLE_COPIES
+from mutiny.deck import CountDeck
+from mutiny.events import EventLog, InfluenceRevealed
+from mutiny.slots import slotted
 from mutiny.game_enum import ActionEnum, StateEnum, RoleEnum
 from mutiny.player import Player
+from mutiny.frozen_dict import FrozenDict
+from mutiny.observation import ObservationLayout, PLAYER_SIZE
 
 
+def role_copies(n_players: int) -> int:
+    """ Copies of each role in the deck: ROLE_COPIES, or enough to deal every player and exchange. """
+    return max(ROLE_COPIES, -(-(2 * n_players + 2) // len(RoleEnum)))
+
+
+def seats(mask: int) -> List[int]:
+    """ The player ids in a bitmask of players, in seat order. """
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+@slotted
 @dataclass
 class GameData:
     """ Container of generic game data. """
     players: List[Player]
     state_id: int = 0  # Counter for state
     player_turn: int = 0
-    deck: Union[List[RoleEnum], None] = None
+    deck: Union[List[RoleEnum], CountDeck, None] = None
     winner_id: Union[int, None] = None
+    # source of all randomness of the game, see mutiny.rng for seeding many games
+    rng: Random = field(default_factory=Random, repr=False, compare=False)
+    # bit i is set while player i is alive; kept up to date by reveal (or refresh_alive)
+    alive_mask: int = 0
+    alive_count: int = 0
+    # deal from a CountDeck instead of a list, see mutiny.deck
+    counted_deck: bool = field(default=False, compare=False)
 
     # for use with to_dict
-    __dict_cache_state_id: int = -1 
-    __dict_cache: List[Dict] = None
+    __dict_cache_state_id: int = -1
+    __dict_cache: Dict = None
+
+    # undo entries (function, *args), see set_journal
+    journal: Optional[List[tuple]] = None
+
+    # reused PlayerTurn and queued actions, by class (and target), see GameObject.enable_pooling
+    pool: Optional[Dict[object, object]] = field(default=None, repr=False, compare=False)
+
+    # told of every state entered, see GameObject.set_instrument
+    instrument: Optional[object] = field(default=None, repr=False, compare=False)
+
+    # public events, while someone listens, see GameObject.enable_events
+    events: Optional[EventLog] = field(default=None, repr=False, compare=False)
 
     def next_turn(self):
         """ Probably should not be here. """
         if not self.done:
-            for i in range(1, len(self.players)):
-                player_id = (self.player_turn + i) % len(self.players)
-                if self.player_alive(player_id):
-                    self.player_turn = player_id
-                    return self
+            self.player_turn = self.next_alive(self.player_turn)
+            return self
         if self.winner_id is None:
-            self.winner_id = [i for i, player in enumerate(self.players) if player.alive][0]
+            self.winner_id = self.next_alive(-1)
             return self
         raise RuntimeError("Game has already ended")
 
+    def next_alive(self, player_id: int) -> int:
+        """ The first living player after player_id in seat order, going around the table. """
+        later = self.alive_mask >> (player_id + 1)
+        if later:
+            return player_id + (later & -later).bit_length()
+        return (self.alive_mask & -self.alive_mask).bit_length() - 1
+
     def player_alive(self, player_id: int) -> bool:
-        return self.players[player_id].alive
+        return bool(self.alive_mask & (1 << player_id))
+
+    @property
+    def all_mask(self) -> int:
+        """ Bitmask of every player. """
+        return (1 << len(self.players)) - 1
+
+    @property
+    def dead_mask(self) -> int:
+        return self.all_mask & ~self.alive_mask
+
+    def reveal(self, player_id: int, role: Optional[RoleEnum] = None) -> None:
+        """ Reveals an influence of player_id (see Player.reveal), updating the living players. """
+        player = self.players[player_id]
+        role = player.reveal(role)
+        if self.events is not None:
+            self.events.emit(InfluenceRevealed(self.state_id, player_id, role, not player.alive))
+        if not player.alive:
+            if self.journal is not None:
+                self.journal.append((setattr, self, "alive_count", self.alive_count))
+                self.journal.append((setattr, self, "alive_mask", self.alive_mask))
+            self.alive_mask &= ~(1 << player_id)
+            self.alive_count -= 1
+
+    def refresh_alive(self) -> None:
+        """ Recomputes the living players from the hands. Call after changing hands directly. """
+        self.alive_mask = sum(1 << i for i, player in enumerate(self.players) if player.alive)
+        self.alive_count = bin(self.alive_mask).count("1")
 
     @property 
     def active_player(self):
@@ -42,57 +114,119 @@ class GameData:
 
     @property
     def players_left(self) -> int:
-        return sum(1 for player in self.players if player.alive)
+        return self.alive_count
 
     @property
     def done(self) -> bool:
-        return self.players_left == 1
+        return self.alive_count == 1
 
-    def to_dict(self, player_id=None) -> Dict:
+    def to_dict(self, player_id=None, state=None) -> Dict:
         """
-        Returns a dictionary representing the game data from the perspective of player_id.
+        Returns an immutable dictionary representing the game data from the perspective of player_id.
         When player_id is None (unspecified), returns the unobfuscated game data (i.e. all info).
+        When state (a StateInterface) is given, its state_dict is included under "state".
         """
-        # to avoid making duplicate dictionaries, we cache them and record the state id
+        # views are only built on request, and cached until the state id changes
         if self.state_id != self.__dict_cache_state_id:
             self.__dict_cache_state_id = self.state_id
-            player_dicts = [(p.to_dict(-1),p.to_dict(p.self_id)) for p in self.players]
-            self.__dict_cache = [
-                {
-                    "stateId": self.state_id,
-                    "players": [
-                        player_dicts[p.self_id][int(p.self_id==player.self_id)]
-                        for p in self.players
-                    ],
-                    "playerIdx": player.self_id
-                } 
-            for player in self.players
-            ]
-            # store the full information dictionary in an extra spot at the end of the list
-            self.__dict_cache.append(
-                {
-                    "stateId": self.state_id,
-                    "players": [player_dicts[p.self_id][1] for p in self.players],
-                    "playerIdx": None
-                }
-            )
-
-        if player_id == None:
-            return self.__dict_cache[-1]
-
-        return self.__dict_cache[player_id]
+            self.__dict_cache = {}
+
+        key = (player_id, state is not None)
+        d = self.__dict_cache.get(key)
+        if d is None:
+            d = {
+                "stateId": self.state_id,
+                "players": tuple(p.to_dict(player_id) for p in self.players),
+                "playerIdx": player_id
+            }
+            if state is not None:
+                d["state"] = FrozenDict(state.state_dict(player_id))
+            d = self.__dict_cache[key] = FrozenDict(d)
+        return d
+
+    def encode(self, out, layout: ObservationLayout, player_id=None) -> None:
+        """ Writes the game data from the perspective of player_id into a zeroed buffer. """
+        offset = layout.players
+        for player in self.players:
+            player.encode(out, offset, player_id)
+            offset += PLAYER_SIZE
+        if player_id is not None:
+            out[layout.observer + player_id] = 1
+        out[layout.player_turn + self.player_turn] = 1
+
+    def snapshot(self) -> tuple:
+        """ Everything needed to restore this game data, as immutable values. """
+        return (self.state_id, self.player_turn, self.winner_id, tuple(self.deck),
+                tuple(player.snapshot() for player in self.players), self.rng.getstate())
+
+    def restore(self, snapshot: tuple) -> None:
+        self.state_id, self.player_turn, self.winner_id, deck, players, rng_state = snapshot
+        self.deck = self._new_deck(deck)
+        self.rng.setstate(rng_state)
+        for player, player_snapshot in zip(self.players, players):
+            player.restore(player_snapshot)
+        self.refresh_alive()
+        self.clear_view_cache()
+
+    def clear_view_cache(self) -> None:
+        """ Call when the state id is set back, as the cached views may belong to another line of play. """
+        self.__dict_cache_state_id = -1
+
+    def set_journal(self, journal: Optional[List[tuple]]) -> None:
+        """
+        While journal is a list, changes to the players and the deck append an entry (function, *args)
+        to it; calling the entries in reverse order undoes the changes. Pass None to stop journaling.
+        """
+        self.journal = journal
+        for player in self.players:
+            player._journal = journal
 
     def reset(self) -> None:
         """ Initialize game. """
         self.state_id = 0
         self.winner_id = None
-        self.player_turn = randrange(len(self.players))
-        self.deck = [role for _ in range(3) for role in RoleEnum]
+        self.__dict_cache_state_id = -1
+        self.player_turn = self.rng.randrange(len(self.players))
+        self.deck = self._new_deck(role for _ in range(role_copies(len(self.players))) for role in RoleEnum)
         self.shuffle_deck()
 
         for player in self.players:
             player.reset()
             player.draw((self.deck.pop(), self.deck.pop()))
+        self.refresh_alive()
+
+    def _new_deck(self, roles: Iterable[RoleEnum]) -> Union[List[RoleEnum], CountDeck]:
+        return CountDeck(roles, self.rng) if self.counted_deck else list(roles)
+
+    def draw_card(self) -> RoleEnum:
+        """ Takes the top card of the deck (a random one with counted_deck). """
+        if self.journal is None:
+            return self.deck.pop()
+        if self.counted_deck:
+            self.journal.append((self.rng.setstate, self.rng.getstate()))
+        role = self.deck.pop()
+        self.journal.append((self.deck.append, role))
+        return role
+
+    def return_card(self, role: RoleEnum) -> None:
+        """ Puts role on top of the deck, usually followed by shuffle_deck. """
+        if self.journal is not None:
+            self.journal.append((self.deck.remove, role) if self.counted_deck else (self.deck.pop,))
+        self.deck.append(role)
 
     def shuffle_deck(self):
-        shuffle(self.deck)
+        # a CountDeck draws uniformly anyway
+        if self.counted_deck:
+            return
+        if self.journal is not None:
+            self.journal.append((self.deck.__setitem__, slice(None), self.deck[:]))
+            self.journal.append((self.rng.setstate, self.rng.getstate()))
+        self.rng.shuffle(self.deck)
+
+    def draw_probability(self, role: RoleEnum) -> float:
+        """ Probability that the next card drawn (after the usual shuffle) is role. """
+        return self.deck.count(role) / len(self.deck)
+
+    def draw_distribution(self) -> Dict[RoleEnum, float]:
+        """ draw_probability of every role. """
+        return {role: self.draw_probability(role) for role in RoleEnum}
@@ -1,22 +1,53 @@
-from typing import List, Dict, Union, Optional, Tuple
+from random import Random
+from time import perf_counter
+from typing import List, Dict, Union, Optional, Tuple, Callable, Iterable
 
+from mutiny.action_space import ActionSpace
+from mutiny.observation import ObservationLayout
 from mutiny.actions import QueuedAction
 from mutiny.game_enum import CommandEnum, ActionEnum, RoleEnum, StateEnum
 from mutiny.game_data import GameData
 from mutiny.player import Player
-from mutiny.exceptions import InvalidMove
+from mutiny.state_interface import StateInterface
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.instrument import Instrument
+from mutiny.events import EVENT_CAPACITY, Event, EventLog
 
 DEBUG_LOG = False
+# check commands given to GameObject.step_trusted (slower, for debugging)
+CHECK_TRUSTED = False
+# methods replaced on instrumented games, see GameObject.set_instrument
+INSTRUMENTED_METHODS = ("command", "step_index", "step_trusted")
+
+
+def player_names(n_players: int) -> List[str]:
+    """ Default names of the players of a table, for drivers that only know its size. """
+    return ["Player {}".format(i) for i in range(n_players)]
 
 class GameObject:
     "Object to hold game state and control flow of game states"
 
-    def __init__(self, player_names: List[str]):
+    def __init__(self, player_names: List[str], seed: Union[int, Random, None] = None, counted_deck: bool = False):
+        """
+        seed - an int or a random.Random to deal and shuffle with (see mutiny.rng.spawn),
+        by default a generator seeded by the system
+        counted_deck - deal from role counts rather than a shuffled list (see mutiny.deck)
+        """
         from mutiny.states.player_turn import PlayerTurn
         self.players = [Player(name, i) for i,name in enumerate(player_names)]
-        self.game_data = GameData(self.players)
+        self.game_data = GameData(self.players, rng=seed if isinstance(seed, Random) else Random(seed),
+                                  counted_deck=counted_deck)
         self.game_data.reset()
+        self.action_space = ActionSpace.shared(len(self.players))
+        self.observation_layout = ObservationLayout.shared(len(self.players))
         self._state_interface = PlayerTurn(data=self.game_data)
+        self._undo_marks = None
+        # called as recorder(player_id, state_id, action_idx) after every applied command, see mutiny.record;
+        # reset, restore and undo detach it, as the commands recorded so far no longer lead to the game
+        self.recorder: Optional[Callable[[int, int, int], None]] = None
+        self._auto_allow: Optional[List[bool]] = None
+        self._instrument: Optional[Instrument] = None
+        self._game_commands = 0
 
     def get_state_id(self):
         return self.game_data.state_id
@@ -63,11 +94,282 @@ class GameObject:
     def get_target(self) -> Optional[int]:
         return self._state_interface.target
 
+    def legal_actions(self, player_id: int) -> List[bool]:
+        """
+        Returns a boolean mask over self.action_space of the commands player_id can currently issue.
+        Agrees with command, but never raises InvalidMove.
+        """
+        mask = [False] * self.action_space.size
+        self._state_interface.legal_actions(player_id, self.action_space, mask)
+        if self.player_is_done(player_id) and any(mask[self.action_space.noop + 1:]):
+            # done players may only noop
+            noop = mask[self.action_space.noop]
+            mask = [False] * self.action_space.size
+            mask[self.action_space.noop] = noop
+        return mask
+
+    def pending_decisions(self) -> List[int]:
+        """
+        The players who must act on the current state, in seat order. Every other player
+        may only noop, so drivers can skip sending them any command.
+        """
+        if self.game_is_over():
+            return []
+        return self._state_interface.pending_decisions()
+
+    def set_auto_allow(self, enabled: bool = True, always_allow: Iterable[int] = ()) -> None:
+        """
+        While enabled, after every command the players in always_allow who must answer a window
+        allow at once (see pending_decisions), so windows nobody else contests resolve within the
+        same command. Each of these allows is issued with step_index, so it is journaled (one undo
+        rewinds one allow), recorded and instrumented like any other command.
+        """
+        if not enabled:
+            self._auto_allow = None
+            return
+        always_allow = set(always_allow)
+        self._auto_allow = [player_id in always_allow for player_id in range(len(self.players))]
+        self._allow_automatically()
+
+    def _allow_automatically(self) -> None:
+        # set aside while allowing, so that the allows issued here do not start it again
+        always_allow, self._auto_allow = self._auto_allow, None
+        allow = self.action_space.allow
+        try:
+            while not self.game_is_over():
+                for player_id in self.pending_decisions():
+                    if always_allow[player_id] and self.legal_actions(player_id)[allow]:
+                        self.step_index(player_id, allow)
+                        break
+                else:
+                    return
+        finally:
+            self._auto_allow = always_allow
+
+    def legal_actions_all(self) -> List[List[bool]]:
+        """ legal_actions for every player, indexed by player id. """
+        return [self.legal_actions(player_id) for player_id in range(len(self.players))]
+
     def to_dict(self,player_id=None):
         return self._state_interface.to_dict(player_id=player_id)
 
+    def snapshot(self) -> tuple:
+        """
+        Returns the full state of the game, including its random generator, as nested tuples
+        of immutable values, which can be kept, pickled or restored any number of times.
+        """
+        return self.game_data.snapshot(), self._state_interface.snapshot()
+
+    def restore(self, snapshot: tuple) -> None:
+        """ Puts the game back in the state of snapshot, taken from a game with the same players. """
+        data, state = snapshot
+        self.recorder = None
+        self.game_data.restore(data)
+        self._state_interface = StateInterface.restore(self.game_data, state)
+        if self._undo_marks is not None:
+            self.enable_journal()
+
+    def clone(self) -> "GameObject":
+        """ Independent copy of this game. Much cheaper than copy.deepcopy. """
+        game = GameObject.__new__(GameObject)
+        game.players = [Player(player.name, player.self_id) for player in self.players]
+        game.game_data = GameData(game.players, counted_deck=self.game_data.counted_deck,
+                                  pool=None if self.game_data.pool is None else {})
+        game.action_space = self.action_space
+        game.observation_layout = self.observation_layout
+        game._undo_marks = None
+        game.recorder = None
+        game._auto_allow = None
+        game._instrument = None
+        game._game_commands = 0
+        game.restore(self.snapshot())
+        return game
+
+    def enable_pooling(self, enabled: bool = True) -> None:
+        """
+        While enabled, the game reuses one PlayerTurn, and one queued action per action and target,
+        instead of allocating them on every turn. These are never changed once built, so states,
+        state ids and getters are unchanged (only the identity of the objects returned).
+        The pool refers back to the game data, so a pooled game is freed by the garbage collector.
+        """
+        self.game_data.pool = {} if enabled else None
+
+    def set_instrument(self, instrument: Optional[Instrument]) -> None:
+        """
+        Reports every state entered and every command issued with command, step_index or step_trusted
+        to instrument (see mutiny.instrument), or stops reporting with None. These methods are replaced
+        on this game by measured ones, so that games without an instrument run exactly as before.
+        """
+        self._instrument = instrument
+        self.game_data.instrument = instrument
+        self._game_commands = 0
+        for name in INSTRUMENTED_METHODS:
+            if instrument is None:
+                self.__dict__.pop(name, None)
+            else:
+                setattr(self, name, getattr(self, "_measured_" + name))
+
+    def _measured_command(self, player_id: int, state_id: int, emission: Dict) -> None:
+        if self.get_state_id() != state_id:
+            return
+        try:
+            method = self.action_space.dispatch[self.action_space.from_emission(emission)][0]
+        except (KeyError, TypeError, ValueError):
+            method = "unknown"
+        self._measure(player_id, method, GameObject.command, state_id, emission)
+
+    def _measured_step_index(self, player_id: int, action_idx: int, state_id: Optional[int] = None) -> None:
+        if state_id is not None and self.get_state_id() != state_id:
+            return
+        self._measure(player_id, self.action_space.dispatch[action_idx][0], GameObject.step_index, action_idx)
+
+    def _measured_step_trusted(self, player_id: int, action_idx: int) -> None:
+        self._measure(player_id, self.action_space.dispatch[action_idx][0], GameObject.step_trusted, action_idx)
+
+    def _measure(self, player_id: int, method: str, issue: Callable, *args) -> None:
+        """
+        Calls issue(self, player_id, *args), the command method of the state named method, and reports it.
+        Automatic allows are issued after it is measured, as commands of their own.
+        """
+        instrument = self._instrument
+        state = self._state_interface.state_name
+        playing = self.game_data.winner_id is None
+        auto_allow, self._auto_allow = self._auto_allow, None
+        start = perf_counter()
+        try:
+            issue(self, player_id, *args)
+        except InvalidMove as error:
+            instrument.on_invalid(state, method, error.code)
+            raise
+        finally:
+            self._auto_allow = auto_allow
+        instrument.on_command(state, method, perf_counter() - start)
+        self._game_commands += 1
+        if playing and self.game_data.winner_id is not None:
+            instrument.on_game_end(self._game_commands)
+        if auto_allow is not None:
+            self._allow_automatically()
+
+    def enable_events(self, enabled: bool = True, capacity: int = EVENT_CAPACITY) -> None:
+        """
+        While enabled, the game emits its public events (see mutiny.events) into self.events,
+        which keeps the last capacity of them, and to its subscribers. Enabling again empties it.
+        """
+        self.game_data.events = EventLog(capacity) if enabled else None
+
+    @property
+    def events(self) -> Optional[EventLog]:
+        return self.game_data.events
+
+    def subscribe(self, subscriber: Callable[[Event], None]) -> None:
+        """ Calls subscriber(event) with every event from now on, enabling events if needed. """
+        if self.game_data.events is None:
+            self.enable_events()
+        self.game_data.events.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Callable[[Event], None]) -> None:
+        """ Stops calling subscriber. Events stay enabled. """
+        self.game_data.events.subscribers.remove(subscriber)
+
+    def enable_journal(self, enabled: bool = True) -> None:
+        """
+        While enabled, every applied command records what it changed, so that undo can rewind it
+        in place. Meant for searches that walk a game tree without copying the game.
+        """
+        self._undo_marks = [] if enabled else None
+        self.game_data.set_journal([] if enabled else None)
+
+    def undo(self) -> None:
+        """ Rewinds the last applied command (or step_index). Requires enable_journal. """
+        if not self._undo_marks:
+            raise RuntimeError("Nothing to undo" if self._undo_marks is not None else "Journal is not enabled")
+        self.recorder = None
+        self._rewind()
+
+    def _rewind(self) -> None:
+        """ Rewinds to the last undo mark, e.g. of a command that raised. """
+        data = self.game_data
+        length, self._state_interface, data.state_id, data.player_turn, data.winner_id = self._undo_marks.pop()
+        journal = data.journal
+        while len(journal) > length:
+            entry = journal.pop()
+            entry[0](*entry[1:])
+        data.clear_view_cache()
+
+    def _push_undo_mark(self) -> None:
+        data = self.game_data
+        self._undo_marks.append((len(data.journal), self._state_interface, data.state_id, data.player_turn, data.winner_id))
+
+    def encode_observation(self, player_id=None, out=None):
+        """
+        Writes the view of player_id (see to_dict) into out, a buffer of length self.observation_layout.size
+        such as a NumPy array, and returns it. A new list is allocated when out is None.
+        """
+        if out is None:
+            out = [0] * self.observation_layout.size
+        else:
+            self.observation_layout.clear(out)
+        self._state_interface.encode(out, self.observation_layout, player_id)
+        return out
+
+    def encode_observations(self, out):
+        """ Fills out, of shape (n_players, self.observation_layout.size), with the view of every player. """
+        for player_id in range(len(self.players)):
+            self.encode_observation(player_id, out[player_id])
+        return out
+
     def reset(self):
+        self.recorder = None
+        self._game_commands = 0
+        if self.game_data.events is not None:
+            self.game_data.events.clear()
         self._state_interface = self._state_interface.reset()
+        if self._undo_marks is not None:
+            self.enable_journal()
+
+    def step_index(self, player_id: int, action_idx: int, state_id: Optional[int] = None) -> None:
+        """
+        Issues the command at action_idx of self.action_space for player_id.
+        Equivalent to command, without building or parsing an emission.
+        If state_id is given and out of date, the command is ignored.
+        """
+        if state_id is not None and self.get_state_id() != state_id:
+            return
+
+        if action_idx != self.action_space.noop and self.player_is_done(player_id):
+            raise InvalidMove(ErrorEnum.PLAYER_DONE, player_id)
+
+        method, args = self.action_space.dispatch[action_idx]
+        self._issue(player_id, action_idx, method, args)
+
+    def step_trusted(self, player_id: int, action_idx: int) -> None:
+        """
+        Issues the command at action_idx like step_index, but without checking that it is valid:
+        it must be legal for player_id in the current state (see legal_actions), e.g. sampled from
+        the mask. Illegal commands leave the game in an undefined state, unless CHECK_TRUSTED is
+        set, in which case they raise AssertionError instead.
+        """
+        if CHECK_TRUSTED and not self.legal_actions(player_id)[action_idx]:
+            raise AssertionError("Player {} can not issue {} on {}".format(
+                player_id, self.action_space.decode[action_idx], self.get_state_name))
+        method, args = self.action_space.trusted_dispatch[action_idx]
+        self._issue(player_id, action_idx, method, args)
+
+    def _issue(self, player_id: int, action_idx: int, method: str, args: tuple) -> None:
+        state_id = self.get_state_id()
+        if self._undo_marks is None:
+            self._state_interface = getattr(self._state_interface, method)(player_id, *args)
+        else:
+            self._push_undo_mark()
+            try:
+                self._state_interface = getattr(self._state_interface, method)(player_id, *args)
+            except Exception:
+                self._rewind()
+                raise
+        if self.recorder is not None:
+            self.recorder(player_id, state_id, action_idx)
+        if self._auto_allow is not None:
+            self._allow_automatically()
 
     def command(self, player_id: int, state_id: int, emission: Dict):
         """
@@ -79,6 +381,22 @@ class GameObject:
         if self.get_state_id() != state_id:
             return
 
+        if self._undo_marks is None:
+            self._command(player_id, emission)
+        else:
+            self._push_undo_mark()
+            try:
+                self._command(player_id, emission)
+            except Exception:
+                self._rewind()
+                raise
+        if self.recorder is not None:
+            # encoded once applied, so that bad input is refused with InvalidMove as when not recording
+            self.recorder(player_id, state_id, self.action_space.from_emission(emission))
+        if self._auto_allow is not None:
+            self._allow_automatically()
+
+    def _command(self, player_id: int, emission: Dict):
         if not emission or not emission["command"]:
             raise RuntimeError
 
@@ -89,7 +407,7 @@ class GameObject:
             return
 
         if self.player_is_done(player_id):
-            raise InvalidMove("Player cannot take any more actions in current game state.")
+            raise InvalidMove(ErrorEnum.PLAYER_DONE, player_id)
 
         if command == CommandEnum.ACTION:
             if DEBUG_LOG:
@@ -121,7 +439,7 @@ class GameObject:
                 # This happens when Benedict tries to block on a state that is blockable
                 # vector_to_emission (see nnio in benedict) assumes that the state is blockable
                 # If not, it will give an UNKNOWN for the blocking role
-                raise InvalidMove("Must block with a valid influence")
+                raise InvalidMove(ErrorEnum.INVALID_BLOCK_ROLE, player_id, detail=emission["blockingRole"])
 
             self._state_interface = self._state_interface.block(player_id, blocking_role)
 
@@ -132,7 +450,7 @@ class GameObject:
             try:
                 influences = tuple(RoleEnum(r) for r in emission["roles"])
             except ValueError:
-                raise InvalidMove("Must replace with valid influences")
+                raise InvalidMove(ErrorEnum.INVALID_REPLACE_ROLES, player_id, detail=emission["roles"])
 
             self._state_interface = self._state_interface.replace(player_id, influences)
 
@@ -140,6 +458,6 @@ class GameObject:
             try:
                 reveal_role = RoleEnum(emission["role"])
             except ValueError:
-                raise InvalidMove("Must reveal a valid influence")
+                raise InvalidMove(ErrorEnum.INVALID_REVEAL_ROLE, player_id, detail=emission["role"])
 
             self._state_interface = self._state_interface.reveal(player_id, reveal_role)
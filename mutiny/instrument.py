@@ -0,0 +1,141 @@
+"""
+Instrumentation of games, to find where time goes and how often commands are refused.
+
+An Instrument installed with GameObject.set_instrument is told of every state entered (from
+StateInterface.__init__, or the pooled PlayerTurn) and of every command issued through
+GameObject.command, step_index or step_trusted: how long it took on which state, or the error
+code it was refused with. Games without an instrument only check that none is installed.
+
+TransitionStats is the instrument to use: it counts states and commands, times every transition
+(state, command), counts invalid moves by ErrorEnum and builds a histogram of game lengths.
+One TransitionStats may be installed on any number of games, in a single thread, and exported
+with snapshot:
+
+    stats = TransitionStats()
+    game.set_instrument(stats)
+    ...
+    json.dump(stats.snapshot(), out)
+"""
+from typing import Dict, List, Tuple
+
+from mutiny.exceptions import ErrorEnum
+from mutiny.game_enum import StateEnum
+
+
+class Instrument:
+    """
+    Hook called by instrumented games. Override the methods of interest; commands are named after
+    the StateInterface method issuing them (income, f_aid, ..., block, allow, reveal, replace).
+    """
+    __slots__ = ()
+
+    def on_state(self, state: StateEnum) -> None:
+        """ A state was entered. Called before the state is fully built. """
+        pass
+
+    def on_command(self, state: StateEnum, command: str, seconds: float) -> None:
+        """ command, issued on state, was applied in seconds (including any states it went through). """
+        pass
+
+    def on_invalid(self, state: StateEnum, command: str, error: ErrorEnum) -> None:
+        """ command, issued on state, was refused with InvalidMove. """
+        pass
+
+    def on_game_end(self, commands: int) -> None:
+        """ A game was won after commands applied commands (since it started, or the instrument was installed). """
+        pass
+
+
+class TransitionStats(Instrument):
+    """ Counters and timings of instrumented games, see snapshot. """
+    __slots__ = ("states", "transitions", "errors", "game_lengths")
+
+    def __init__(self):
+        # entries by state
+        self.states: Dict[StateEnum, int] = {}
+        # [applied, seconds, invalid] by (state, command)
+        self.transitions: Dict[Tuple[StateEnum, str], List] = {}
+        # invalid moves by error
+        self.errors: Dict[ErrorEnum, int] = {}
+        # games by number of commands applied
+        self.game_lengths: Dict[int, int] = {}
+
+    def on_state(self, state: StateEnum) -> None:
+        self.states[state] = self.states.get(state, 0) + 1
+
+    def on_command(self, state: StateEnum, command: str, seconds: float) -> None:
+        entry = self.transitions.get((state, command))
+        if entry is None:
+            entry = self.transitions[state, command] = [0, 0.0, 0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def on_invalid(self, state: StateEnum, command: str, error: ErrorEnum) -> None:
+        entry = self.transitions.get((state, command))
+        if entry is None:
+            entry = self.transitions[state, command] = [0, 0.0, 0]
+        entry[2] += 1
+        self.errors[error] = self.errors.get(error, 0) + 1
+
+    def on_game_end(self, commands: int) -> None:
+        self.game_lengths[commands] = self.game_lengths.get(commands, 0) + 1
+
+    def __iadd__(self, other: "TransitionStats") -> "TransitionStats":
+        """ Adds the counts of other, e.g. gathered by another process. """
+        for state, count in other.states.items():
+            self.states[state] = self.states.get(state, 0) + count
+        for key, (applied, seconds, invalid) in other.transitions.items():
+            entry = self.transitions.get(key)
+            if entry is None:
+                entry = self.transitions[key] = [0, 0.0, 0]
+            entry[0] += applied
+            entry[1] += seconds
+            entry[2] += invalid
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+        for length, count in other.game_lengths.items():
+            self.game_lengths[length] = self.game_lengths.get(length, 0) + count
+        return self
+
+    def clear(self) -> None:
+        self.states.clear()
+        self.transitions.clear()
+        self.errors.clear()
+        self.game_lengths.clear()
+
+    def snapshot(self) -> Dict:
+        """
+        The counts as plain values, ready for json.dump. Transitions are keyed "state/command" and
+        sorted by total time, so the costliest come first; invalid_rate is the share of the
+        commands issued that were refused with each error.
+        """
+        applied = sum(entry[0] for entry in self.transitions.values())
+        invalid = sum(entry[2] for entry in self.transitions.values())
+        issued = max(applied + invalid, 1)
+        commands: Dict[str, int] = {}
+        for (_, command), entry in self.transitions.items():
+            commands[command] = commands.get(command, 0) + entry[0]
+        games = sum(self.game_lengths.values())
+        return {
+            "commands": applied,
+            "invalid": invalid,
+            "seconds": sum(entry[1] for entry in self.transitions.values()),
+            "states": {state.value: count for state, count in self.states.items()},
+            "command_counts": dict(sorted(commands.items())),
+            "transitions": {
+                "{}/{}".format(state.value, command): {
+                    "count": count,
+                    "seconds": seconds,
+                    "mean_us": seconds / count * 1e6 if count else None,
+                    "invalid": refused,
+                }
+                for (state, command), (count, seconds, refused) in
+                sorted(self.transitions.items(), key=lambda item: -item[1][1])
+            },
+            "invalid_by_error": {error.name: count for error, count in sorted(self.errors.items())},
+            "invalid_rate": {error.name: count / issued for error, count in sorted(self.errors.items())},
+            "games": games,
+            "game_length": {str(length): count for length, count in sorted(self.game_lengths.items())},
+            "mean_game_length": sum(length * count for length, count in self.game_lengths.items()) / games
+            if games else None,
+        }
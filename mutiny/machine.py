@@ -0,0 +1,589 @@
+"""
+Table-driven engine with the rules of mutiny.states.
+
+The rules are given by TRANSITIONS: for each state and operation (a command, with
+actions split by kind), a guard that returns an ErrorEnum when the operation is not
+allowed, an effect, and the state entered afterwards (None when the state does not
+change, or when the effect enters the next state itself, e.g. after resolving an action).
+The table is compiled once into a flat list indexed by state and operation, which
+Machine.step_index runs: one lookup, the guard and the effect per command, instead of a
+state object with error_on_* and command methods per transition.
+
+A Machine plays on a GameData like GameObject, with the same deal, state ids, views and
+legal actions, so games with the same seed and commands play out identically.
+"""
+from random import Random
+from typing import Dict, List, Optional, Tuple, Union
+
+from mutiny.action_space import ActionSpace, sort_roles
+from mutiny.actions import BLOCKING_ROLES
+from mutiny.constants import ASSASSINATE_COST, COUP_COST, F_AID_GAIN, INCOME_GAIN, STEAL_TRADE, TAX_GAIN
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.game_data import GameData, seats
+from mutiny.game_enum import ActionEnum, CommandEnum, RoleEnum, StateEnum
+from mutiny.player import Influence, Player
+
+STATES = list(StateEnum)
+START_TURN, WAIT_ACTION, WAIT_BLOCK, WAIT_BLOCK_RESPONSE, REVEAL, EXCHANGE = range(len(STATES))
+
+# operations: commands, with actions split by kind
+OPERATIONS = ("noop", "income", "foreign aid", "tax", "exchange", "steal", "assassinate", "coup",
+              "block", "challenge", "allow", "reveal", "replace")
+NOOP, INCOME, F_AID, TAX, EXCHANGE_ACTION, STEAL, ASSASSINATE, COUP, BLOCK, CHALLENGE, ALLOW, REVEAL_ROLE, KEEP = \
+    range(len(OPERATIONS))
+N_OPERATIONS = len(OPERATIONS)
+
+_ACTION_OPERATION = {
+    ActionEnum.INCOME: INCOME,
+    ActionEnum.F_AID: F_AID,
+    ActionEnum.TAX: TAX,
+    ActionEnum.EXCHANGE: EXCHANGE_ACTION,
+    ActionEnum.STEAL: STEAL,
+    ActionEnum.ASSASSINATE: ASSASSINATE,
+    ActionEnum.COUP: COUP,
+}
+_COMMAND_OPERATION = {
+    CommandEnum.NOOP: NOOP,
+    CommandEnum.BLOCK: BLOCK,
+    CommandEnum.CHALLENGE: CHALLENGE,
+    CommandEnum.ALLOW: ALLOW,
+    CommandEnum.REVEAL: REVEAL_ROLE,
+    CommandEnum.EXCHANGE: KEEP,
+}
+
+# role claimed by each action that can be challenged
+ACTION_ROLES = {
+    ActionEnum.TAX: RoleEnum.DUKE,
+    ActionEnum.STEAL: RoleEnum.CAPTAIN,
+    ActionEnum.ASSASSINATE: RoleEnum.ASSASSIN,
+    ActionEnum.EXCHANGE: RoleEnum.AMBASSADOR,
+}
+
+
+class Machine:
+    """
+    Plays a game like GameObject, driven by TRANSITIONS. Commands are indices of
+    self.action_space (see step_index). Unlike GameObject, it has no events, undo journal,
+    pooling, snapshots, recorder or instrument: games needing them must use GameObject.
+    """
+    __slots__ = ("game_data", "players", "action_space", "state", "action", "target", "blocker", "block_role",
+                 "reveal_id", "block_next", "exchange_options", "allow", "_operations")
+
+    def __init__(self, player_names: List[str], seed: Union[int, Random, None] = None, counted_deck: bool = False):
+        """ seed and counted_deck as for GameObject: the same seed deals the same game. """
+        self.players = [Player(name, i) for i, name in enumerate(player_names)]
+        self.game_data = GameData(self.players, rng=seed if isinstance(seed, Random) else Random(seed),
+                                  counted_deck=counted_deck)
+        self.action_space = ActionSpace.shared(len(self.players))
+        self._operations = _operations(self.action_space)
+        self.reset()
+
+    def reset(self) -> None:
+        self.game_data.reset()
+        self._clear()
+        self._enter(START_TURN)
+
+    def _clear(self) -> None:
+        # the queued action (None when there is none, NOP when it is a no-op) and the fields of the other states
+        self.action: Optional[ActionEnum] = None
+        self.target: Optional[int] = None
+        self.blocker: Optional[int] = None
+        self.block_role: Optional[RoleEnum] = None
+        self.reveal_id: Optional[int] = None
+        self.block_next = False
+        self.exchange_options: Optional[Tuple[RoleEnum, ...]] = None
+        # bitmask of the players who allowed, implicitly when dead
+        self.allow = 0
+
+    def _enter(self, state: int) -> None:
+        self.state = state
+        self.game_data.state_id += 1
+
+    # the interpreter
+
+    def step_index(self, player_id: int, action_idx: int, state_id: Optional[int] = None) -> None:
+        """ As GameObject.step_index. """
+        data = self.game_data
+        if state_id is not None and data.state_id != state_id:
+            return
+        operation, arg = self._operations[action_idx]
+        if operation != NOOP and self.player_is_done(player_id):
+            raise InvalidMove(ErrorEnum.PLAYER_DONE, player_id)
+        rule = RULES[self.state * N_OPERATIONS + operation]
+        if rule is None:
+            raise InvalidMove(ErrorEnum.INVALID_TRANSITION, player_id, STATES[self.state], OPERATIONS[operation])
+        guard, effect, next_state = rule
+        if (error := guard(self, player_id, arg)):
+            raise InvalidMove(error, player_id, STATES[self.state], arg)
+        if effect is not None:
+            effect(self, player_id, arg)
+        if next_state is not None:
+            self._enter(next_state)
+
+    def legal_actions(self, player_id: int) -> List[bool]:
+        """ As GameObject.legal_actions: the indices that step_index would accept. """
+        mask = [False] * self.action_space.size
+        done = self.player_is_done(player_id)
+        base = self.state * N_OPERATIONS
+        for index, (operation, arg) in enumerate(self._operations):
+            rule = RULES[base + operation]
+            if rule is not None and (operation == NOOP or not done) and not rule[0](self, player_id, arg):
+                mask[index] = True
+        return mask
+
+    def pending_decisions(self) -> List[int]:
+        """ As GameObject.pending_decisions. """
+        data = self.game_data
+        if self.game_is_over():
+            return []
+        if self.state == START_TURN or self.state == EXCHANGE:
+            return [data.player_turn]
+        if self.state == REVEAL:
+            return [self.reveal_id]
+        if self.state == WAIT_BLOCK and self.action != ActionEnum.F_AID:
+            return [] if self.allow & (1 << self.target) else [self.target]
+        return seats(data.all_mask & ~self.allow)
+
+    # getters, as in GameObject
+
+    def get_state_id(self) -> int:
+        return self.game_data.state_id
+
+    @property
+    def get_state_name(self) -> StateEnum:
+        return STATES[self.state]
+
+    @property
+    def get_player_turn(self) -> int:
+        return self.game_data.player_turn
+
+    @property
+    def get_target(self) -> Optional[int]:
+        if self.state == WAIT_BLOCK_RESPONSE:
+            return self.blocker
+        return self.target if self.state in (WAIT_ACTION, WAIT_BLOCK, REVEAL) else None
+
+    @property
+    def get_blocking_role(self) -> Optional[RoleEnum]:
+        return self.block_role if self.state == WAIT_BLOCK_RESPONSE else None
+
+    @property
+    def get_player_to_reveal(self) -> Optional[int]:
+        return self.reveal_id if self.state == REVEAL else None
+
+    @property
+    def get_exchanges(self) -> Optional[Tuple[RoleEnum, ...]]:
+        return self.exchange_options if self.state == EXCHANGE else None
+
+    def player_is_done(self, player_id: int) -> bool:
+        return not self.game_data.player_alive(player_id) or self.game_data.winner_id == player_id
+
+    def game_is_over(self) -> bool:
+        return self.game_data.winner_id is not None
+
+    def to_dict(self, player_id=None) -> Dict:
+        """ As GameObject.to_dict. """
+        return self.game_data.to_dict(player_id=player_id, state=self)
+
+    def state_dict(self, player_id=None) -> Dict:
+        """ The "state" entry of to_dict, as built by the StateInterface of the current state. """
+        state = self.state
+        d = {"playerIdx": self.game_data.player_turn, "name": STATES[state].value}
+        if state == WAIT_ACTION or state == WAIT_BLOCK:
+            d["action"] = self.action.value
+            if self.target is not None:
+                d["target"] = self.target
+        elif state == WAIT_BLOCK_RESPONSE:
+            d["action"] = self.action.value
+            d["target"] = self.blocker
+            d["blockingRole"] = self.block_role.value
+        elif state == REVEAL:
+            if self.action != ActionEnum.NOP:
+                d["action"] = self.action.value
+            if self.target is not None:
+                d["target"] = self.target
+            d["playerToReveal"] = self.reveal_id
+        elif state == EXCHANGE:
+            d["action"] = ActionEnum.EXCHANGE.value
+            if player_id in [None, self.game_data.player_turn]:
+                d["exchangeOptions"] = tuple(o.value for o in self.exchange_options)
+        return d
+
+
+_OPERATIONS: Dict[int, List[Tuple[int, object]]] = {}
+
+
+def _operations(space: ActionSpace) -> List[Tuple[int, object]]:
+    """
+    (operation, argument) of each index of space. The argument is (action, target) for actions,
+    the role for blocks and reveals and the kept roles for exchanges.
+    """
+    operations = _OPERATIONS.get(space.n_players)
+    if operations is None:
+        operations = _OPERATIONS[space.n_players] = []
+        for command in space.decode:
+            if command.command == CommandEnum.ACTION:
+                operations.append((_ACTION_OPERATION[command.action], (command.action, command.target)))
+            else:
+                operations.append((_COMMAND_OPERATION[command.command], command.roles or command.role))
+    return operations
+
+
+# rule helpers
+
+def _allowed(m: Machine, player_id: int) -> bool:
+    return bool(m.allow & (1 << player_id))
+
+
+def _open_window(m: Machine, exempt: int) -> None:
+    m.allow = m.game_data.dead_mask | (1 << exempt)
+
+
+def _still_valid(m: Machine) -> bool:
+    action = m.action
+    if action == ActionEnum.NOP:
+        return True
+    data = m.game_data
+    if not data.player_alive(data.player_turn):
+        return False
+    return action != ActionEnum.ASSASSINATE or data.player_alive(m.target)
+
+
+def _can_be_blocked(m: Machine) -> bool:
+    if m.action == ActionEnum.F_AID:
+        return True
+    if m.action == ActionEnum.STEAL or m.action == ActionEnum.ASSASSINATE:
+        return m.game_data.player_alive(m.target)
+    return False
+
+
+def _next_turn(m: Machine) -> None:
+    m.game_data.next_turn()
+    m._clear()
+    m._enter(START_TURN)
+
+
+def _gain(amount: int):
+    def resolve(m: Machine) -> None:
+        m.game_data.active_player.addCash(amount)
+        _next_turn(m)
+    return resolve
+
+
+def _resolve_steal(m: Machine) -> None:
+    data = m.game_data
+    target = data.players[m.target]
+    amount = min(target.cash, STEAL_TRADE)
+    target.removeCash(amount)
+    data.active_player.addCash(amount)
+    _next_turn(m)
+
+
+def _resolve_attack(m: Machine) -> None:
+    _resolve_reveal(m, m.target, ActionEnum.NOP, None, False)
+
+
+def _resolve_exchange(m: Machine) -> None:
+    data = m.game_data
+    op1 = data.draw_card()
+    op2 = data.draw_card()
+    m.exchange_options = tuple([inf.role for inf in data.active_player.hand if not inf.revealed] + [op1, op2])
+    m.action = m.target = None
+    m._enter(EXCHANGE)
+
+
+_RESOLVE = {
+    ActionEnum.INCOME: _gain(INCOME_GAIN),
+    ActionEnum.F_AID: _gain(F_AID_GAIN),
+    ActionEnum.TAX: _gain(TAX_GAIN),
+    ActionEnum.STEAL: _resolve_steal,
+    ActionEnum.ASSASSINATE: _resolve_attack,
+    ActionEnum.COUP: _resolve_attack,
+    ActionEnum.EXCHANGE: _resolve_exchange,
+    ActionEnum.NOP: _next_turn,
+}
+
+
+def _resolve_reveal(m: Machine, player_id: int, action: ActionEnum, target: Optional[int], block_next: bool) -> None:
+    """ Same as mutiny.states.reveal.resolve_reveal, with the queued action given by action and target. """
+    m.action, m.target = action, target
+    influence_count = m.game_data.players[player_id].influence_count
+    if influence_count > 1:
+        m.reveal_id = player_id
+        m.block_next = block_next
+        m._enter(REVEAL)
+        return
+    if influence_count > 0:
+        m.game_data.reveal(player_id)
+    _after_reveal(m, block_next)
+
+
+def _after_reveal(m: Machine, block_next: bool) -> None:
+    if not _still_valid(m):
+        _next_turn(m)
+    elif block_next and _can_be_blocked(m):
+        _open_window(m, m.game_data.player_turn)
+        m._enter(WAIT_BLOCK)
+    else:
+        _RESOLVE[m.action](m)
+
+
+def _replace_claimed(m: Machine, player_id: int, role: RoleEnum) -> None:
+    """ A proven role is shuffled back into the deck and replaced by a new card. """
+    data = m.game_data
+    data.return_card(role)
+    data.shuffle_deck()
+    data.players[player_id].replace(role, data.draw_card())
+
+
+# guards: return an ErrorEnum when player_id may not apply the operation
+
+def _not_turn(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if player_id == m.game_data.player_turn:
+        return ErrorEnum.MUST_MOVE if m.state == START_TURN else ErrorEnum.MUST_REPLACE
+    return None
+
+
+def _may_act(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    data = m.game_data
+    if player_id != data.player_turn:
+        return ErrorEnum.NOT_TURN
+    if data.active_player.must_coup:
+        return ErrorEnum.MUST_COUP
+    return None
+
+
+def _target_error(m: Machine, target_id: int) -> Optional[ErrorEnum]:
+    if not m.game_data.player_alive(target_id):
+        return ErrorEnum.INVALID_TARGET
+    if m.game_data.player_turn == target_id:
+        return ErrorEnum.SELF_TARGET
+    return None
+
+
+def _may_steal(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    return _may_act(m, player_id, arg) or _target_error(m, arg[1])
+
+
+def _may_assassinate(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if (error := _may_act(m, player_id, arg)):
+        return error
+    if m.game_data.active_player.cash < ASSASSINATE_COST:
+        return ErrorEnum.CASH_ASSASSINATE
+    return _target_error(m, arg[1])
+
+
+def _may_coup(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    data = m.game_data
+    if player_id != data.player_turn:
+        return ErrorEnum.NOT_TURN
+    if data.active_player.cash < COUP_COST:
+        return ErrorEnum.CASH_COUP
+    return _target_error(m, arg[1])
+
+
+def _has_allowed(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if not _allowed(m, player_id):
+        return ErrorEnum.MUST_RESPOND if m.state == WAIT_ACTION else ErrorEnum.MUST_ALLOW_OR_CHALLENGE
+    return None
+
+
+def _must_answer(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if _allowed(m, player_id):
+        return ErrorEnum.ALREADY_ALLOWED
+    return None
+
+
+def _block_error(m: Machine, player_id: int, role: RoleEnum) -> Optional[ErrorEnum]:
+    if _allowed(m, player_id):
+        return ErrorEnum.ALREADY_ALLOWED
+    if role not in BLOCKING_ROLES[m.action]:
+        return ErrorEnum.WRONG_BLOCK_ROLE
+    if role != RoleEnum.DUKE and player_id != m.target:
+        return ErrorEnum.NOT_TARGET
+    return None
+
+
+def _may_block_action(m: Machine, player_id: int, role: RoleEnum) -> Optional[ErrorEnum]:
+    if not _can_be_blocked(m):
+        return ErrorEnum.NOT_BLOCKABLE
+    return _block_error(m, player_id, role)
+
+
+def _may_challenge_action(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if _allowed(m, player_id):
+        return ErrorEnum.ALREADY_ALLOWED
+    if m.action not in ACTION_ROLES:
+        return ErrorEnum.NOT_CHALLENGEABLE
+    return None
+
+
+def _may_pass_block(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if not _allowed(m, player_id) and (m.action == ActionEnum.F_AID or m.target == player_id):
+        return ErrorEnum.MUST_ALLOW_OR_BLOCK
+    return None
+
+
+def _not_revealing(m: Machine, player_id: int, arg) -> Optional[ErrorEnum]:
+    if player_id == m.reveal_id:
+        return ErrorEnum.MUST_REVEAL
+    return None
+
+
+def _may_reveal(m: Machine, player_id: int, role: RoleEnum) -> Optional[ErrorEnum]:
+    if player_id != m.reveal_id:
+        return ErrorEnum.WRONG_REVEAL_PLAYER
+    if not m.game_data.players[player_id].hasAliveInfluence(role):
+        return ErrorEnum.NO_INFLUENCE
+    return None
+
+
+def _may_keep(m: Machine, player_id: int, roles: Tuple[RoleEnum, ...]) -> Optional[ErrorEnum]:
+    if player_id != m.game_data.player_turn:
+        return ErrorEnum.WRONG_EXCHANGE_PLAYER
+    if len(roles) != m.game_data.active_player.influence_count:
+        return ErrorEnum.KEEP_COUNT
+    options = list(m.exchange_options)
+    for role in roles:
+        if role not in options:
+            return ErrorEnum.KEEP_ROLES
+        options.remove(role)
+    return None
+
+
+# effects
+
+def _queue(m: Machine, player_id: int, arg) -> None:
+    m.action, m.target = arg
+    _open_window(m, player_id)
+
+
+def _pay_and_queue(m: Machine, player_id: int, arg) -> None:
+    m.game_data.active_player.removeCash(ASSASSINATE_COST)
+    _queue(m, player_id, arg)
+
+
+def _income(m: Machine, player_id: int, arg) -> None:
+    m.action = ActionEnum.INCOME
+    _RESOLVE[ActionEnum.INCOME](m)
+
+
+def _coup(m: Machine, player_id: int, arg) -> None:
+    m.game_data.active_player.removeCash(COUP_COST)
+    _resolve_reveal(m, arg[1], ActionEnum.NOP, None, False)
+
+
+def _block(m: Machine, player_id: int, role: RoleEnum) -> None:
+    m.blocker = player_id
+    m.block_role = role
+    _open_window(m, player_id)
+
+
+def _challenge_action(m: Machine, player_id: int, arg) -> None:
+    data = m.game_data
+    role = ACTION_ROLES[m.action]
+    if data.active_player.hasAliveInfluence(role):
+        _replace_claimed(m, data.player_turn, role)
+        # the challenger loses an influence, then the action may still be blocked
+        _resolve_reveal(m, player_id, m.action, m.target, True)
+    else:
+        if m.action == ActionEnum.ASSASSINATE:
+            data.active_player.addCash(ASSASSINATE_COST)
+        _resolve_reveal(m, data.player_turn, ActionEnum.NOP, None, False)
+
+
+def _allow_action(m: Machine, player_id: int, arg) -> None:
+    m.allow |= 1 << player_id
+    if m.allow == m.game_data.all_mask:
+        _RESOLVE[m.action](m)
+
+
+def _allow_final(m: Machine, player_id: int, arg) -> None:
+    m.allow |= 1 << player_id
+    # targeted actions only require permission of the target after a challenge
+    if (m.target is not None and _allowed(m, m.target)) or m.allow == m.game_data.all_mask:
+        _RESOLVE[m.action](m)
+
+
+def _challenge_block(m: Machine, player_id: int, arg) -> None:
+    if m.game_data.players[m.blocker].hasAliveInfluence(m.block_role):
+        _replace_claimed(m, m.blocker, m.block_role)
+        _resolve_reveal(m, player_id, ActionEnum.NOP, None, False)
+    else:
+        _resolve_reveal(m, m.blocker, m.action, m.target, False)
+
+
+def _allow_block(m: Machine, player_id: int, arg) -> None:
+    m.allow |= 1 << player_id
+    if m.allow == m.game_data.all_mask:
+        # the action does not resolve
+        _next_turn(m)
+
+
+def _reveal(m: Machine, player_id: int, role: RoleEnum) -> None:
+    m.game_data.reveal(player_id, role)
+    _after_reveal(m, m.block_next)
+
+
+def _keep(m: Machine, player_id: int, roles: Tuple[RoleEnum, ...]) -> None:
+    data = m.game_data
+    player = data.active_player
+    returned = list(m.exchange_options)
+    for role in roles:
+        returned.remove(role)
+    # in canonical order, as Exchange._apply_replace
+    roles = sort_roles(roles)
+    new_hand = [player.hand[0], player.hand[1]]
+    j = len(roles) - 1
+    for i in range(2):
+        if not player.hand[i].revealed:
+            new_hand[i] = Influence(roles[j], False)
+            j -= 1
+    player.set_hand(tuple(new_hand))
+    for role in returned:
+        data.return_card(role)
+    data.shuffle_deck()
+    _next_turn(m)
+
+
+# state, operation: guard, effect, next state
+TRANSITIONS = {
+    (START_TURN, NOOP): (_not_turn, None, None),
+    (START_TURN, INCOME): (_may_act, _income, None),
+    (START_TURN, F_AID): (_may_act, _queue, WAIT_ACTION),
+    (START_TURN, TAX): (_may_act, _queue, WAIT_ACTION),
+    (START_TURN, EXCHANGE_ACTION): (_may_act, _queue, WAIT_ACTION),
+    (START_TURN, STEAL): (_may_steal, _queue, WAIT_ACTION),
+    (START_TURN, ASSASSINATE): (_may_assassinate, _pay_and_queue, WAIT_ACTION),
+    (START_TURN, COUP): (_may_coup, _coup, None),
+
+    (WAIT_ACTION, NOOP): (_has_allowed, None, None),
+    (WAIT_ACTION, BLOCK): (_may_block_action, _block, WAIT_BLOCK_RESPONSE),
+    (WAIT_ACTION, CHALLENGE): (_may_challenge_action, _challenge_action, None),
+    (WAIT_ACTION, ALLOW): (_must_answer, _allow_action, None),
+
+    (WAIT_BLOCK, NOOP): (_may_pass_block, None, None),
+    (WAIT_BLOCK, BLOCK): (_block_error, _block, WAIT_BLOCK_RESPONSE),
+    (WAIT_BLOCK, ALLOW): (_must_answer, _allow_final, None),
+
+    (WAIT_BLOCK_RESPONSE, NOOP): (_has_allowed, None, None),
+    (WAIT_BLOCK_RESPONSE, CHALLENGE): (_must_answer, _challenge_block, None),
+    (WAIT_BLOCK_RESPONSE, ALLOW): (_must_answer, _allow_block, None),
+
+    (REVEAL, NOOP): (_not_revealing, None, None),
+    (REVEAL, REVEAL_ROLE): (_may_reveal, _reveal, None),
+
+    (EXCHANGE, NOOP): (_not_turn, None, None),
+    (EXCHANGE, KEEP): (_may_keep, _keep, None),
+}
+
+
+def compile_transitions(transitions: Dict[Tuple[int, int], tuple]) -> List[Optional[tuple]]:
+    """ Flattens a transition table into a list indexed by state * N_OPERATIONS + operation. """
+    rules = [None] * (len(STATES) * N_OPERATIONS)
+    for (state, operation), (guard, effect, next_state) in transitions.items():
+        rules[state * N_OPERATIONS + operation] = (guard, effect, next_state)
+    return rules
+
+
+RULES = compile_transitions(TRANSITIONS)
@@ -0,0 +1,64 @@
+from mutiny.game_enum import ActionEnum, RoleEnum, StateEnum
+
+ROLE_INDEX = {role: i for i, role in enumerate(RoleEnum)}
+STATE_INDEX = {state: i for i, state in enumerate(StateEnum)}
+ACTION_INDEX = {action: i for i, action in enumerate(a for a in ActionEnum if a != ActionEnum.NOP)}
+
+INFLUENCE_SIZE = len(RoleEnum) + 1  # role one-hot (all zero when hidden), revealed flag
+PLAYER_SIZE = 1 + 2 * INFLUENCE_SIZE  # cash, two influences
+
+# see ObservationLayout.shared
+_SHARED = {}
+
+
+class ObservationLayout:
+    """
+    Offsets of the fields of the fixed-length observation of a game with n_players.
+    The observation holds the same information as GameObject.to_dict, hidden the same way.
+
+    players:          PLAYER_SIZE values per player: cash, then for each influence a role one-hot and a revealed flag
+    observer:         one-hot of the observing player (all zero for the full information view)
+    player_turn:      one-hot
+    state:            one-hot over StateEnum
+    action:           one-hot over ActionEnum (without NOP)
+    target:           one-hot over players
+    blocking_role:    one-hot over RoleEnum
+    player_to_reveal: one-hot over players
+    exchange_options: count of each role, only seen by the player exchanging
+    """
+
+    def __init__(self, n_players: int):
+        self.n_players = n_players
+        offset = 0
+        fields = (("players", n_players * PLAYER_SIZE),
+                  ("observer", n_players),
+                  ("player_turn", n_players),
+                  ("state", len(STATE_INDEX)),
+                  ("action", len(ACTION_INDEX)),
+                  ("target", n_players),
+                  ("blocking_role", len(ROLE_INDEX)),
+                  ("player_to_reveal", n_players),
+                  ("exchange_options", len(ROLE_INDEX)))
+        for name, size in fields:
+            setattr(self, name, offset)
+            offset += size
+        self.size = offset
+        self._zeros = (0,) * self.size
+
+    @classmethod
+    def shared(cls, n_players: int) -> "ObservationLayout":
+        """ The layout of n_players, built once and shared by every game of that size. """
+        layout = _SHARED.get((cls, n_players))
+        if layout is None:
+            layout = _SHARED[cls, n_players] = cls(n_players)
+        return layout
+
+    def __len__(self) -> int:
+        return self.size
+
+    def clear(self, out) -> None:
+        """ Zeroes a buffer, using fill when out is a NumPy array. """
+        if hasattr(out, "fill"):
+            out.fill(0)
+        else:
+            out[:self.size] = self._zeros
@@ -1,17 +1,22 @@
-from dataclasses import dataclass
-from typing import Tuple, Union, Dict
+from dataclasses import dataclass, field
+from typing import Tuple, Union, Dict, List
 
 from mutiny.exceptions import InvalidMove
 from mutiny.game_enum import RoleEnum
 from mutiny.constants import CASH_LIMIT, CASH_START
+from mutiny.frozen_dict import FrozenDict
+from mutiny.observation import ROLE_INDEX, INFLUENCE_SIZE
+from mutiny.slots import slotted
 
 
+@slotted
 @dataclass
 class Influence:
     role: RoleEnum
     revealed: bool = False
 
 
+@slotted
 @dataclass
 class Player:
     """
@@ -22,6 +27,12 @@ class Player:
     cash: int = CASH_START
     hand: Union[Tuple[Influence, Influence], None] = None
 
+    # for use with to_dict: (hidden, full) views and the (cash, hand) they were built from
+    _dict_cache_key: Tuple = field(default=None, init=False, repr=False, compare=False)
+    _dict_cache: Tuple[Dict, Dict] = field(default=None, init=False, repr=False, compare=False)
+    # undo journal shared with GameData, see GameData.set_journal
+    _journal: List = field(default=None, init=False, repr=False, compare=False)
+
     def reset(self) -> None:
         self.cash = CASH_START
         self.hand = None
@@ -31,14 +42,27 @@ class Player:
         #     raise RuntimeError("{} has already drawn a hand".format(self.name))
         self.hand = (Influence(hand[0]), Influence(hand[1]))
 
+    def snapshot(self) -> tuple:
+        """ Cash and hand as immutable values, see restore. """
+        h0, h1 = self.hand
+        return self.cash, h0.role, h0.revealed, h1.role, h1.revealed
+
+    def restore(self, snapshot: tuple) -> None:
+        self.cash, role0, revealed0, role1, revealed1 = snapshot
+        self.hand = (Influence(role0, revealed0), Influence(role1, revealed1))
+
     def addCash(self, cash: int):
         if self.must_coup:
             raise RuntimeError("{} already has {}+ coins".format(self.name, CASH_LIMIT))
+        if self._journal is not None:
+            self._journal.append((setattr, self, "cash", self.cash))
         self.cash += cash
 
     def removeCash(self, cash: int):
         if self.cash < cash:
             raise RuntimeError("{} has less than {} coins".format(self.name, cash))
+        if self._journal is not None:
+            self._journal.append((setattr, self, "cash", self.cash))
         self.cash -= cash
 
     def hasAliveInfluence(self, role: RoleEnum) -> bool:
@@ -46,19 +70,31 @@ class Player:
         if not self.hand[1].revealed and self.hand[1].role == role: return True
         return False
 
-    def reveal(self, role: Union[RoleEnum, None] = None) -> None:
-        """ Reveals left-to-right by default. """
+    def reveal(self, role: Union[RoleEnum, None] = None) -> RoleEnum:
+        """ Reveals left-to-right by default. Returns the role revealed. """
         if not self.hand[0].revealed and (role is None or self.hand[0].role == role):
-            self.hand[0].revealed = True
+            influence = self.hand[0]
         elif not self.hand[1].revealed and (role is None or self.hand[1].role == role):
-            self.hand[1].revealed = True
+            influence = self.hand[1]
         else:
             raise RuntimeError("{} does not have {}".format(self.name, role.value))
+        if self._journal is not None:
+            self._journal.append((setattr, influence, "revealed", False))
+        influence.revealed = True
+        return influence.role
 
     def replace(self, initial_role: RoleEnum, replacement_role: RoleEnum):
-        if not self.hand[0].revealed and initial_role == self.hand[0].role: self.hand[0].role = replacement_role
-        elif not self.hand[1].revealed and initial_role == self.hand[1].role: self.hand[1].role = replacement_role
+        if not self.hand[0].revealed and initial_role == self.hand[0].role: influence = self.hand[0]
+        elif not self.hand[1].revealed and initial_role == self.hand[1].role: influence = self.hand[1]
         else: raise RuntimeError("{} does not have {}".format(self.name, initial_role.value))
+        if self._journal is not None:
+            self._journal.append((setattr, influence, "role", influence.role))
+        influence.role = replacement_role
+
+    def set_hand(self, hand: Tuple[Influence, Influence]) -> None:
+        if self._journal is not None:
+            self._journal.append((setattr, self, "hand", self.hand))
+        self.hand = hand
 
     @property
     def must_coup(self) -> bool:
@@ -79,17 +115,38 @@ class Player:
 
     def to_dict(self, player_id=None) -> Dict:
         """
-        Returns a dictionary representing the view of this player from the perspecive of the player with player_id.
-        If player_id is self or None, give full information. Otherwise, hide hidden information.
+        Returns an immutable dictionary representing the view of this player from the perspecive of the player
+        with player_id. If player_id is self or None, give full information. Otherwise, hide hidden information.
+        Views are reused until the cash or hand of the player changes.
+        """
+        h0, h1 = self.hand
+        key = (self.cash, h0.role, h0.revealed, h1.role, h1.revealed)
+        if key != self._dict_cache_key:
+            self._dict_cache_key = key
+            self._dict_cache = tuple(
+                FrozenDict({
+                    "name": self.name,
+                    "cash": self.cash,
+                    "influence": tuple(
+                        FrozenDict({
+                            "role": inf.role.value if has_info or inf.revealed else "unknown",
+                            "revealed": inf.revealed
+                        })
+                        for inf in self.hand)
+                })
+                for has_info in (False, True))
+        return self._dict_cache[player_id is None or player_id == self.self_id]
+
+    def encode(self, out, offset: int, player_id=None) -> None:
+        """
+        Writes this player into a zeroed buffer at offset (see mutiny.observation), hiding information like to_dict.
         """
-        has_info = player_id in [None, self.self_id]
-        return {
-            "name": self.name,
-            "cash": self.cash,
-            "influence": [
-                {
-                    "role": inf.role.value if has_info or inf.revealed else "unknown",
-                    "revealed": inf.revealed
-                }
-                for inf in self.hand]
-        }
+        has_info = player_id is None or player_id == self.self_id
+        out[offset] = self.cash
+        offset += 1
+        for inf in self.hand:
+            if has_info or inf.revealed:
+                out[offset + ROLE_INDEX[inf.role]] = 1
+            if inf.revealed:
+                out[offset + INFLUENCE_SIZE - 1] = 1
+            offset += INFLUENCE_SIZE
@@ -0,0 +1,64 @@
+"""
+Built-in policies, callable as policy(game, player_id, rng) -> action index (see mutiny.runner).
+
+RandomPolicy samples among the legal commands of a player (GameObject.legal_actions), so it
+never issues an invalid move, and is the cheapest opponent for load tests. Only rng.random()
+is used, so rng may be a random.Random or a numpy.random.Generator.
+"""
+from bisect import bisect
+from itertools import accumulate, compress
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+from mutiny.action_space import ActionSpace
+from mutiny.game_enum import ActionEnum, CommandEnum
+from mutiny.game_object import GameObject
+
+
+class RandomPolicy:
+    """
+    Picks one of the legal commands of a player, uniformly, or in proportion to weights: a mapping
+    from ActionEnum (for actions) or CommandEnum (for other commands) to a relative weight, 1 when
+    missing. When every legal command has weight 0, they are picked uniformly.
+    """
+    __slots__ = ("weights", "_index_weights")
+
+    def __init__(self, weights: Optional[Mapping[Union[ActionEnum, CommandEnum], float]] = None):
+        self.weights = dict(weights) if weights else None
+        # weight of each index, by size of the action space
+        self._index_weights: Dict[int, List[float]] = {}
+
+    def __call__(self, game: GameObject, player_id: int, rng) -> int:
+        return self.sample(game.legal_actions(player_id), rng, game.action_space)
+
+    def sample(self, mask: Sequence[bool], rng, space: Optional[ActionSpace] = None) -> int:
+        """ One of the indices set in mask, a legal mask over space (needed with weights). """
+        indices = list(compress(range(len(mask)), mask))
+        if len(indices) == 1:
+            return indices[0]
+        if self.weights is not None:
+            weights = self._weights(space)
+            cumulative = list(accumulate(weights[i] for i in indices))
+            if cumulative[-1] > 0:
+                return indices[min(bisect(cumulative, rng.random() * cumulative[-1]), len(indices) - 1)]
+        return indices[int(rng.random() * len(indices))]
+
+    def sample_pending(self, game: GameObject, rng) -> Dict[int, int]:
+        """
+        A command for every player who must act on the current state (see GameObject.pending_decisions),
+        e.g. for GameObject.step_index with the current state id, or for MutinyEnv.step.
+        """
+        space = game.action_space
+        return {player_id: self.sample(game.legal_actions(player_id), rng, space)
+                for player_id in game.pending_decisions()}
+
+    def _weights(self, space: ActionSpace) -> List[float]:
+        weights = self._index_weights.get(space.size)
+        if weights is None:
+            weights = self._index_weights[space.size] = [
+                self.weights.get(command.action if command.command == CommandEnum.ACTION else command.command, 1.0)
+                for command in space.decode]
+        return weights
+
+
+# uniform over the legal commands
+random_policy = RandomPolicy()
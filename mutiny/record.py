@@ -0,0 +1,161 @@
+"""
+Compact binary logs of games, for offline learning.
+
+A log starts with MAGIC and holds a sequence of games. Each game is a game record
+followed by one step record per command applied to it:
+
+    game: b"G", player count (uint8), for each player a name (uint8 length, utf-8),
+          seed (32 bytes, big endian)
+    step: b"S", player id (uint8), action index (uint16), state id (uint32)
+
+Action indices are those of mutiny.action_space.ActionSpace. A game is replayed by
+seeding a new GameObject and issuing its steps again, see Trajectory.replay.
+"""
+from random import SystemRandom
+from struct import Struct
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from mutiny.game_object import GameObject
+
+MAGIC = b"MUTINY\x00\x01"
+GAME_TAG = b"G"
+STEP_TAG = b"S"
+SEED_BYTES = 32
+
+_STEP = Struct("<BHI")
+
+
+class Step(NamedTuple):
+    player_id: int
+    action_idx: int
+    state_id: int
+
+
+class Trajectory(NamedTuple):
+    player_names: Tuple[str, ...]
+    seed: int
+    steps: List[Step]
+
+    def replay(self, n_steps: Optional[int] = None) -> GameObject:
+        """ Rebuilds the game after its first n_steps steps, by default after all of them. """
+        game = GameObject(list(self.player_names), seed=self.seed)
+        for step in self.steps[:n_steps]:
+            check_step(game, step)
+            game.step_index(step.player_id, step.action_idx)
+        return game
+
+
+def check_step(game: GameObject, step: Step) -> None:
+    """ Raises RuntimeError when step was not recorded on the current state of game. """
+    if game.get_state_id() != step.state_id:
+        raise RuntimeError("Step at state {} does not match the replayed game at state {}"
+                           .format(step.state_id, game.get_state_id()))
+
+
+class TrajectoryWriter:
+    """
+    Appends games to a log, through a buffer of buffer_size bytes. Games are started with
+    start_game, after which every command applied to them is recorded, until the game is reset,
+    restored or undone (the log keeps the commands up to then, which still replay).
+    """
+
+    def __init__(self, file: Union[str, BinaryIO], buffer_size: int = 1 << 16):
+        if isinstance(file, str):
+            self._file = open(file, "wb", buffering=buffer_size)
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._file.write(MAGIC)
+        self._game: Optional[GameObject] = None
+
+    def start_game(self, player_names: List[str], seed: Optional[int] = None) -> GameObject:
+        """
+        Returns a new game recorded to this log, and stops recording the previous one.
+        seed must fit in SEED_BYTES; a random one is drawn when it is None.
+        """
+        if seed is None:
+            seed = SystemRandom().getrandbits(8 * SEED_BYTES)
+        if not 0 <= seed < 1 << (8 * SEED_BYTES):
+            raise ValueError("Seed must be a non-negative integer of at most {} bytes".format(SEED_BYTES))
+        record = bytearray(GAME_TAG)
+        record.append(len(player_names))
+        for name in player_names:
+            encoded = name.encode("utf-8")
+            record.append(len(encoded))
+            record += encoded
+        record += seed.to_bytes(SEED_BYTES, "big")
+        self._file.write(record)
+
+        if self._game is not None:
+            self._game.recorder = None
+        self._game = GameObject(player_names, seed=seed)
+        self._game.recorder = self._record
+        return self._game
+
+    def _record(self, player_id: int, state_id: int, action_idx: int) -> None:
+        self._file.write(STEP_TAG + _STEP.pack(player_id, action_idx, state_id))
+
+    def close(self) -> None:
+        if self._game is not None:
+            self._game.recorder = None
+            self._game = None
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TrajectoryReader:
+    """ Iterates over the games of a log one at a time, so memory is bounded by the longest game. """
+
+    def __init__(self, file: Union[str, BinaryIO], buffer_size: int = 1 << 16):
+        if isinstance(file, str):
+            self._file = open(file, "rb", buffering=buffer_size)
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a mutiny trajectory log")
+
+    def __iter__(self) -> Iterator[Trajectory]:
+        read = self._file.read
+        trajectory = None
+        while tag := read(1):
+            if tag == STEP_TAG:
+                if trajectory is None:
+                    raise ValueError("Step recorded before any game")
+                trajectory.steps.append(Step._make(_STEP.unpack(self._read_exactly(_STEP.size))))
+            elif tag == GAME_TAG:
+                if trajectory is not None:
+                    yield trajectory
+                names = tuple(self._read_exactly(self._read_exactly(1)[0]).decode("utf-8")
+                              for _ in range(self._read_exactly(1)[0]))
+                trajectory = Trajectory(names, int.from_bytes(self._read_exactly(SEED_BYTES), "big"), [])
+            else:
+                raise ValueError("Unknown record {!r}".format(tag))
+        if trajectory is not None:
+            yield trajectory
+
+    def _read_exactly(self, size: int) -> bytes:
+        data = self._file.read(size)
+        if len(data) != size:
+            raise ValueError("Log ends in the middle of a record")
+        return data
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self) -> "TrajectoryReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,16 @@
+from hashlib import sha256
+from random import Random
+from typing import List
+
+
+def stream_seed(root_seed: int, stream: int) -> int:
+    """
+    Seed of the stream-th generator derived from root_seed. Seeds of different streams are
+    unrelated hashes, so the generators built from them do not overlap or correlate.
+    """
+    return int.from_bytes(sha256(b"mutiny:%d:%d" % (root_seed, stream)).digest(), "big")
+
+
+def spawn(root_seed: int, n: int, start: int = 0) -> List[Random]:
+    """ Generators for streams start to start + n of root_seed, e.g. one per worker or per game. """
+    return [Random(stream_seed(root_seed, stream)) for stream in range(start, start + n)]
@@ -0,0 +1,244 @@
+"""
+Self-play across processes, with statistics streamed back as games finish.
+
+run plays n_games, split into chunks of games handed to a process pool. Each worker sends
+back one Stats per chunk, which the parent adds to the running totals (see iter_run), so
+memory does not grow with the number of games.
+
+Game i is dealt from stream 2i of the seed and its policies draw from stream 2i + 1 (see
+mutiny.rng), so the same seed plays the same games whatever the number of workers.
+
+A policy is a callable policy(game, player_id, rng) -> action index, asked for the command of
+player_id whenever it is one of game.pending_decisions(). When several players are pending,
+one of them is drawn at random to act first, so seats share the first answer to a window. run takes one policy for every seat
+or a list with one per seat. Policies are sent to the workers, so they must be picklable,
+e.g. functions defined at module level.
+
+From the command line:
+
+    python -m mutiny.runner --games 10000 --players 6 --workers 8 --seed 0 [--json]
+
+where --policy module:function (once, or once per seat) replaces the default, mutiny.policy.random_policy.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from mutiny.exceptions import InvalidMove
+from mutiny.game_enum import CommandEnum
+from mutiny.game_object import GameObject, player_names
+from mutiny.policy import random_policy
+from mutiny.rng import spawn
+
+Policy = Callable[[GameObject, int, random.Random], int]
+
+# commands issued to one game before it is considered stuck
+MAX_STEPS = 10 ** 5
+
+
+def command_names(game: GameObject) -> List[str]:
+    """ Name of each index of the action space of game: the action for actions, the command otherwise. """
+    return [command.action.value if command.command == CommandEnum.ACTION else command.command.value
+            for command in game.action_space.decode]
+
+
+class Stats:
+    """
+    Totals over played games: commands applied (steps) and refused (invalid), wins by seat,
+    commands by name (see command_names) and the time spent playing. Add with +=.
+    """
+    __slots__ = ("n_players", "games", "steps", "invalid", "seconds", "wins", "commands")
+
+    def __init__(self, n_players: int):
+        self.n_players = n_players
+        self.games = 0
+        self.steps = 0
+        self.invalid = 0
+        self.seconds = 0.0
+        self.wins = [0] * n_players
+        self.commands: Dict[str, int] = {}
+
+    def __iadd__(self, other: "Stats") -> "Stats":
+        self.games += other.games
+        self.steps += other.steps
+        self.invalid += other.invalid
+        self.seconds += other.seconds
+        for seat, wins in enumerate(other.wins):
+            self.wins[seat] += wins
+        for name, count in other.commands.items():
+            self.commands[name] = self.commands.get(name, 0) + count
+        return self
+
+    def __eq__(self, other) -> bool:
+        """ Equal totals, regardless of time. """
+        if not isinstance(other, Stats):
+            return NotImplemented
+        return ((self.n_players, self.games, self.steps, self.invalid, self.wins, self.commands) ==
+                (other.n_players, other.games, other.steps, other.invalid, other.wins, other.commands))
+
+    def summary(self, elapsed: Optional[float] = None) -> Dict:
+        """
+        Rates derived from the totals. elapsed is the wall-clock time of the run, by default the
+        time spent playing (which, with several workers, is the sum over workers).
+        """
+        elapsed = self.seconds if elapsed is None else elapsed
+        games = max(self.games, 1)
+        steps = max(self.steps, 1)
+        return {
+            "games": self.games,
+            "seconds": elapsed,
+            "games_per_second": self.games / elapsed if elapsed else None,
+            "steps_per_second": self.steps / elapsed if elapsed else None,
+            "steps_per_game": self.steps / games,
+            "win_rate": [wins / games for wins in self.wins],
+            "command_frequency": {name: count / steps for name, count in sorted(self.commands.items())},
+            "challenges_per_game": self.commands.get(CommandEnum.CHALLENGE.value, 0) / games,
+            "invalid_moves": self.invalid,
+            "invalid_per_game": self.invalid / games,
+        }
+
+
+def play_games(first: int, count: int, n_players: int, policies: Sequence[Policy], seed: int,
+               trusted: bool = False) -> Stats:
+    """
+    Plays games first to first + count - 1 of seed and returns their Stats. With trusted, commands
+    are issued with GameObject.step_trusted, so policies must only return legal commands.
+    """
+    stats = Stats(n_players)
+    names = None
+    counts = None
+    start = time.perf_counter()
+    for i in range(first, first + count):
+        game_rng, policy_rng = spawn(seed, 2, 2 * i)
+        game = GameObject(player_names(n_players), seed=game_rng)
+        if names is None:
+            names = command_names(game)
+            counts = [0] * len(names)
+        step = game.step_trusted if trusted else game.step_index
+        steps = invalid = 0
+        while not game.game_is_over():
+            # a random pending player acts, so that no seat answers a window before the others
+            player_id = policy_rng.choice(game.pending_decisions())
+            action_idx = policies[player_id](game, player_id, policy_rng)
+            try:
+                step(player_id, action_idx)
+            except InvalidMove:
+                invalid += 1
+            else:
+                counts[action_idx] += 1
+                steps += 1
+            if steps + invalid > MAX_STEPS:
+                raise RuntimeError("Game {} of seed {} did not end after {} commands".format(i, seed, MAX_STEPS))
+        stats.games += 1
+        stats.steps += steps
+        stats.invalid += invalid
+        stats.wins[game.game_data.winner_id] += 1
+    stats.seconds = time.perf_counter() - start
+    for name, count in zip(names or (), counts or ()):
+        if count:
+            stats.commands[name] = stats.commands.get(name, 0) + count
+    return stats
+
+
+def _play_chunk(args) -> Stats:
+    return play_games(*args)
+
+
+def iter_run(n_games: int, n_players: int = 6, policies: Union[Policy, Sequence[Policy]] = random_policy,
+             workers: Optional[int] = None, seed: int = 0, chunk_size: int = 100,
+             trusted: bool = False) -> Iterator[Stats]:
+    """
+    Plays n_games, yielding the running totals each time a chunk of chunk_size games finishes.
+    workers defaults to the number of CPUs; with 1 (or 0), games are played in this process.
+    """
+    if callable(policies):
+        policies = [policies] * n_players
+    elif len(policies) != n_players:
+        raise ValueError("Expected one policy per seat, got {} for {} players".format(len(policies), n_players))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = ((first, min(chunk_size, n_games - first), n_players, list(policies), seed, trusted)
+              for first in range(0, n_games, chunk_size))
+    total = Stats(n_players)
+    if workers <= 1:
+        for chunk in chunks:
+            total += _play_chunk(chunk)
+            yield total
+        return
+    with Pool(max(1, min(workers, -(-n_games // chunk_size)))) as pool:
+        for stats in pool.imap_unordered(_play_chunk, chunks):
+            total += stats
+            yield total
+
+
+def run(n_games: int, n_players: int = 6, policies: Union[Policy, Sequence[Policy]] = random_policy,
+        workers: Optional[int] = None, seed: int = 0, chunk_size: int = 100, trusted: bool = False) -> Dict:
+    """ Plays n_games as iter_run and returns the summary of the totals, timed by the wall clock. """
+    start = time.perf_counter()
+    total = Stats(n_players)
+    for total in iter_run(n_games, n_players, policies, workers, seed, chunk_size, trusted):
+        pass
+    return total.summary(time.perf_counter() - start)
+
+
+def load_policy(name: str) -> Policy:
+    """ The policy named module:function. """
+    module, _, function = name.partition(":")
+    if not function:
+        raise ValueError("Policy must be given as module:function, got {}".format(name))
+    return getattr(importlib.import_module(module), function)
+
+
+def _print_summary(summary: Dict, out) -> None:
+    print("{games} games in {seconds:.2f}s: {games_per_second:.1f} games/s, {steps_per_second:.0f} steps/s, "
+          "{steps_per_game:.1f} steps/game".format(**summary), file=out)
+    print("win rate by seat: " + " ".join("{:.3f}".format(rate) for rate in summary["win_rate"]), file=out)
+    print("challenges/game: {:.2f}, invalid moves: {}".format(summary["challenges_per_game"],
+                                                              summary["invalid_moves"]), file=out)
+    for name, frequency in summary["command_frequency"].items():
+        print("  {:<16} {:.4f}".format(name, frequency), file=out)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(prog="python -m mutiny.runner", description="Self-play on every core.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=None, help="root seed (default: random)")
+    parser.add_argument("--chunk-size", type=int, default=100, help="games per task sent to a worker")
+    parser.add_argument("--policy", action="append", default=None,
+                        help="module:function, once for every seat or once per seat")
+    parser.add_argument("--trusted", action="store_true", help="skip validation (policies must be legal)")
+    parser.add_argument("--progress", action="store_true", help="print running totals to stderr")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    seed = random.randrange(2 ** 64) if args.seed is None else args.seed
+    policies = [load_policy(name) for name in args.policy] if args.policy else [random_policy]
+    if len(policies) == 1:
+        policies = policies[0]
+
+    start = time.perf_counter()
+    total = Stats(args.players)
+    for total in iter_run(args.games, args.players, policies, args.workers, seed, args.chunk_size, args.trusted):
+        if args.progress:
+            elapsed = time.perf_counter() - start
+            print("{} games, {:.1f} games/s".format(total.games, total.games / elapsed), file=sys.stderr)
+    summary = total.summary(time.perf_counter() - start)
+    summary["seed"] = seed
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        _print_summary(summary, sys.stdout)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+__slots__ for dataclasses, like dataclass(slots=True) on Python 3.10 and later.
+"""
+from dataclasses import MISSING, fields
+from functools import wraps
+
+
+def slotted(cls):
+    """
+    Class decorator, applied over @dataclass: rebuilds cls with a slot per field, so that
+    instances have no __dict__. Methods of cls must not use the zero-argument form of super().
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = names
+    for name in names + ("__dict__", "__weakref__"):
+        # drop the defaults, which the generated __init__ already holds, and the descriptors slots replace
+        namespace.pop(name, None)
+
+    # the generated __init__ leaves fields with init=False and a plain default to the class attribute
+    late = tuple((f.name, f.default) for f in fields(cls) if not f.init and f.default is not MISSING)
+    if late:
+        init = cls.__init__
+
+        @wraps(init)
+        def __init__(self, *args, **kwargs):
+            for name, default in late:
+                setattr(self, name, default)
+            init(self, *args, **kwargs)
+        namespace["__init__"] = __init__
+
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
@@ -1,22 +1,46 @@
 from abc import ABC, abstractmethod
-from typing import Union, Tuple, Dict, Optional
+from typing import Union, Tuple, Dict, Optional, List
 
 # from mutiny.actions import QueuedAction
 from mutiny.game_data import GameData
 from mutiny.game_enum import StateEnum, RoleEnum
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.observation import STATE_INDEX
 
-INVALID_TRANSITION = "Cannot %s on %s"
 
 class StateInterface(ABC):
     """ Superclass for ways that GameData can be modified.
     Extend this class to implement game logic. All methods
     that modify game data return a (possibly new) StateInterface
     that wraps it. Essentially a state machine. """
+    __slots__ = ("_data",)
 
     def __init__(self, *, data: GameData):
         self._data = data
         self._data.state_id += 1
+        if data.instrument is not None:
+            data.instrument.on_state(self.state_name)
+
+    def snapshot(self) -> tuple:
+        """ Immutable description of this state (but not of its GameData), see restore. """
+        return type(self), self._snapshot_fields()
+
+    def _snapshot_fields(self) -> tuple:
+        """ Override to return the fields needed by _restore_fields, as immutable values. """
+        return ()
+
+    def _restore_fields(self, fields: tuple) -> None:
+        """ Override to set the fields returned by _snapshot_fields. """
+        pass
+
+    @staticmethod
+    def restore(data: GameData, snapshot: tuple) -> "StateInterface":
+        """ Rebuilds a state wrapping data from snapshot. Unlike the constructor, does not advance the state id. """
+        cls, fields = snapshot
+        state = cls.__new__(cls)
+        state._data = data
+        state._restore_fields(fields)
+        return state
 
     @property
     def state_id(self) -> int:
@@ -49,101 +73,168 @@ class StateInterface(ABC):
         """ This is necessary because target is overloaded to include the blocker for foreign aid. """
         return None
 
-    def to_dict(self, player_id=None) -> Dict:
+    def state_dict(self, player_id=None) -> Dict:
         """
-        Override and use super().to_dict to fill out remaining info in state dictionary (as it would appear in Treason).
+        Override and use super().state_dict to fill out remaining info in state dictionary (as it would appear in Treason).
         player_id indicates what player is "asking for" the information. Information should be hidden accordingly.
         When player_id is None, all info should be provided.
         Fields to possibly be filled out in implementations include: [action, target, blockingRole, exchangeOptions, playerToReveal]
         """
-        d = self._data.to_dict(player_id=player_id)
-        d["state"] = {
+        return {
             "playerIdx": self._data.player_turn,
             "name": self.state_name.value
         }
-        return d
+
+    def to_dict(self, player_id=None) -> Dict:
+        """
+        Returns the game as seen by player_id, with the state dictionary under "state".
+        The result is immutable and shared between callers.
+        """
+        return self._data.to_dict(player_id=player_id, state=self)
+
+    def encode(self, out, layout, player_id=None) -> None:
+        """
+        Override and use super().encode to write the same information as to_dict into out,
+        a buffer laid out by layout (an ObservationLayout). out must be zeroed.
+        """
+        self._data.encode(out, layout, player_id)
+        out[layout.state + STATE_INDEX[self.state_name]] = 1
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        """
+        Override to set mask[i] to True for every index i of space (an ActionSpace) that player_id may issue.
+        Must agree with the error_on_* methods, but without building any error message.
+        """
+        pass
+
+    def pending_decisions(self) -> List[int]:
+        """ Override to return the players who must issue a command other than noop before the state can change. """
+        return []
 
     def reset(self) -> "StateInterface":
         import mutiny.states.player_turn
         self._data.reset()
         return mutiny.states.player_turn.PlayerTurn(data=self._data)
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("noop", self.state_name)
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def noop(self, player_id: int) -> "StateInterface":
         """ For Benedict (The AI). """
-        raise InvalidMove(self.error_on_noop(player_id))
+        raise InvalidMove(self.error_on_noop(player_id), player_id, self.state_name, "noop")
 
-    def error_on_income(self, player_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("income", self.state_name)
+    def error_on_income(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def income(self, player_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_income(player_id))
+        raise InvalidMove(self.error_on_income(player_id), player_id, self.state_name, "income")
 
-    def error_on_f_aid(self, player_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("foreign aid", self.state_name)
+    def error_on_f_aid(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def f_aid(self, player_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_f_aid(player_id))
+        raise InvalidMove(self.error_on_f_aid(player_id), player_id, self.state_name, "foreign aid")
 
-    def error_on_tax(self, player_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("tax", self.state_name)
+    def error_on_tax(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def tax(self, player_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_tax(player_id))
+        raise InvalidMove(self.error_on_tax(player_id), player_id, self.state_name, "tax")
 
-    def error_on_assassinate(self, player_id: int, target_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("assassinate", self.state_name)
+    def error_on_assassinate(self, player_id: int, target_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def assassinate(self, player_id: int, target_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_assassinate(player_id, target_id))
+        raise InvalidMove(self.error_on_assassinate(player_id, target_id), player_id, self.state_name, "assassinate")
 
-    def error_on_steal(self, player_id: int, target_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("steal", self.state_name)
+    def error_on_steal(self, player_id: int, target_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def steal(self, player_id: int, target_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_steal(player_id, target_id))
+        raise InvalidMove(self.error_on_steal(player_id, target_id), player_id, self.state_name, "steal")
 
-    def error_on_coup(self, player_id: int, target_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("coup", self.state_name)
+    def error_on_coup(self, player_id: int, target_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def coup(self, player_id: int, target_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_coup(player_id, target_id))
+        raise InvalidMove(self.error_on_coup(player_id, target_id), player_id, self.state_name, "coup")
 
-    def error_on_exchange(self, player_id: int) -> "StateInterface":
-        return INVALID_TRANSITION % ("exchange", self.state_name)
+    def error_on_exchange(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def exchange(self, player_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_exchange(player_id))
+        raise InvalidMove(self.error_on_exchange(player_id), player_id, self.state_name, "exchange")
 
-    def error_on_challenge(self, player_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("challenge", self.state_name)
+    def error_on_challenge(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def challenge(self, player_id: int) -> "StateInterface":
-        raise InvalidMove(self.error_on_challenge(player_id))
+        raise InvalidMove(self.error_on_challenge(player_id), player_id, self.state_name, "challenge")
 
-    def error_on_block(self, player_id: int, blocking_role: RoleEnum) -> Union[None, str]:
-        return INVALID_TRANSITION % ("block", self.state_name)
+    def error_on_block(self, player_id: int, blocking_role: RoleEnum) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def block(self, player_id: int, blocking_role: RoleEnum) -> "StateInterface":
-        raise InvalidMove(self.error_on_block(player_id, blocking_role))
+        raise InvalidMove(self.error_on_block(player_id, blocking_role), player_id, self.state_name, "block")
 
-    def error_on_allow(self, player_id: int) -> Union[None, str]:
-        return INVALID_TRANSITION % ("allow", self.state_name)
+    def error_on_allow(self, player_id: int) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def allow(self, player_id: int) -> "StateInterface":
         """ Any form of synchronization should be performed outside of this class. """
-        raise InvalidMove(self.error_on_allow(player_id))
+        raise InvalidMove(self.error_on_allow(player_id), player_id, self.state_name, "allow")
 
-    def error_on_reveal(self, player_id: int, influence: RoleEnum) -> Union[None, str]:
-        return INVALID_TRANSITION % ("reveal", self.state_name)
+    def error_on_reveal(self, player_id: int, influence: RoleEnum) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def reveal(self, player_id: int, influence: RoleEnum) -> "StateInterface":
-        raise InvalidMove(self.error_on_reveal(player_id, influence))
+        raise InvalidMove(self.error_on_reveal(player_id, influence), player_id, self.state_name, "reveal")
 
-    def error_on_replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum, None]]) -> Union[None, str]:
-        return INVALID_TRANSITION % ("replace", self.state_name)
+    def error_on_replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum, None]]) -> Optional[ErrorEnum]:
+        return ErrorEnum.INVALID_TRANSITION
 
     def replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum, None]]) -> "StateInterface":
-        raise InvalidMove(self.error_on_replace(player_id, influences))
+        raise InvalidMove(self.error_on_replace(player_id, influences), player_id, self.state_name, "replace")
+
+    # Commands without validation, used by GameObject.step_trusted. States override _apply_<command>
+    # for the commands they accept, <command> checking error_on_<command> before calling it.
+    # Otherwise the checked command is issued, so that commands a state never accepts still raise.
+
+    def _apply_noop(self, player_id: int) -> "StateInterface":
+        return self.noop(player_id)
+
+    def _apply_income(self, player_id: int) -> "StateInterface":
+        return self.income(player_id)
+
+    def _apply_f_aid(self, player_id: int) -> "StateInterface":
+        return self.f_aid(player_id)
+
+    def _apply_tax(self, player_id: int) -> "StateInterface":
+        return self.tax(player_id)
+
+    def _apply_assassinate(self, player_id: int, target_id: int) -> "StateInterface":
+        return self.assassinate(player_id, target_id)
+
+    def _apply_steal(self, player_id: int, target_id: int) -> "StateInterface":
+        return self.steal(player_id, target_id)
+
+    def _apply_coup(self, player_id: int, target_id: int) -> "StateInterface":
+        return self.coup(player_id, target_id)
+
+    def _apply_exchange(self, player_id: int) -> "StateInterface":
+        return self.exchange(player_id)
+
+    def _apply_challenge(self, player_id: int) -> "StateInterface":
+        return self.challenge(player_id)
+
+    def _apply_block(self, player_id: int, blocking_role: RoleEnum) -> "StateInterface":
+        return self.block(player_id, blocking_role)
+
+    def _apply_allow(self, player_id: int) -> "StateInterface":
+        return self.allow(player_id)
+
+    def _apply_reveal(self, player_id: int, influence: RoleEnum) -> "StateInterface":
+        return self.reveal(player_id, influence)
+
+    def _apply_replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum, None]]) -> "StateInterface":
+        return self.replace(player_id, influences)
@@ -1,17 +1,23 @@
-from typing import Tuple, Dict, Union, Optional
+from itertools import combinations
+from typing import Tuple, Dict, Union, Optional, List
 
 import mutiny.actions
+from mutiny.action_space import sort_roles
+import mutiny.states.player_turn
 from mutiny.player import Influence
 from mutiny.game_enum import StateEnum, ActionEnum, RoleEnum
 from mutiny.game_data import GameData
 from mutiny.state_interface import StateInterface
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.observation import ACTION_INDEX, ROLE_INDEX
+from mutiny.events import Exchanged
 
 
 class Exchange(StateInterface):
     """
     Exchange state: only valid thing to happen is for the player whose turn it is to exchange their cards
     """
+    __slots__ = ("exchange_options",)
 
     def __init__(self, *,
                  data: GameData,
@@ -19,6 +25,12 @@ class Exchange(StateInterface):
         super().__init__(data=data)
         self.exchange_options = exchange_options
 
+    def _snapshot_fields(self) -> tuple:
+        return self.exchange_options
+
+    def _restore_fields(self, fields: tuple) -> None:
+        self.exchange_options = fields
+
     @property
     def state_name(self) -> StateEnum:
         return StateEnum.EXCHANGE
@@ -27,47 +39,66 @@ class Exchange(StateInterface):
     def exchanges(self) -> Tuple[RoleEnum, RoleEnum]:
         return self.exchange_options
 
-    def to_dict(self, player_id=None) -> Dict:
-        d = super().to_dict(player_id)
-        d["state"]["action"] = ActionEnum.EXCHANGE.value
+    def state_dict(self, player_id=None) -> Dict:
+        d = super().state_dict(player_id)
+        d["action"] = ActionEnum.EXCHANGE.value
         if player_id in [None, self._data.player_turn]:
-            d["state"]["exchangeOptions"] = [o.value for o in self.exchange_options]
+            d["exchangeOptions"] = tuple(o.value for o in self.exchange_options)
         return d
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
+    def encode(self, out, layout, player_id=None) -> None:
+        super().encode(out, layout, player_id)
+        out[layout.action + ACTION_INDEX[ActionEnum.EXCHANGE]] = 1
+        if player_id in [None, self._data.player_turn]:
+            for role in self.exchange_options:
+                out[layout.exchange_options + ROLE_INDEX[role]] += 1
+
+    def pending_decisions(self) -> List[int]:
+        return [self._data.player_turn]
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        if player_id != self._data.player_turn:
+            mask[space.noop] = True
+            return
+        for roles in combinations(self.exchange_options, self._data.active_player.influence_count):
+            mask[space.replace_index(roles)] = True
+
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
         if player_id == self._data.player_turn:
-            return f"Player {player_id} must replace on {self.state_name}"
+            return ErrorEnum.MUST_REPLACE
         return None
 
     def noop(self, player_id: int) -> StateInterface:
         if (error := self.error_on_noop(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
         return self
 
-    def error_on_replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum]]) -> Union[None, str]:
+    def error_on_replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum]]) -> Optional[ErrorEnum]:
         if player_id != self._data.player_turn:
-            return "Wrong player to exchange"
+            return ErrorEnum.WRONG_EXCHANGE_PLAYER
 
         player = self._data.active_player
 
         # check that the player is trying to keep the correct number of cards (maintain influence count)
         cards_to_keep = [role for role in influences]
         if len(cards_to_keep) != player.influence_count:
-            return "Player can only keep as many cards as influence they have."
+            return ErrorEnum.KEEP_COUNT
 
         # check influences to keep are valid (in the player's hand or in the player's exchange options)
         cards_can_keep = [role for role in self.exchange_options]
         for role in cards_to_keep:
             if role not in cards_can_keep:
-                return "Exchange attempt invalid due to role choice."
+                return ErrorEnum.KEEP_ROLES
             cards_can_keep.remove(role)
 
         return None
 
     def replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum]]) -> StateInterface:
         if (error := self.error_on_replace(player_id, influences)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, influences)
+        return self._apply_replace(player_id, influences)
 
+    def _apply_replace(self, player_id: int, influences: Tuple[RoleEnum, Union[RoleEnum]]) -> StateInterface:
         player = self._data.active_player
 
         cards_to_keep = [role for role in influences]
@@ -79,15 +110,20 @@ class Exchange(StateInterface):
         removed_cards = cards_can_keep # the cards the player chose not to keep
 
         # do the actual exchange; put the cards in the hand and shuffle the other cards back into the deck
+        # the kept cards go to the hand in canonical order, so that the hand does not depend on the order given
+        influences = sort_roles(influences)
         new_hand = [player.hand[i] for i in range(2)]
         j = len(influences)-1
         for i in range(2):
             if not player.hand[i].revealed:
                 new_hand[i] = Influence(influences[j], False)
                 j -= 1
-        player.hand = tuple(new_hand)
+        player.set_hand(tuple(new_hand))
 
-        self._data.deck += removed_cards
+        for role in removed_cards:
+            self._data.return_card(role)
         self._data.shuffle_deck()
+        if self._data.events is not None:
+            self._data.events.emit(Exchanged(self._data.state_id, player_id))
 
-        return mutiny.actions.NoOp(self._data).resolve()
+        return mutiny.states.player_turn.next_turn(self._data)
@@ -1,14 +1,42 @@
-from typing import Union
+from typing import List, Optional
 
+from mutiny.action_space import UNTARGETED_ACTIONS
 from mutiny.state_interface import StateInterface
 from mutiny.actions import ForeignAid, Income, Coup, Steal, Tax, Assassinate, Exchange
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
 from mutiny.game_enum import StateEnum, ActionEnum
+from mutiny.game_data import GameData
 from mutiny.states.wait_for_action_response import WaitForActionResponse
 from mutiny.constants import COUP_COST, ASSASSINATE_COST
+from mutiny.events import ActionDeclared, CoinsMoved, GameWon, TurnEnded
+
+
+def next_turn(data: GameData) -> "PlayerTurn":
+    """ Ends the turn, returning the PlayerTurn of the next living player. """
+    player_id = data.player_turn
+    data.next_turn()
+    if data.events is not None:
+        if data.winner_id is None:
+            data.events.emit(TurnEnded(data.state_id, player_id, data.player_turn))
+        else:
+            data.events.emit(TurnEnded(data.state_id, player_id, None))
+            data.events.emit(GameWon(data.state_id, data.winner_id))
+    pool = data.pool
+    if pool is None:
+        return PlayerTurn(data=data)
+    # PlayerTurn only holds data, so with pooling the game reuses one; entering it still advances the state id
+    state = pool.get(PlayerTurn)
+    if state is None:
+        state = pool[PlayerTurn] = PlayerTurn(data=data)
+    else:
+        data.state_id += 1
+        if data.instrument is not None:
+            data.instrument.on_state(StateEnum.START_TURN)
+    return state
 
 
 class PlayerTurn(StateInterface):
+    __slots__ = ()
 
     # The following pairs of functions both check for the same things
     # however the bottom two raise an exception
@@ -19,74 +47,121 @@ class PlayerTurn(StateInterface):
     def _must_coup(self) -> bool:
         return self._data.active_player.must_coup
 
-    # helper function that returns the error message for non-coup actions
-    def error_on_not_coup(self, player_id) -> Union[None, str]:
+    def _declare(self, player_id: int, action: ActionEnum, target_id: Optional[int] = None, cost: int = 0) -> None:
+        """ Emits the events of declaring action, which costs cost coins. Only call while events are enabled. """
+        events = self._data.events
+        events.emit(ActionDeclared(self._data.state_id, player_id, action, target_id))
+        if cost:
+            events.emit(CoinsMoved(self._data.state_id, player_id, None, cost))
+
+    # helper function that returns the error for non-coup actions
+    def error_on_not_coup(self, player_id) -> Optional[ErrorEnum]:
         if not self._is_turn(player_id):
-            return "Not {}'s turn".format(self._data.players[player_id].name)
+            return ErrorEnum.NOT_TURN
         if self._must_coup():
-            return "{} must coup".format(self._data.active_player.name)
+            return ErrorEnum.MUST_COUP
         return None
 
     @property
     def state_name(self) -> StateEnum:
         return StateEnum.START_TURN
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
+    def pending_decisions(self) -> List[int]:
+        return [self._data.player_turn]
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        if not self._is_turn(player_id):
+            mask[space.noop] = True
+            return
+        data = self._data
+        cash = data.active_player.cash
+        targets = [t for t in range(len(data.players)) if t != player_id and data.player_alive(t)]
+        if cash >= COUP_COST:
+            for target_id in targets:
+                mask[space.actions[ActionEnum.COUP] + target_id] = True
+        if self._must_coup():
+            return
+        for action in UNTARGETED_ACTIONS:
+            mask[space.actions[action]] = True
+        for target_id in targets:
+            mask[space.actions[ActionEnum.STEAL] + target_id] = True
+        if cash >= ASSASSINATE_COST:
+            for target_id in targets:
+                mask[space.actions[ActionEnum.ASSASSINATE] + target_id] = True
+
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
         if self._is_turn(player_id):
-            return f"Player {player_id} must make a move on {self.state_name}"
+            return ErrorEnum.MUST_MOVE
         return None
 
     def noop(self, player_id: int) -> StateInterface:
         if (error := self.error_on_noop(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
         return self
 
-    def error_on_income(self, player_id: int) -> Union[None, str]:
+    def error_on_income(self, player_id: int) -> Optional[ErrorEnum]:
         return self.error_on_not_coup(player_id)
 
     def income(self, player_id: int) -> StateInterface:
         if (error := self.error_on_income(player_id)):
-            raise InvalidMove(error)
-        return Income(self._data).resolve()
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_income(player_id)
+
+    def _apply_income(self, player_id: int) -> StateInterface:
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.INCOME)
+        return Income.pooled(self._data).resolve()
 
-    def error_on_f_aid(self, player_id: int) -> Union[None, str]:
+    def error_on_f_aid(self, player_id: int) -> Optional[ErrorEnum]:
         return self.error_on_not_coup(player_id)
 
     def f_aid(self, player_id: int) -> StateInterface:
         if (error := self.error_on_f_aid(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_f_aid(player_id)
 
-        queued = ForeignAid(self._data)
+    def _apply_f_aid(self, player_id: int) -> StateInterface:
+        queued = ForeignAid.pooled(self._data)
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.F_AID)
         return WaitForActionResponse(data=self._data, action=queued)  # no action role used for fAid
 
-    def error_on_tax(self, player_id: int) -> Union[None, str]:
+    def error_on_tax(self, player_id: int) -> Optional[ErrorEnum]:
         return self.error_on_not_coup(player_id)
 
     def tax(self, player_id: int) -> StateInterface:
         if (error := self.error_on_tax(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_tax(player_id)
 
-        queued = Tax(self._data)
+    def _apply_tax(self, player_id: int) -> StateInterface:
+        queued = Tax.pooled(self._data)
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.TAX)
         return WaitForActionResponse(data=self._data, action=queued)
 
-    def error_on_assassinate(self, player_id: int, target_id: int) -> Union[None, str]:
+    def error_on_assassinate(self, player_id: int, target_id: int) -> Optional[ErrorEnum]:
         if (error := self.error_on_not_coup(player_id)):
             return error
         if self._data.active_player.cash < ASSASSINATE_COST:
-            return "{} does not have enough cash to assassinate".format(self._data.active_player.name)
+            return ErrorEnum.CASH_ASSASSINATE
         if (error := Assassinate.error_on_init(self._data, target_id)):
             return error
         return None
 
     def assassinate(self, player_id: int, target_id: int) -> StateInterface:
         if (error := self.error_on_assassinate(player_id, target_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, target_id)
+        return self._apply_assassinate(player_id, target_id)
 
-        queued = Assassinate(self._data, target_id) # NOTE: targeted_action constructor also checks if target is valid
+    def _apply_assassinate(self, player_id: int, target_id: int) -> StateInterface:
+        queued = Assassinate.pooled(self._data, target_id, validate=False)  # the target was checked by error_on_assassinate
         self._data.active_player.removeCash(ASSASSINATE_COST)
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.ASSASSINATE, target_id, ASSASSINATE_COST)
         return WaitForActionResponse(data=self._data, action=queued)
 
-    def error_on_steal(self, player_id: int, target_id: int) -> Union[None, str]:
+    def error_on_steal(self, player_id: int, target_id: int) -> Optional[ErrorEnum]:
         if (error := self.error_on_not_coup(player_id)):
             return error
         if (error := Steal.error_on_init(self._data, target_id)):
@@ -95,34 +170,46 @@ class PlayerTurn(StateInterface):
 
     def steal(self, player_id: int, target_id: int) -> StateInterface:
         if (error := self.error_on_steal(player_id, target_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, target_id)
+        return self._apply_steal(player_id, target_id)
 
-        queued = Steal(self._data, target_id)
+    def _apply_steal(self, player_id: int, target_id: int) -> StateInterface:
+        queued = Steal.pooled(self._data, target_id, validate=False)
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.STEAL, target_id)
         return WaitForActionResponse(data=self._data, action=queued)
 
-    def error_on_exchange(self, player_id: int) -> Union[None, str]:
+    def error_on_exchange(self, player_id: int) -> Optional[ErrorEnum]:
         return self.error_on_not_coup(player_id)
 
     def exchange(self, player_id: int) -> StateInterface:
         if (error := self.error_on_exchange(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_exchange(player_id)
 
-        queued = Exchange(self._data)
+    def _apply_exchange(self, player_id: int) -> StateInterface:
+        queued = Exchange.pooled(self._data)
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.EXCHANGE)
         return WaitForActionResponse(data=self._data, action=queued)
 
-    def error_on_coup(self, player_id: int, target_id: int) -> Union[None, str]:
+    def error_on_coup(self, player_id: int, target_id: int) -> Optional[ErrorEnum]:
         if not self._is_turn(player_id):
-            return "Not {}'s turn".format(self._data.players[player_id].name)
+            return ErrorEnum.NOT_TURN
         if (self._data.active_player.cash < COUP_COST):
-            return "{} does not have enough cash to coup".format(self._data.active_player.name)
+            return ErrorEnum.CASH_COUP
         if (error := Coup.error_on_init(self._data, target_id)):
             return error
         return None
 
     def coup(self, player_id: int, target_id: int) -> StateInterface:
         if (error := self.error_on_coup(player_id, target_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, target_id)
+        return self._apply_coup(player_id, target_id)
 
-        action = Coup(self._data, target_id)
+    def _apply_coup(self, player_id: int, target_id: int) -> StateInterface:
+        action = Coup.pooled(self._data, target_id, validate=False)
         self._data.active_player.removeCash(COUP_COST)
+        if self._data.events is not None:
+            self._declare(player_id, ActionEnum.COUP, target_id, COUP_COST)
         return action.resolve() # Returns reveal state with no action queued
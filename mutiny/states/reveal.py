@@ -1,12 +1,14 @@
-from typing import Dict, Union
+from typing import Dict, List, Optional
 
 from mutiny.actions import QueuedAction, NoOp
 from mutiny.game_enum import StateEnum, RoleEnum
 from mutiny.game_data import GameData
 from mutiny.state_interface import StateInterface
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.observation import ACTION_INDEX
 
 from mutiny.states.wait_for_block import WaitForBlock
+import mutiny.states.player_turn
 
 
 def resolve_reveal(*, data: GameData,
@@ -29,7 +31,7 @@ def resolve_reveal(*, data: GameData,
 
     # Resolve reveal immediately if player has no choice
     if reveal_player.influence_count > 0:
-        reveal_player.reveal()
+        data.reveal(player_id)
 
     # If target has not allowed / blocked action yet
     if action.still_valid and query_block_next and action.can_be_blocked:
@@ -40,7 +42,7 @@ def resolve_reveal(*, data: GameData,
         return action.resolve()
 
     # Else, next turn
-    return NoOp(data).resolve()
+    return mutiny.states.player_turn.next_turn(data)
 
 
 class Reveal(StateInterface):
@@ -48,6 +50,7 @@ class Reveal(StateInterface):
     It is better to used the resolveReveal method.
     Set query_block_next for the next state to be WaitBlock.
     """
+    __slots__ = ("_reveal_id", "_reveal_player", "_action", "_block_next")
 
     def __init__(self, *,
                  data: GameData,
@@ -60,6 +63,14 @@ class Reveal(StateInterface):
         self._action = action
         self._block_next = query_block_next
 
+    def _snapshot_fields(self) -> tuple:
+        return self._reveal_id, self._action.snapshot(), self._block_next
+
+    def _restore_fields(self, fields: tuple) -> None:
+        self._reveal_id, action, self._block_next = fields
+        self._reveal_player = self._data.players[self._reveal_id]
+        self._action = QueuedAction.restore(self._data, action)
+
     @property
     def state_name(self) -> StateEnum:
         return StateEnum.REVEAL
@@ -72,38 +83,59 @@ class Reveal(StateInterface):
     def target(self) -> int:
         return self._action.target
 
-    def to_dict(self, player_id=None) -> Dict:
-        d = super().to_dict(player_id)
+    def state_dict(self, player_id=None) -> Dict:
+        d = super().state_dict(player_id)
         if not isinstance(self._action, NoOp):
-            d["state"]["action"] = self._action.action_name.value
+            d["action"] = self._action.action_name.value
         if self._action.target is not None:
-            d["state"]["target"] = self._action.target
+            d["target"] = self._action.target
         # TODO: blockingRole?
-        d["state"]["playerToReveal"] = self._reveal_player.self_id
+        d["playerToReveal"] = self._reveal_player.self_id
         return d
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
+    def encode(self, out, layout, player_id=None) -> None:
+        super().encode(out, layout, player_id)
+        if not isinstance(self._action, NoOp):
+            out[layout.action + ACTION_INDEX[self._action.action_name]] = 1
+        if self._action.target is not None:
+            out[layout.target + self._action.target] = 1
+        out[layout.player_to_reveal + self._reveal_id] = 1
+
+    def pending_decisions(self) -> List[int]:
+        return [self._reveal_id]
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        if player_id != self._reveal_id:
+            mask[space.noop] = True
+            return
+        for inf in self._reveal_player.hand:
+            if not inf.revealed:
+                mask[space.reveals[inf.role]] = True
+
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
         if player_id == self._reveal_id:
-            return f"Player {player_id} must reveal on {self.state_name}"
+            return ErrorEnum.MUST_REVEAL
         return None
 
     def noop(self, player_id: int) -> StateInterface:
         if (error := self.error_on_noop(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
         return self
 
-    def error_on_reveal(self, player_id: int, influence: RoleEnum) -> Union[None, str]:
+    def error_on_reveal(self, player_id: int, influence: RoleEnum) -> Optional[ErrorEnum]:
         if player_id != self._reveal_id:
-            return "Wrong player to reveal"
+            return ErrorEnum.WRONG_REVEAL_PLAYER
         if not self._reveal_player.hasAliveInfluence(influence):
-            return "Player does not have {}".format(influence)
+            return ErrorEnum.NO_INFLUENCE
         return None
 
     def reveal(self, player_id: int, influence: RoleEnum) -> StateInterface:
         if (error := self.error_on_reveal(player_id, influence)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, influence)
+        return self._apply_reveal(player_id, influence)
 
-        self._reveal_player.reveal(influence)
+    def _apply_reveal(self, player_id: int, influence: RoleEnum) -> StateInterface:
+        self._data.reveal(self._reveal_id, influence)
         # If target has not allowed / blocked action yet
         if self._action.still_valid and self._block_next and self._action.can_be_blocked:
             return WaitForBlock(data=self._data,
@@ -111,4 +143,4 @@ class Reveal(StateInterface):
         # Else, resolve action
         if self._action.still_valid:
             return self._action.resolve()
-        return NoOp(self._data).resolve()
+        return mutiny.states.player_turn.next_turn(self._data)
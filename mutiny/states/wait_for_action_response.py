@@ -1,30 +1,35 @@
-from typing import Dict, Union
+from typing import Dict, List, Optional
 
-from mutiny.actions import Assassinate, QueuedAction, NoOp
-from mutiny.exceptions import InvalidMove
+from mutiny.actions import Assassinate, QueuedAction, NoOp, BLOCKING_ROLES
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.observation import ACTION_INDEX
 from mutiny.game_enum import StateEnum, RoleEnum, ActionEnum
-from mutiny.game_data import GameData
+from mutiny.game_data import GameData, seats
 from mutiny.state_interface import StateInterface
 from mutiny.states.reveal import resolve_reveal
 from mutiny.states.wait_for_block_response import WaitForBlockResponse
 from mutiny.constants import ASSASSINATE_COST
-
-BLOCKING_ROLES = {
-    ActionEnum.F_AID: {RoleEnum.DUKE},
-    ActionEnum.STEAL: {RoleEnum.AMBASSADOR, RoleEnum.CAPTAIN},
-    ActionEnum.ASSASSINATE: {RoleEnum.CONTESSA},
-}
+from mutiny.events import Blocked, Challenged, CoinsMoved
 
 
 class WaitForActionResponse(StateInterface):
+    __slots__ = ("_action", "_allow")
 
     def __init__(self, *,
                  data: GameData,
                  action: QueuedAction):
         super().__init__(data=data)
         self._action = action
-        self._allow = [False if player.alive else True for player in self._data.players]
-        self._allow[self._data.player_turn] = True
+        # bitmask of the players who allowed, implicitly when dead
+        self._allow = self._data.dead_mask | (1 << self._data.player_turn)
+
+    def _snapshot_fields(self) -> tuple:
+        return self._action.snapshot(), self._allow
+
+    def _restore_fields(self, fields: tuple) -> None:
+        action, allow = fields
+        self._action = QueuedAction.restore(self._data, action)
+        self._allow = allow
 
     @property
     def state_name(self) -> StateEnum:
@@ -38,39 +43,66 @@ class WaitForActionResponse(StateInterface):
     def target(self) -> int:
         return self._action.target
 
-    def to_dict(self, player_id=None) -> Dict:
-        d = super().to_dict(player_id)
-        d["state"]["action"] = self._action.action_name.value
+    def state_dict(self, player_id=None) -> Dict:
+        d = super().state_dict(player_id)
+        d["action"] = self._action.action_name.value
         if self._action.target is not None:
-            d["state"]["target"] = self._action.target
+            d["target"] = self._action.target
         return d
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
-        if not self._allow[player_id]:
-            return f"Player {player_id} must allow, block, or challenge on {self.state_name}"
+    def encode(self, out, layout, player_id=None) -> None:
+        super().encode(out, layout, player_id)
+        out[layout.action + ACTION_INDEX[self._action.action_name]] = 1
+        if self._action.target is not None:
+            out[layout.target + self._action.target] = 1
+
+    def pending_decisions(self) -> List[int]:
+        return seats(self._data.all_mask & ~self._allow)
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        if self._allow & (1 << player_id):
+            mask[space.noop] = True
+            return
+        mask[space.allow] = True
+        if self._action.can_be_challenged:
+            mask[space.challenge] = True
+        if self._action.can_be_blocked:
+            for role in BLOCKING_ROLES[self._action.action_name]:
+                if role == RoleEnum.DUKE or player_id == self._action.target:
+                    mask[space.blocks[role]] = True
+
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
+        if not self._allow & (1 << player_id):
+            return ErrorEnum.MUST_RESPOND
         return None        
 
     def noop(self, player_id: int) -> StateInterface:
         # If player has not already implicitly allowed
         if (error := self.error_on_noop(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
         return self
 
-    def error_on_challenge(self, player_id: int) -> Union[None, str]:
-        if self._allow[player_id]:
-            return "Player has already or implicitly allowed the action"
+    def error_on_challenge(self, player_id: int) -> Optional[ErrorEnum]:
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         if not self._action.can_be_challenged:
-            return "Current action can not be challenged"
+            return ErrorEnum.NOT_CHALLENGEABLE
         return None
 
     def challenge(self, player_id: int) -> StateInterface:
         if (error := self.error_on_challenge(player_id)):
-            raise InvalidMove(error)
-
-        if self._data.players[self._data.player_turn].hasAliveInfluence(self._action.action_role):
-            self._data.deck.append(self._action.action_role)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_challenge(player_id)
+
+    def _apply_challenge(self, player_id: int) -> StateInterface:
+        held = self._data.players[self._data.player_turn].hasAliveInfluence(self._action.action_role)
+        if self._data.events is not None:
+            self._data.events.emit(Challenged(self._data.state_id, player_id, self._data.player_turn,
+                                              self._action.action_role, not held))
+        if held:
+            self._data.return_card(self._action.action_role)
             self._data.shuffle_deck()
-            self._data.players[self._data.player_turn].replace(self._action.action_role, self._data.deck.pop())
+            self._data.players[self._data.player_turn].replace(self._action.action_role, self._data.draw_card())
 
             # Challenger loses an influence, action may or may not resolve
             return resolve_reveal(data=self._data,
@@ -81,43 +113,53 @@ class WaitForActionResponse(StateInterface):
             # Claimant loses an influence, action does not resolve (except for the initial cost)
             if isinstance(self._action, Assassinate):
                 self._data.active_player.addCash(ASSASSINATE_COST)
+                if self._data.events is not None:
+                    self._data.events.emit(CoinsMoved(self._data.state_id, None, self._data.player_turn, ASSASSINATE_COST))
             return resolve_reveal(data=self._data,
                                   player_id=self._data.player_turn,
-                                  action=NoOp(self._data))
+                                  action=NoOp.pooled(self._data))
 
-    def error_on_block(self, player_id: int, blocking_role: RoleEnum) -> Union[None, str]:
+    def error_on_block(self, player_id: int, blocking_role: RoleEnum) -> Optional[ErrorEnum]:
         # Note this is twice duplicated code :) im sorry
         if not self._action.can_be_blocked:
-            return "Current action can not be blocked"
-        if self._allow[player_id]:
-            return "Player has already or implicitly allowed the action"
+            return ErrorEnum.NOT_BLOCKABLE
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         if blocking_role not in BLOCKING_ROLES[self._action.action_name]:
-            return "Cannot block {} with {}".format(self._action.action_name, blocking_role)
+            return ErrorEnum.WRONG_BLOCK_ROLE
         if blocking_role != RoleEnum.DUKE and player_id != self._action.target:
-            return "Cannot block if you are not the target"
+            return ErrorEnum.NOT_TARGET
         return None
 
     def block(self, player_id: int, blocking_role: RoleEnum) -> StateInterface:
         if (error := self.error_on_block(player_id, blocking_role)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, blocking_role)
+        return self._apply_block(player_id, blocking_role)
 
+    def _apply_block(self, player_id: int, blocking_role: RoleEnum) -> StateInterface:
+        if self._data.events is not None:
+            self._data.events.emit(Blocked(self._data.state_id, player_id, blocking_role, self._action.action_name))
         return WaitForBlockResponse(data=self._data,
                                     action=self._action,
                                     blocker_id=player_id,
                                     block_role=blocking_role)
 
-    def error_on_allow(self, player_id: int) -> Union[None, str]:
-        if self._allow[player_id]:
-            return "Player has already or implicitly allowed the action"
+    def error_on_allow(self, player_id: int) -> Optional[ErrorEnum]:
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         return None
 
     def allow(self, player_id: int) -> StateInterface:
         if (error := self.error_on_allow(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_allow(player_id)
 
+    def _apply_allow(self, player_id: int) -> StateInterface:
         # No one has challenged or blocked, so the action resolves
         # Blocks are done on this turn, unless a challenge occurs
-        self._allow[player_id] = True
-        if all(self._allow): return self._action.resolve()
+        if self._data.journal is not None:
+            self._data.journal.append((setattr, self, "_allow", self._allow))
+        self._allow |= 1 << player_id
+        if self._allow == self._data.all_mask: return self._action.resolve()
         return self
 
@@ -1,41 +1,51 @@
-from typing import Dict, Union
+from typing import Dict, List, Optional
 
-from mutiny.actions import QueuedAction, QueuedTargetAction
+from mutiny.actions import QueuedAction, QueuedTargetAction, BLOCKING_ROLES
 from mutiny.game_enum import ActionEnum, StateEnum, RoleEnum
-from mutiny.game_data import GameData
+from mutiny.game_data import GameData, seats
 from mutiny.state_interface import StateInterface
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.observation import ACTION_INDEX
+from mutiny.events import Blocked
 
 from mutiny.states.wait_for_block_response import WaitForBlockResponse
 
-# TODO: Probably should be moved into actions logic somehow
-BLOCKING_ROLES = {
-    ActionEnum.F_AID: {RoleEnum.DUKE},
-    ActionEnum.STEAL: {RoleEnum.AMBASSADOR, RoleEnum.CAPTAIN},
-    ActionEnum.ASSASSINATE: {RoleEnum.CONTESSA},
-}
-
 
 class WaitForBlock(StateInterface):
     """
     Only accessible after a failed action challenge.
     """
+    __slots__ = ("_action", "_allow")
 
     def __init__(self, *,
                  data: GameData,
                  action: QueuedAction):
         super().__init__(data=data)
         self._action = action
-        self._allow = [False if player.alive else True for player in self._data.players]
-        self._allow[self._data.player_turn] = True
+        # bitmask of the players who allowed, implicitly when dead
+        self._allow = self._data.dead_mask | (1 << self._data.player_turn)
 
-    def to_dict(self, player_id=None) -> Dict:
-        d = super().to_dict(player_id)
-        d["state"]["action"] = self._action.action_name.value
+    def state_dict(self, player_id=None) -> Dict:
+        d = super().state_dict(player_id)
+        d["action"] = self._action.action_name.value
         if self._action.target is not None:
-            d["state"]["target"] = self._action.target
+            d["target"] = self._action.target
         return d
 
+    def encode(self, out, layout, player_id=None) -> None:
+        super().encode(out, layout, player_id)
+        out[layout.action + ACTION_INDEX[self._action.action_name]] = 1
+        if self._action.target is not None:
+            out[layout.target + self._action.target] = 1
+
+    def _snapshot_fields(self) -> tuple:
+        return self._action.snapshot(), self._allow
+
+    def _restore_fields(self, fields: tuple) -> None:
+        action, allow = fields
+        self._action = QueuedAction.restore(self._data, action)
+        self._allow = allow
+
     @property
     def state_name(self) -> StateEnum:
         return StateEnum.WAIT_FOR_BLOCK
@@ -48,49 +58,74 @@ class WaitForBlock(StateInterface):
     def target(self) -> int:
         return self._action.target
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
+    def pending_decisions(self) -> List[int]:
+        # other players may allow a targeted action, but only the target's answer resolves it
+        if self._action.action_name != ActionEnum.F_AID:
+            return [] if self._allow & (1 << self._action.target) else [self._action.target]
+        return seats(self._data.all_mask & ~self._allow)
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        if self._allow & (1 << player_id):
+            mask[space.noop] = True
+            return
+        if self._action.action_name != ActionEnum.F_AID and self._action.target != player_id:
+            mask[space.noop] = True
+        mask[space.allow] = True
+        for role in BLOCKING_ROLES[self._action.action_name]:
+            if role == RoleEnum.DUKE or player_id == self._action.target:
+                mask[space.blocks[role]] = True
+
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
         # If player has not already implicitly allowed
-        if not self._allow[player_id] and (self._action.action_name == ActionEnum.F_AID or self._action.target == player_id):
+        if not self._allow & (1 << player_id) and (self._action.action_name == ActionEnum.F_AID or self._action.target == player_id):
             # Can only block duke, or block something targeted at you
-            return f"Player {player_id} must allow or block on {self.state_name}"
+            return ErrorEnum.MUST_ALLOW_OR_BLOCK
         return None
 
     def noop(self, player_id: int) -> StateInterface:
         if (error := self.error_on_noop(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
         return self
 
-    def error_on_block(self, player_id: int, blocking_role: RoleEnum) -> Union[None, str]:
-        if self._allow[player_id]:
-            return "Player has already implicitly allowed the action"
+    def error_on_block(self, player_id: int, blocking_role: RoleEnum) -> Optional[ErrorEnum]:
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         if blocking_role not in BLOCKING_ROLES[self._action.action_name]:
-            return "Cannot block {} with {}".format(self._action.action_name, blocking_role)
+            return ErrorEnum.WRONG_BLOCK_ROLE
         if blocking_role != RoleEnum.DUKE and player_id != self._action.target:
-            return "Cannot block if you are not the target"
+            return ErrorEnum.NOT_TARGET
         return None
 
     def block(self, player_id: int, blocking_role: RoleEnum) -> StateInterface:
         if (error := self.error_on_block(player_id, blocking_role)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name, blocking_role)
+        return self._apply_block(player_id, blocking_role)
 
+    def _apply_block(self, player_id: int, blocking_role: RoleEnum) -> StateInterface:
+        if self._data.events is not None:
+            self._data.events.emit(Blocked(self._data.state_id, player_id, blocking_role, self._action.action_name))
         return WaitForBlockResponse(data=self._data,
                                     action=self._action,
                                     blocker_id=player_id,
                                     block_role=blocking_role)
 
-    def error_on_allow(self, player_id: int) -> Union[None, str]:
-        if self._allow[player_id]:
-            return "Player has already implicitly allowed the action"
+    def error_on_allow(self, player_id: int) -> Optional[ErrorEnum]:
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         return None
 
     def allow(self, player_id: int) -> StateInterface:
         if (error := self.error_on_allow(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_allow(player_id)
 
+    def _apply_allow(self, player_id: int) -> StateInterface:
         # targeted actions only require permission of the target after a challenge
-        self._allow[player_id] = True
-        if isinstance(self._action, QueuedTargetAction) and self._allow[self._action.target]:
+        if self._data.journal is not None:
+            self._data.journal.append((setattr, self, "_allow", self._allow))
+        self._allow |= 1 << player_id
+        if isinstance(self._action, QueuedTargetAction) and self._allow & (1 << self._action.target):
             return self._action.resolve()
-        if all(self._allow):
+        if self._allow == self._data.all_mask:
             return self._action.resolve()
         return self
@@ -1,16 +1,19 @@
-from typing import Dict, Union, Optional
+from typing import Dict, Optional, List
 
 from mutiny.game_enum import StateEnum, RoleEnum
-from mutiny.game_data import GameData
+from mutiny.game_data import GameData, seats
 from mutiny.actions import QueuedAction, NoOp
 from mutiny.state_interface import StateInterface
-from mutiny.exceptions import InvalidMove
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.observation import ACTION_INDEX, ROLE_INDEX
+from mutiny.events import Challenged
 
 import mutiny.states.player_turn
 import mutiny.states.reveal
 
 
 class WaitForBlockResponse(StateInterface):
+    __slots__ = ("_action", "_allow", "_blocker_id", "_block_role")
 
     def __init__(self, *,
                  data: GameData,
@@ -19,12 +22,20 @@ class WaitForBlockResponse(StateInterface):
                  block_role: RoleEnum):
         super().__init__(data=data)
         self._action = action
-        self._allow = [False if player.alive else True for player in self._data.players]
-        self._allow[blocker_id] = True
+        # bitmask of the players who allowed, implicitly when dead
+        self._allow = self._data.dead_mask | (1 << blocker_id)
 
         self._blocker_id = blocker_id
         self._block_role = block_role
 
+    def _snapshot_fields(self) -> tuple:
+        return self._action.snapshot(), self._allow, self._blocker_id, self._block_role
+
+    def _restore_fields(self, fields: tuple) -> None:
+        action, allow, self._blocker_id, self._block_role = fields
+        self._action = QueuedAction.restore(self._data, action)
+        self._allow = allow
+
     @property
     def state_name(self) -> StateEnum:
         return StateEnum.WAIT_FOR_BLOCK_RESPONSE
@@ -41,61 +52,86 @@ class WaitForBlockResponse(StateInterface):
     def blocking_role(self) -> Optional[RoleEnum]:
         return self._block_role
 
-    def to_dict(self, player_id=None) -> Dict:
-        d = super().to_dict(player_id)
-        d["state"]["action"] = self._action.action_name.value
+    def state_dict(self, player_id=None) -> Dict:
+        d = super().state_dict(player_id)
+        d["action"] = self._action.action_name.value
         # person in the target field is necessarily the blocker
-        d["state"]["target"] = self._blocker_id
-        d["state"]["blockingRole"] = self._block_role.value
+        d["target"] = self._blocker_id
+        d["blockingRole"] = self._block_role.value
         return d
 
-    def error_on_noop(self, player_id: int) -> Union[None, str]:
-        if not self._allow[player_id]:
-            return f"Player {player_id} must allow or challenge on {self.state_name}"
+    def encode(self, out, layout, player_id=None) -> None:
+        super().encode(out, layout, player_id)
+        out[layout.action + ACTION_INDEX[self._action.action_name]] = 1
+        out[layout.target + self._blocker_id] = 1
+        out[layout.blocking_role + ROLE_INDEX[self._block_role]] = 1
+
+    def pending_decisions(self) -> List[int]:
+        return seats(self._data.all_mask & ~self._allow)
+
+    def legal_actions(self, player_id: int, space, mask: List[bool]) -> None:
+        if self._allow & (1 << player_id):
+            mask[space.noop] = True
+            return
+        mask[space.allow] = True
+        mask[space.challenge] = True
+
+    def error_on_noop(self, player_id: int) -> Optional[ErrorEnum]:
+        if not self._allow & (1 << player_id):
+            return ErrorEnum.MUST_ALLOW_OR_CHALLENGE
         return None
 
     def noop(self, player_id: int) -> StateInterface:
         # If player has not already implicitly allowed
         if (error := self.error_on_noop(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
         return self
 
-    def error_on_challenge(self, player_id: int) -> Union[None, str]:
-        if self._allow[player_id]:
-            return "Player has already implicitly allowed the block"
+    def error_on_challenge(self, player_id: int) -> Optional[ErrorEnum]:
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         return None
 
     def challenge(self, player_id: int) -> StateInterface:
         if (error := self.error_on_challenge(player_id)):
-            raise InvalidMove(error)
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_challenge(player_id)
 
+    def _apply_challenge(self, player_id: int) -> StateInterface:
         # this is Treason-specific (you can lie about not having the influence in the og game)
-        if self._data.players[self._blocker_id].hasAliveInfluence(self._block_role):
-            self._data.deck.append(self._block_role)
+        held = self._data.players[self._blocker_id].hasAliveInfluence(self._block_role)
+        if self._data.events is not None:
+            self._data.events.emit(Challenged(self._data.state_id, player_id, self._blocker_id, self._block_role, not held))
+        if held:
+            self._data.return_card(self._block_role)
             self._data.shuffle_deck()
-            self._data.players[self._blocker_id].replace(self._block_role, self._data.deck.pop())
+            self._data.players[self._blocker_id].replace(self._block_role, self._data.draw_card())
 
             return mutiny.states.reveal.resolve_reveal(data=self._data,
                                                        player_id=player_id,
-                                                       action=NoOp(self._data))
+                                                       action=NoOp.pooled(self._data))
         else:
             return mutiny.states.reveal.resolve_reveal(data=self._data,
                                                        player_id=self._blocker_id,
                                                        action=self._action)
 
-    def error_on_allow(self, player_id: int) -> Union[None, str]:
+    def error_on_allow(self, player_id: int) -> Optional[ErrorEnum]:
         # This is an invalid move because the blocker (from the NN) is able to allow his own block
         # Not a runtime error
-        if self._allow[player_id]:
-            return "Player has already implicitly allowed the block"
+        if self._allow & (1 << player_id):
+            return ErrorEnum.ALREADY_ALLOWED
         return None
 
     def allow(self, player_id: int) -> StateInterface:
         if (error := self.error_on_allow(player_id)):
-            raise InvalidMove(error)
-
-        self._allow[player_id] = True
-        if all(self._allow):
+            raise InvalidMove(error, player_id, self.state_name)
+        return self._apply_allow(player_id)
+
+    def _apply_allow(self, player_id: int) -> StateInterface:
+        if self._data.journal is not None:
+            self._data.journal.append((setattr, self, "_allow", self._allow))
+        self._allow |= 1 << player_id
+        if self._allow == self._data.all_mask:
             # Action does not resolve
-            return mutiny.states.player_turn.PlayerTurn(data=self._data.next_turn())
+            return mutiny.states.player_turn.next_turn(self._data)
         return self
@@ -0,0 +1,493 @@
+"""
+Batched engine that steps many games in lockstep.
+
+Games are stored as struct-of-arrays (one row per game) and every command is applied
+to all games at once with NumPy, so the interpreter overhead is paid per seat instead
+of per game. The rules are the same as the ones in mutiny.states.
+
+Enums are represented by their position in the Enum definition (see the *_CODE tables).
+Missing values (no target, no role...) are represented by -1.
+"""
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+
+from mutiny.action_space import ActionSpace
+from mutiny.constants import *
+from mutiny.game_data import role_copies
+from mutiny.game_enum import ActionEnum, CommandEnum, RoleEnum, StateEnum
+
+STATE_CODE = {state: i for i, state in enumerate(StateEnum)}
+ACTION_CODE = {action: i for i, action in enumerate(ActionEnum)}
+ROLE_CODE = {role: i for i, role in enumerate(RoleEnum)}
+COMMAND_CODE = {command: i for i, command in enumerate(CommandEnum)}
+
+N_ROLES = len(RoleEnum)
+
+_START_TURN = STATE_CODE[StateEnum.START_TURN]
+_WAIT_ACTION = STATE_CODE[StateEnum.WAIT_FOR_ACTION_RESPONSE]
+_WAIT_BLOCK = STATE_CODE[StateEnum.WAIT_FOR_BLOCK]
+_WAIT_BLOCK_RESPONSE = STATE_CODE[StateEnum.WAIT_FOR_BLOCK_RESPONSE]
+_REVEAL = STATE_CODE[StateEnum.REVEAL]
+_EXCHANGE = STATE_CODE[StateEnum.EXCHANGE]
+
+_TAX = ACTION_CODE[ActionEnum.TAX]
+_STEAL = ACTION_CODE[ActionEnum.STEAL]
+_ASSASSINATE = ACTION_CODE[ActionEnum.ASSASSINATE]
+_EXCHANGE_ACTION = ACTION_CODE[ActionEnum.EXCHANGE]
+_INCOME = ACTION_CODE[ActionEnum.INCOME]
+_F_AID = ACTION_CODE[ActionEnum.F_AID]
+_COUP = ACTION_CODE[ActionEnum.COUP]
+_NOP = ACTION_CODE[ActionEnum.NOP]
+
+_DUKE = ROLE_CODE[RoleEnum.DUKE]
+
+_CASH_GAIN = ((_INCOME, INCOME_GAIN), (_F_AID, F_AID_GAIN), (_TAX, TAX_GAIN))
+_ENDS_TURN = (_INCOME, _F_AID, _TAX, _STEAL, _NOP)
+_TARGETED = (_STEAL, _ASSASSINATE, _COUP)
+_CHALLENGEABLE = (_TAX, _STEAL, _ASSASSINATE, _EXCHANGE_ACTION)
+
+# role claimed by each action, -1 if none
+_ACTION_ROLE = np.full(len(ActionEnum), -1, np.int8)
+_ACTION_ROLE[_TAX] = ROLE_CODE[RoleEnum.DUKE]
+_ACTION_ROLE[_STEAL] = ROLE_CODE[RoleEnum.CAPTAIN]
+_ACTION_ROLE[_ASSASSINATE] = ROLE_CODE[RoleEnum.ASSASSIN]
+_ACTION_ROLE[_EXCHANGE_ACTION] = ROLE_CODE[RoleEnum.AMBASSADOR]
+
+# _BLOCKS[action, role] is True when role may block action
+_BLOCKS = np.zeros((len(ActionEnum), N_ROLES), bool)
+_BLOCKS[_F_AID, ROLE_CODE[RoleEnum.DUKE]] = True
+_BLOCKS[_STEAL, ROLE_CODE[RoleEnum.AMBASSADOR]] = True
+_BLOCKS[_STEAL, ROLE_CODE[RoleEnum.CAPTAIN]] = True
+_BLOCKS[_ASSASSINATE, ROLE_CODE[RoleEnum.CONTESSA]] = True
+
+_Command = namedtuple("_Command", ["action", "target", "role", "keep"])
+
+
+class VectorGame:
+    """
+    n_games games of n_players each, stored as arrays with one row per game.
+
+    step() takes one command per player per game as integer arrays of shape
+    (n_games, n_players) and returns which of them were invalid moves. Commands are
+    applied seat by seat, and like GameObject.command, commands issued against a
+    state that has already changed during the step are ignored.
+    """
+
+    def __init__(self, n_games: int, n_players: int, seed=None):
+        self.n_games = n_games
+        self.n_players = n_players
+        self.role_copies = role_copies(n_players)
+        self.rng = np.random.default_rng(seed)
+
+        n, p = n_games, n_players
+        self.cash = np.zeros((n, p), np.int16)
+        self.roles = np.zeros((n, p, 2), np.int8)
+        self.revealed = np.zeros((n, p, 2), bool)
+        self.deck = np.zeros((n, N_ROLES), np.int16)  # count of each role left in the deck
+        self.state = np.zeros(n, np.int8)
+        self.state_id = np.zeros(n, np.int64)
+        self.player_turn = np.zeros(n, np.int16)
+        self.winner = np.full(n, -1, np.int16)
+
+        # queued action and the state specific fields
+        self.action = np.full(n, _NOP, np.int8)
+        self.target = np.full(n, -1, np.int16)
+        self.blocker = np.full(n, -1, np.int16)
+        self.block_role = np.full(n, -1, np.int8)
+        self.reveal_id = np.full(n, -1, np.int16)
+        self.block_next = np.zeros(n, bool)
+        self.exchange_options = np.full((n, 4), -1, np.int8)
+        self.allow = np.zeros((n, p), bool)
+
+        # step arguments for each index of the action space, see step_index
+        self.action_space = ActionSpace.shared(n_players)
+        decode = self.action_space.decode
+        self._index_command = np.array([COMMAND_CODE[c.command] for c in decode])
+        self._index_action = np.array([-1 if c.action is None else ACTION_CODE[c.action] for c in decode])
+        self._index_target = np.array([-1 if c.target is None else c.target for c in decode])
+        self._index_role = np.array([-1 if c.role is None else ROLE_CODE[c.role] for c in decode])
+        self._index_keep = np.array([[ROLE_CODE[r] for r in c.roles or ()] + [-1] * (2 - len(c.roles or ()))
+                                     for c in decode])
+
+        self.reset()
+
+    @property
+    def alive(self) -> np.ndarray:
+        return ~self.revealed.all(axis=2)
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.winner >= 0
+
+    def _games(self, games) -> np.ndarray:
+        if games is None:
+            return np.arange(self.n_games)
+        games = np.asarray(games)
+        if games.dtype == bool:
+            return np.flatnonzero(games)
+        return games
+
+    def reset(self, games=None) -> None:
+        """ Deals new games. games may be a boolean mask or indices, None resets all of them. """
+        g = self._games(games)
+        k, p = len(g), self.n_players
+
+        cards = np.repeat(np.arange(N_ROLES, dtype=np.int8), self.role_copies)
+        order = np.argsort(self.rng.random((k, cards.size)), axis=1)
+        dealt = cards[order[:, :2 * p]]
+        self.roles[g] = dealt.reshape(k, p, 2)
+        self.deck[g] = self.role_copies - (dealt[:, :, None] == np.arange(N_ROLES)).sum(axis=1)
+
+        self.revealed[g] = False
+        self.cash[g] = CASH_START
+        self.winner[g] = -1
+        self.state_id[g] = 0
+        self.player_turn[g] = self.rng.integers(p, size=k)
+        self._clear_action(g)
+        self._enter(g, _START_TURN)
+
+    def step(self, command, action=None, target=None, role=None, keep=None) -> np.ndarray:
+        """
+        Applies one command per player per game. Each argument has shape (n_games, n_players),
+        except keep, the roles kept on an exchange, which has shape (n_games, n_players, 2).
+        role is the blocking role for a block and the revealed role for a reveal.
+        Returns a boolean array marking the invalid commands, which leave their game untouched.
+        """
+        n, p = self.n_games, self.n_players
+        command = np.asarray(command)
+        none = np.full((n, p), -1)
+        cmd = _Command(action=none if action is None else np.asarray(action),
+                       target=none if target is None else np.asarray(target),
+                       role=none if role is None else np.asarray(role),
+                       keep=np.full((n, p, 2), -1) if keep is None else np.asarray(keep))
+
+        start_id = self.state_id.copy()
+        invalid = np.zeros((n, p), bool)
+        for seat in range(p):
+            g = np.flatnonzero((self.state_id == start_id) & (self.winner < 0))
+            if not g.size:
+                break
+            code = command[g, seat]
+            dead = self.revealed[g, seat].all(axis=1)
+            invalid[g[dead & (code != COMMAND_CODE[CommandEnum.NOOP])], seat] = True
+
+            known = np.zeros(len(g), bool)
+            for command_enum, handler in self._HANDLERS:
+                hit = code == COMMAND_CODE[command_enum]
+                if command_enum != CommandEnum.NOOP:
+                    hit &= ~dead
+                known |= hit
+                if hit.any():
+                    games = g[hit]
+                    ok = handler(self, games, seat, cmd)
+                    invalid[games[~ok], seat] = True
+            invalid[g[~known & ~dead], seat] = True
+        return invalid
+
+    def step_index(self, index) -> np.ndarray:
+        """ Same as step, with commands given as indices of self.action_space of shape (n_games, n_players). """
+        index = np.asarray(index)
+        return self.step(self._index_command[index],
+                         action=self._index_action[index],
+                         target=self._index_target[index],
+                         role=self._index_role[index],
+                         keep=self._index_keep[index])
+
+    # helpers
+
+    def _enter(self, g: np.ndarray, state: int) -> None:
+        self.state[g] = state
+        self.state_id[g] += 1
+
+    def _clear_action(self, g: np.ndarray) -> None:
+        self.action[g] = _NOP
+        self.target[g] = -1
+        self.blocker[g] = -1
+        self.block_role[g] = -1
+        self.reveal_id[g] = -1
+        self.block_next[g] = False
+        self.exchange_options[g] = -1
+        self.allow[g] = False
+
+    def _open_window(self, g: np.ndarray, exempt: np.ndarray) -> None:
+        """ Dead players and the exempt player implicitly allow. """
+        self.allow[g] = self.revealed[g].all(axis=2)
+        self.allow[g, exempt] = True
+
+    def _target_alive(self, g: np.ndarray, target: np.ndarray) -> np.ndarray:
+        t = np.clip(target, 0, self.n_players - 1)
+        return (target >= 0) & ~self.revealed[g, t].all(axis=1)
+
+    def _has(self, g: np.ndarray, player: np.ndarray, role: np.ndarray) -> np.ndarray:
+        return ((self.roles[g, player] == role[:, None]) & ~self.revealed[g, player]).any(axis=1)
+
+    def _slot(self, g: np.ndarray, player: np.ndarray, role: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Leftmost unrevealed slot (holding role if given). """
+        free = ~self.revealed[g, player]
+        if role is not None:
+            free &= self.roles[g, player] == role[:, None]
+        return np.where(free[:, 0], 0, 1)
+
+    def _draw(self, g: np.ndarray) -> np.ndarray:
+        """ Draws one card per game, uniformly over the cards left in the deck. """
+        cum = self.deck[g].cumsum(axis=1)
+        pick = (self.rng.random(len(g)) * cum[:, -1]).astype(np.int64)
+        role = (cum <= pick[:, None]).sum(axis=1)
+        self.deck[g, role] -= 1
+        return role
+
+    def _swap_claimed(self, g: np.ndarray, player: np.ndarray, role: np.ndarray) -> None:
+        """ A proven role is shuffled back into the deck and replaced by a new card. """
+        slot = self._slot(g, player, role)
+        self.deck[g, role] += 1
+        self.roles[g, player, slot] = self._draw(g)
+
+    def _still_valid(self, g: np.ndarray) -> np.ndarray:
+        act = self.action[g]
+        valid = ~self.revealed[g, self.player_turn[g]].all(axis=1)
+        valid &= (act != _ASSASSINATE) | self._target_alive(g, self.target[g])
+        return valid | (act == _NOP)
+
+    def _can_be_blocked(self, g: np.ndarray) -> np.ndarray:
+        act = self.action[g]
+        targeted = (act == _STEAL) | (act == _ASSASSINATE)
+        return (act == _F_AID) | (targeted & self._target_alive(g, self.target[g]))
+
+    # transitions
+
+    def _next_turn(self, g: np.ndarray) -> None:
+        if not g.size:
+            return
+        alive = ~self.revealed[g].all(axis=2)
+        rows = np.arange(len(g))
+        seats = (self.player_turn[g, None] + np.arange(1, self.n_players + 1)) % self.n_players
+        following = seats[rows, alive[rows[:, None], seats].argmax(axis=1)]
+        over = alive.sum(axis=1) == 1
+        self.player_turn[g[~over]] = following[~over]
+        self.winner[g[over]] = alive[over].argmax(axis=1)
+        self._clear_action(g)
+        self._enter(g, _START_TURN)
+
+    def _resolve(self, g: np.ndarray) -> None:
+        """ Resolves the queued action. """
+        act = self.action[g]
+        turn = self.player_turn[g]
+        for code, gain in _CASH_GAIN:
+            m = act == code
+            self.cash[g[m], turn[m]] += gain
+        m = act == _STEAL
+        gs, victim = g[m], self.target[g[m]]
+        amount = np.minimum(self.cash[gs, victim], STEAL_TRADE)
+        self.cash[gs, victim] -= amount
+        self.cash[gs, turn[m]] += amount
+        self._next_turn(g[np.isin(act, _ENDS_TURN)])
+
+        ga = g[act == _ASSASSINATE]
+        victim = self.target[ga]
+        self._clear_action(ga)
+        self._resolve_reveal(ga, victim, np.zeros(len(ga), bool))
+
+        self._deal_exchange(g[act == _EXCHANGE_ACTION])
+
+    def _deal_exchange(self, g: np.ndarray) -> None:
+        if not g.size:
+            return
+        turn = self.player_turn[g]
+        hand = self.roles[g, turn]
+        revealed = self.revealed[g, turn]
+        both = ~revealed.any(axis=1)
+        first = np.where(revealed[:, 0], hand[:, 1], hand[:, 0])
+        op1 = self._draw(g)
+        op2 = self._draw(g)
+        options = self.exchange_options
+        options[g, 0] = first
+        options[g, 1] = np.where(both, hand[:, 1], op1)
+        options[g, 2] = np.where(both, op1, op2)
+        options[g, 3] = np.where(both, op2, -1)
+        self.allow[g] = False
+        self._enter(g, _EXCHANGE)
+
+    def _resolve_reveal(self, g: np.ndarray, player: np.ndarray, block_next: np.ndarray) -> None:
+        """ Same as mutiny.states.reveal.resolve_reveal, with the queued action stored in self.action. """
+        if not g.size:
+            return
+        count = 2 - self.revealed[g, player].sum(axis=1)
+        many = count > 1
+        gm = g[many]
+        self.reveal_id[gm] = player[many]
+        self.block_next[gm] = block_next[many]
+        self.allow[gm] = False
+        self._enter(gm, _REVEAL)
+
+        g, player, block_next = g[~many], player[~many], block_next[~many]
+        one = count[~many] == 1
+        self.revealed[g[one], player[one], self._slot(g[one], player[one])] = True
+        self._after_reveal(g, block_next)
+
+    def _after_reveal(self, g: np.ndarray, block_next: np.ndarray) -> None:
+        self.reveal_id[g] = -1
+        self.block_next[g] = False
+        valid = self._still_valid(g)
+        blocking = valid & block_next & self._can_be_blocked(g)
+        gb = g[blocking]
+        self._open_window(gb, self.player_turn[gb])
+        self._enter(gb, _WAIT_BLOCK)
+        self._resolve(g[valid & ~blocking])
+        self._next_turn(g[~valid])
+
+    # command handlers: each takes the games where seat issued the command and returns which were valid
+
+    def _noop(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        state = self.state[g]
+        ok = self.allow[g, seat].copy()
+        m = (state == _START_TURN) | (state == _EXCHANGE)
+        ok[m] = self.player_turn[g[m]] != seat
+        m = state == _REVEAL
+        ok[m] = self.reveal_id[g[m]] != seat
+        m = state == _WAIT_BLOCK
+        ok[m] |= (self.action[g[m]] != _F_AID) & (self.target[g[m]] != seat)
+        return ok
+
+    def _play_action(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        act = cmd.action[g, seat]
+        target = cmd.target[g, seat]
+        cash = self.cash[g, seat]
+        targeted = np.isin(act, _TARGETED)
+
+        ok = (self.state[g] == _START_TURN) & (self.player_turn[g] == seat)
+        ok &= (act >= 0) & (act < len(ActionEnum)) & (act != _NOP)
+        ok &= (cash < CASH_LIMIT) | (act == _COUP)
+        ok &= (act != _ASSASSINATE) | (cash >= ASSASSINATE_COST)
+        ok &= (act != _COUP) | (cash >= COUP_COST)
+        ok &= ~targeted | ((target < self.n_players) & (target != seat) & self._target_alive(g, target))
+        g, act, target, targeted = g[ok], act[ok], target[ok], targeted[ok]
+
+        m = act == _INCOME
+        self.cash[g[m], seat] += INCOME_GAIN
+        self._next_turn(g[m])
+
+        m = act == _COUP
+        self.cash[g[m], seat] -= COUP_COST
+        self._resolve_reveal(g[m], target[m], np.zeros(m.sum(), bool))
+
+        m = (act != _INCOME) & (act != _COUP)
+        g, act, target, targeted = g[m], act[m], target[m], targeted[m]
+        self.cash[g[act == _ASSASSINATE], seat] -= ASSASSINATE_COST
+        self.action[g] = act
+        self.target[g] = np.where(targeted, target, -1)
+        self._open_window(g, np.full(len(g), seat))
+        self._enter(g, _WAIT_ACTION)
+        return ok
+
+    def _block(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        state = self.state[g]
+        role = cmd.role[g, seat]
+        valid_role = (role >= 0) & (role < N_ROLES)
+
+        ok = (state == _WAIT_BLOCK) | ((state == _WAIT_ACTION) & self._can_be_blocked(g))
+        ok &= ~self.allow[g, seat] & valid_role
+        ok &= _BLOCKS[self.action[g], np.where(valid_role, role, 0)]
+        ok &= (role == _DUKE) | (self.target[g] == seat)
+
+        g = g[ok]
+        self.blocker[g] = seat
+        self.block_role[g] = role[ok]
+        self._open_window(g, np.full(len(g), seat))
+        self._enter(g, _WAIT_BLOCK_RESPONSE)
+        return ok
+
+    def _challenge(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        state = self.state[g]
+        ok = ((state == _WAIT_ACTION) & np.isin(self.action[g], _CHALLENGEABLE)) | (state == _WAIT_BLOCK_RESPONSE)
+        ok &= ~self.allow[g, seat]
+        on_block = state[ok] == _WAIT_BLOCK_RESPONSE
+        g = g[ok]
+
+        # challenging the action
+        ga = g[~on_block]
+        claimant = self.player_turn[ga]
+        role = _ACTION_ROLE[self.action[ga]]
+        honest = self._has(ga, claimant, role)
+        self._swap_claimed(ga[honest], claimant[honest], role[honest])
+        self._resolve_reveal(ga[honest], np.full(honest.sum(), seat), np.ones(honest.sum(), bool))
+
+        gl, claimant = ga[~honest], claimant[~honest]
+        refund = self.action[gl] == _ASSASSINATE
+        self.cash[gl[refund], claimant[refund]] += ASSASSINATE_COST
+        self._clear_action(gl)
+        self._resolve_reveal(gl, claimant, np.zeros(len(gl), bool))
+
+        # challenging the block
+        gb = g[on_block]
+        blocker = self.blocker[gb]
+        role = self.block_role[gb]
+        honest = self._has(gb, blocker, role)
+        self.blocker[gb] = -1
+        self.block_role[gb] = -1
+        gh = gb[honest]
+        self._swap_claimed(gh, blocker[honest], role[honest])
+        self._clear_action(gh)
+        self._resolve_reveal(gh, np.full(len(gh), seat), np.zeros(len(gh), bool))
+        self._resolve_reveal(gb[~honest], blocker[~honest], np.zeros((~honest).sum(), bool))
+        return ok
+
+    def _allow(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        state = self.state[g]
+        ok = np.isin(state, (_WAIT_ACTION, _WAIT_BLOCK, _WAIT_BLOCK_RESPONSE)) & ~self.allow[g, seat]
+        g, state = g[ok], state[ok]
+        self.allow[g, seat] = True
+
+        # targeted actions only require permission of the target after a challenge
+        act, target = self.action[g], self.target[g]
+        target_allowed = self.allow[g, np.clip(target, 0, self.n_players - 1)]
+        by_target = (state == _WAIT_BLOCK) & ((act == _STEAL) | (act == _ASSASSINATE)) & target_allowed
+        settled = self.allow[g].all(axis=1) | by_target
+        self._resolve(g[settled & (state != _WAIT_BLOCK_RESPONSE)])
+        # a block nobody challenged stops the action
+        self._next_turn(g[settled & (state == _WAIT_BLOCK_RESPONSE)])
+        return ok
+
+    def _reveal(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        role = cmd.role[g, seat]
+        players = np.full(len(g), seat)
+        ok = (self.state[g] == _REVEAL) & (self.reveal_id[g] == seat)
+        ok &= (role >= 0) & (role < N_ROLES) & self._has(g, players, role)
+        g, role, players = g[ok], role[ok], players[ok]
+        self.revealed[g, seat, self._slot(g, players, role)] = True
+        self._after_reveal(g, self.block_next[g].copy())
+        return ok
+
+    def _exchange(self, g: np.ndarray, seat: int, cmd: _Command) -> np.ndarray:
+        keep = cmd.keep[g, seat]
+        revealed = self.revealed[g, seat]
+        kept = (keep[:, :, None] == np.arange(N_ROLES)).sum(axis=1)
+        offered = (self.exchange_options[g][:, :, None] == np.arange(N_ROLES)).sum(axis=1)
+        n_keep = (keep >= 0).sum(axis=1)
+
+        ok = (self.state[g] == _EXCHANGE) & (self.player_turn[g] == seat)
+        ok &= (keep[:, 0] >= 0) & (keep < N_ROLES).all(axis=1)
+        ok &= n_keep == 2 - revealed.sum(axis=1)
+        ok &= (kept <= offered).all(axis=1)
+        g, keep, revealed, n_keep = g[ok], keep[ok], revealed[ok], n_keep[ok]
+
+        # kept roles fill the unrevealed slots from the right, as in states.exchange
+        two = n_keep == 2
+        self.roles[g[two], seat, 0] = keep[two, 1]
+        self.roles[g[two], seat, 1] = keep[two, 0]
+        one = ~two
+        self.roles[g[one], seat, np.where(revealed[one, 0], 1, 0)] = keep[one, 0]
+        self.deck[g] += (offered - kept)[ok]
+        self._next_turn(g)
+        return ok
+
+    _HANDLERS = (
+        (CommandEnum.NOOP, _noop),
+        (CommandEnum.ACTION, _play_action),
+        (CommandEnum.BLOCK, _block),
+        (CommandEnum.CHALLENGE, _challenge),
+        (CommandEnum.ALLOW, _allow),
+        (CommandEnum.REVEAL, _reveal),
+        (CommandEnum.EXCHANGE, _exchange),
+    )
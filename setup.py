@@ -1,3 +1,4 @@
 from setuptools import setup, find_packages
 
-setup(name='mutiny', version='0.1', packages=find_packages())
+setup(name='mutiny', version='0.1', packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
+      extras_require={'vector': ['numpy']})
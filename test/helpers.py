@@ -0,0 +1,22 @@
+"""
+Random play shared by the tests. Games shuffle with their own generator, so runs with the same
+rng seed can be repeated.
+"""
+
+
+def random_step(rng, game):
+    """ Issues a random legal command, other than noop, of a random pending player. Returns (player_id, action_idx). """
+    p = rng.choice(game.pending_decisions())
+    mask = game.legal_actions(p)
+    action_idx = rng.choice([i for i, ok in enumerate(mask) if ok and i != game.action_space.noop])
+    game.step_index(p, action_idx)
+    return p, action_idx
+
+
+def play(game, rng, steps=None):
+    """ Plays random_step until the game ends, or for at most steps commands. Returns the full view after every command. """
+    views = []
+    while not game.game_is_over() and (steps is None or len(views) < steps):
+        random_step(rng, game)
+        views.append(game.to_dict())
+    return views
@@ -0,0 +1,232 @@
+import copy
+import random
+import unittest
+
+from mutiny import game_object
+from mutiny.game_object import GameObject
+from mutiny.game_enum import ActionEnum, CommandEnum, RoleEnum, StateEnum
+from mutiny.action_space import ActionSpace, Command, TARGETED_ACTIONS
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.states.player_turn import PlayerTurn
+from mutiny.states.wait_for_action_response import WaitForActionResponse
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+def error_checks(space: ActionSpace):
+    """ For every index of space, a function (state, player_id) -> ErrorEnum or None. """
+    checks = [None] * space.size
+    checks[space.noop] = lambda s, p: s.error_on_noop(p)
+    checks[space.actions[ActionEnum.INCOME]] = lambda s, p: s.error_on_income(p)
+    checks[space.actions[ActionEnum.F_AID]] = lambda s, p: s.error_on_f_aid(p)
+    checks[space.actions[ActionEnum.TAX]] = lambda s, p: s.error_on_tax(p)
+    checks[space.actions[ActionEnum.EXCHANGE]] = lambda s, p: s.error_on_exchange(p)
+    for t in range(space.n_players):
+        checks[space.actions[ActionEnum.ASSASSINATE] + t] = lambda s, p, t=t: s.error_on_assassinate(p, t)
+        checks[space.actions[ActionEnum.STEAL] + t] = lambda s, p, t=t: s.error_on_steal(p, t)
+        checks[space.actions[ActionEnum.COUP] + t] = lambda s, p, t=t: s.error_on_coup(p, t)
+    for role, i in space.blocks.items():
+        checks[i] = lambda s, p, role=role: s.error_on_block(p, role)
+    checks[space.challenge] = lambda s, p: s.error_on_challenge(p)
+    checks[space.allow] = lambda s, p: s.error_on_allow(p)
+    for role, i in space.reveals.items():
+        checks[i] = lambda s, p, role=role: s.error_on_reveal(p, role)
+    for roles, i in space.replaces.items():
+        checks[i] = lambda s, p, roles=roles: s.error_on_replace(p, roles)
+    return checks
+
+
+class ActionSpaceTest(unittest.TestCase):
+
+    def test_layout(self):
+        space = ActionSpace(6)
+        indices = [space.noop, space.challenge, space.allow]
+        indices += [space.action_index(a, t) for a in TARGETED_ACTIONS for t in range(6)]
+        indices += [space.actions[a] for a in space.actions if a not in TARGETED_ACTIONS]
+        indices += list(space.blocks.values()) + list(space.reveals.values()) + list(space.replaces.values())
+        self.assertEqual(sorted(indices), list(range(space.size)))
+
+    def test_replace_index_is_order_free(self):
+        space = ActionSpace(6)
+        self.assertEqual(space.replace_index((RoleEnum.AMBASSADOR, RoleEnum.DUKE)),
+                         space.replace_index((RoleEnum.DUKE, RoleEnum.AMBASSADOR)))
+
+    def test_encode_decode(self):
+        space = ActionSpace(4)
+        self.assertEqual(len(set(space.decode)), space.size)
+        for i, command in enumerate(space.decode):
+            self.assertEqual(space.encode(*command), i)
+            self.assertEqual(space.from_emission(space.to_emission(i, 7)), i)
+        self.assertEqual(space.decode[space.action_index(ActionEnum.COUP, 2)],
+                         Command(CommandEnum.ACTION, action=ActionEnum.COUP, target=2))
+        self.assertEqual(space.encode(CommandEnum.EXCHANGE, roles=(RoleEnum.CONTESSA, RoleEnum.DUKE)),
+                         space.replaces[(RoleEnum.DUKE, RoleEnum.CONTESSA)])
+        self.assertEqual(space.from_emission({"command": "play-action", "action": "income", "stateId": 3}),
+                         space.actions[ActionEnum.INCOME])
+        self.assertRaises(KeyError, space.encode, CommandEnum.BLOCK, role=RoleEnum.ASSASSIN)
+
+
+class LegalActionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = GameObject(PLAYERS)
+        self.game.game_data.player_turn = 0
+        self.game._state_interface = PlayerTurn(data=self.game.game_data)
+        self.space = self.game.action_space
+
+    def test_player_turn(self):
+        mask = self.game.legal_actions(0)
+        self.assertTrue(mask[self.space.actions[ActionEnum.INCOME]])
+        self.assertTrue(mask[self.space.action_index(ActionEnum.STEAL, 1)])
+        self.assertFalse(mask[self.space.action_index(ActionEnum.STEAL, 0)])
+        self.assertFalse(mask[self.space.action_index(ActionEnum.ASSASSINATE, 1)])
+        self.assertFalse(mask[self.space.noop])
+        self.assertEqual(self.game.legal_actions(1), [i == self.space.noop for i in range(self.space.size)])
+
+    def test_must_coup(self):
+        self.game.game_data.active_player.cash = 10
+        self.game.game_data.players[2].hand[0].revealed = True
+        self.game.game_data.players[2].hand[1].revealed = True
+        self.game.game_data.refresh_alive()
+        legal = [i for i, ok in enumerate(self.game.legal_actions(0)) if ok]
+        self.assertEqual(legal, [self.space.action_index(ActionEnum.COUP, t) for t in (1, 3, 4, 5)])
+
+    def test_dead_player_only_noops(self):
+        for inf in self.game.game_data.players[3].hand:
+            inf.revealed = True
+        self.game.game_data.refresh_alive()
+        self.game.command(0, self.game.get_state_id(), {"command": "play-action", "action": "foreign-aid"})
+        self.assertIsInstance(self.game._state_interface, WaitForActionResponse)
+        mask = self.game.legal_actions(3)
+        self.assertEqual([i for i, ok in enumerate(mask) if ok], [self.space.noop])
+        mask = self.game.legal_actions(1)
+        self.assertEqual([i for i, ok in enumerate(mask) if ok],
+                         sorted([self.space.allow, self.space.blocks[RoleEnum.DUKE]]))
+
+    def test_matches_error_on(self):
+        """ Plays random legal moves and checks every mask entry against the error_on_* methods. """
+        rng = random.Random(0)
+        checks = error_checks(self.space)
+        seen = set()
+        for _ in range(20):
+            game = GameObject(PLAYERS)
+            steps = 0
+            while not game.game_is_over() and steps < 1000:
+                steps += 1
+                seen.add(game.get_state_name)
+                masks = game.legal_actions_all()
+                self.assertEqual(masks, [game.legal_actions(p) for p in range(len(PLAYERS))])
+                pending = game.pending_decisions()
+                self.assertEqual(pending, [p for p, mask in enumerate(masks) if not mask[self.space.noop]])
+                self.assertTrue(all(any(masks[p][1:]) for p in pending))
+                for p, mask in enumerate(masks):
+                    for i, check in enumerate(checks):
+                        expected = check(game._state_interface, p) is None
+                        if game.player_is_done(p) and i != self.space.noop:
+                            expected = False
+                        self.assertEqual(mask[i], expected, (game.get_state_name, p, i))
+
+                p = rng.choice([p for p in range(len(PLAYERS)) if any(masks[p][1:])])
+                i = rng.choice([i for i, ok in enumerate(masks[p]) if ok and i != self.space.noop])
+                self.assertIsNone(checks[i](game._state_interface, p))
+                game.step_index(p, i)
+            self.assertTrue(game.game_is_over())
+        self.assertEqual(seen, set(StateEnum))
+
+    def test_pending_driver(self):
+        """ Only sending commands to pending players plays whole games with a fraction of the commands. """
+        rng = random.Random(2)
+        commands = 0
+        for _ in range(20):
+            game = GameObject(PLAYERS)
+            while not game.game_is_over():
+                state_id = game.get_state_id()
+                pending = game.pending_decisions()
+                self.assertTrue(pending)
+                for p in pending:
+                    mask = game.legal_actions(p)
+                    game.step_index(p, rng.choice([i for i, ok in enumerate(mask) if ok]), state_id)
+                    commands += 1
+                    if game.get_state_id() != state_id:
+                        break
+            self.assertEqual(game.pending_decisions(), [])
+        self.assertLess(commands, 20 * 200)
+
+
+class StepIndexTest(unittest.TestCase):
+
+    def test_matches_command(self):
+        """ step_index and command applied to copies of the same game stay identical. """
+        rng = random.Random(1)
+        for _ in range(10):
+            game = GameObject(PLAYERS)
+            mirror = copy.deepcopy(game)
+            space = game.action_space
+            while not game.game_is_over():
+                p = rng.randrange(len(PLAYERS))
+                i = rng.randrange(space.size)
+                state_id = game.get_state_id()
+                try:
+                    game.step_index(p, i, state_id)
+                except InvalidMove:
+                    self.assertRaises(InvalidMove, mirror.command, p, state_id, space.to_emission(i, state_id))
+                    continue
+                mirror.command(p, state_id, space.to_emission(i, state_id))
+                self.assertEqual(game.to_dict(), mirror.to_dict())
+
+    def test_stale_state_id_is_ignored(self):
+        game = GameObject(PLAYERS)
+        state_id = game.get_state_id()
+        game.step_index(game.get_player_turn, game.action_space.actions[ActionEnum.INCOME], state_id - 1)
+        self.assertEqual(game.get_state_id(), state_id)
+
+    def test_trusted_matches_checked(self):
+        """ Legal commands issued with step_trusted play the same games as with step_index. """
+        rng = random.Random(3)
+        for seed in range(10):
+            game = GameObject(PLAYERS, seed=seed)
+            trusted = GameObject(PLAYERS, seed=seed)
+            trusted.enable_pooling(seed % 2 == 1)
+            while not game.game_is_over():
+                p = rng.choice(game.pending_decisions())
+                i = rng.choice([i for i, ok in enumerate(game.legal_actions(p)) if ok])
+                game.step_index(p, i)
+                trusted.step_trusted(p, i)
+                self.assertEqual(trusted.to_dict(), game.to_dict())
+                self.assertEqual(trusted.get_state_id(), game.get_state_id())
+
+    def test_check_trusted(self):
+        game = GameObject(PLAYERS, seed=0)
+        other = (game.get_player_turn + 1) % len(PLAYERS)
+        game_object.CHECK_TRUSTED = True
+        try:
+            self.assertRaises(AssertionError, game.step_trusted, other, game.action_space.actions[ActionEnum.INCOME])
+            game.step_trusted(game.get_player_turn, game.action_space.actions[ActionEnum.INCOME])
+        finally:
+            game_object.CHECK_TRUSTED = False
+        self.assertEqual(game.get_player_turn, other)
+
+    def test_error_codes(self):
+        game = GameObject(PLAYERS, seed=0)
+        space = game.action_space
+        turn = game.get_player_turn
+        other = (turn + 1) % len(PLAYERS)
+        with self.assertRaises(InvalidMove) as raised:
+            game.step_index(other, space.actions[ActionEnum.INCOME])
+        self.assertEqual(raised.exception.code, ErrorEnum.NOT_TURN)
+        self.assertEqual(str(raised.exception), "Not player {}'s turn".format(other))
+        with self.assertRaises(InvalidMove) as raised:
+            game.step_index(turn, space.actions[ActionEnum.STEAL] + turn)
+        self.assertEqual(raised.exception.code, ErrorEnum.SELF_TARGET)
+        with self.assertRaises(InvalidMove) as raised:
+            game.step_index(turn, space.challenge)
+        self.assertEqual(raised.exception.code, ErrorEnum.INVALID_TRANSITION)
+        self.assertEqual(raised.exception.message, "Cannot challenge on {}".format(StateEnum.START_TURN))
+        self.assertEqual(game._state_interface.error_on_steal(turn, other), None)
+        # messages given directly, as before error codes, are kept as they are
+        self.assertEqual(str(InvalidMove("text")), "text")
+        self.assertIsNone(InvalidMove("text").code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import io
+import random
+import unittest
+
+from mutiny.game_object import GameObject
+from mutiny.game_enum import ActionEnum, StateEnum
+from mutiny.instrument import TransitionStats
+from mutiny.record import TrajectoryReader, TrajectoryWriter
+
+from helpers import play, random_step
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class AutoAllowTest(unittest.TestCase):
+
+    def test_always_allow(self):
+        game = GameObject(PLAYERS, seed=0)
+        others = [p for p in range(len(PLAYERS)) if p != game.get_player_turn]
+        game.set_auto_allow(always_allow=others)
+        turn = game.get_player_turn
+        game.step_index(turn, game.action_space.actions[ActionEnum.TAX])
+        # nobody contests the tax, so it resolves within the command
+        self.assertEqual(game.get_state_name, StateEnum.START_TURN)
+        self.assertEqual(game.players[turn].cash, 5)
+
+    def test_matches_explicit_allows(self):
+        """ Logs of games with automatic allows replay on games without them. """
+        rng = random.Random(0)
+        out = io.BytesIO()
+        finals, sent = [], 0
+        with TrajectoryWriter(out) as writer:
+            for seed in range(20):
+                game = writer.start_game(PLAYERS, seed=seed)
+                game.set_auto_allow(always_allow=[0, 2, 4])
+                sent += len(play(game, rng))
+                finals.append(game.to_dict())
+        out.seek(0)
+        trajectories = list(TrajectoryReader(out))
+        self.assertEqual([t.replay().to_dict() for t in trajectories], finals)
+        # the log also holds the automatic allows
+        self.assertLess(sent, sum(len(t.steps) for t in trajectories))
+
+    def test_undo_and_instrument(self):
+        """ Every automatic allow is a command of its own, counted by the instrument and undone alone. """
+        rng = random.Random(2)
+        game = GameObject(PLAYERS, seed=3)
+        stats = TransitionStats()
+        game.set_instrument(stats)
+        game.enable_journal()
+        game.set_auto_allow(always_allow=[1, 2, 3, 4, 5])
+        automatic = 0
+        while not game.game_is_over():
+            before = game.snapshot()
+            counted = stats.snapshot()["commands"]
+            random_step(rng, game)
+            after = game.snapshot()
+            commands = stats.snapshot()["commands"] - counted
+            automatic += commands - 1
+            snapshots = {after}
+            for _ in range(commands - 1):
+                game.undo()
+                snapshots.add(game.snapshot())
+            self.assertEqual(len(snapshots), commands)
+            self.assertNotIn(before, snapshots)
+            game.undo()
+            self.assertEqual(game.snapshot(), before)
+            game.restore(after)
+        self.assertGreater(automatic, 0)
+        self.assertEqual(stats.snapshot()["games"], 1)
+        game.set_auto_allow(False)
+        self.assertIsNone(game._auto_allow)
+
+
+if __name__ == '__main__':
+    unittest.main()
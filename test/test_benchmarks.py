@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks import compare
+from benchmarks.__main__ import main
+
+
+class BenchmarksTest(unittest.TestCase):
+
+    def test_compare(self):
+        baseline = {"games_per_second": 100.0, "clone_us": 10.0, "reset_us": 10.0, "new_us": 5.0}
+        results = {"games_per_second": 85.0, "clone_us": 10.5, "reset_us": 12.0, "bytes_per_game": 1.0}
+        regressions = compare(baseline, results, 0.1)
+        self.assertEqual([line.split(":")[0] for line in regressions], ["games_per_second", "reset_us"])
+        self.assertEqual(compare(baseline, results, 0.25), [])
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.json")
+            args = ["--only", "views,lifecycle", "--games", "5", "--repeat", "1", "--warmup", "0", "--output", path]
+            self.assertEqual(main(args), 0)
+            with open(path) as f:
+                report = json.load(f)
+            self.assertIn("to_dict_us.player", report["results"])
+            self.assertIn("reset_us", report["results"])
+            self.assertEqual(report["meta"]["config"], {"games": 5, "repeat": 1, "warmup": 0, "seed": 0, "quick": False})
+            # compared with results a thousand times faster, everything regressed
+            report["results"] = {metric: value / 1000 for metric, value in report["results"].items()}
+            with open(path, "w") as f:
+                json.dump(report, f)
+            self.assertEqual(main(args[:-2] + ["--output", os.path.join(tmp, "new.json"), "--baseline", path]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
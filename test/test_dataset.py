@@ -0,0 +1,76 @@
+import io
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from mutiny.dataset import ShardedDataset, export_dataset, game_rows
+from mutiny.record import TrajectoryReader, TrajectoryWriter
+
+PLAYERS = ["A", "B", "C", "D"]
+
+
+def record(n_games, players=PLAYERS):
+    """ Records n_games random games, returning their trajectories. """
+    rng = random.Random(0)
+    out = io.BytesIO()
+    with TrajectoryWriter(out) as writer:
+        for seed in range(n_games):
+            game = writer.start_game(players, seed=seed)
+            while not game.game_is_over():
+                masks = game.legal_actions_all()
+                p = rng.choice([p for p in range(len(players)) if any(masks[p][1:])])
+                game.step_index(p, rng.choice([i for i, ok in enumerate(masks[p]) if ok and i > 0]))
+    out.seek(0)
+    return list(TrajectoryReader(out))
+
+
+class DatasetTest(unittest.TestCase):
+
+    def test_rows(self):
+        trajectory = record(1)[0]
+        rows = game_rows(trajectory)
+        game = trajectory.replay(3)
+        step = trajectory.steps[3]
+        self.assertEqual(rows["observation"][3].tolist(), game.encode_observation(step.player_id))
+        self.assertEqual(rows["mask"][3].tolist(), game.legal_actions(step.player_id))
+        self.assertTrue(rows["mask"][np.arange(len(rows["action"])), rows["action"]].all())
+        winner = trajectory.replay().game_data.winner_id
+        np.testing.assert_array_equal(rows["reward"] == 1, rows["player"] == winner)
+
+    def test_mismatched_step(self):
+        trajectory = record(1)[0]
+        step = trajectory.steps[2]
+        trajectory.steps[2] = step._replace(state_id=step.state_id + 1)
+        self.assertRaises(RuntimeError, game_rows, trajectory)
+
+    def test_export_and_sample(self):
+        trajectories = record(8)
+        expected = [game_rows(trajectory) for trajectory in trajectories]
+        expected = {field: np.concatenate([rows[field] for rows in expected]) for field in expected[0]}
+        with tempfile.TemporaryDirectory() as tmp:
+            index = export_dataset(iter(trajectories), tmp, shard_size=100)
+            self.assertEqual(index["games"], 8)
+            self.assertEqual(index["rows"], len(expected["action"]))
+            self.assertTrue(all(rows == 100 for rows in index["shards"][:-1]))
+
+            dataset = ShardedDataset(tmp)
+            self.assertEqual(len(dataset), index["rows"])
+            self.assertIsInstance(dataset.shards[0]["observation"], np.memmap)
+            rows = np.arange(len(dataset))[::-1]
+            for field, values in dataset[rows].items():
+                np.testing.assert_array_equal(values, expected[field][rows], field)
+            batch = dataset.sample(64, np.random.default_rng(0))
+            self.assertEqual(batch["observation"].shape, (64, index["shapes"]["observation"][0]))
+            self.assertEqual(batch["reward"].dtype, np.float32)
+            del dataset, batch
+
+    def test_mixed_player_counts(self):
+        trajectories = record(1) + record(1, PLAYERS[:3])
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertRaises(ValueError, export_dataset, trajectories, tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
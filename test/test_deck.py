@@ -0,0 +1,85 @@
+import random
+import unittest
+from collections import Counter
+
+from mutiny.deck import CountDeck
+from mutiny.game_enum import RoleEnum
+from mutiny.game_object import GameObject
+
+from helpers import random_step
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class CountDeckTest(unittest.TestCase):
+
+    def test_list_methods(self):
+        deck = CountDeck([RoleEnum.DUKE, RoleEnum.CAPTAIN, RoleEnum.DUKE], random.Random(0))
+        self.assertEqual(len(deck), 3)
+        self.assertEqual(deck.count(RoleEnum.DUKE), 2)
+        self.assertEqual(list(deck), [RoleEnum.DUKE, RoleEnum.DUKE, RoleEnum.CAPTAIN])
+        deck.remove(RoleEnum.CAPTAIN)
+        self.assertRaises(ValueError, deck.remove, RoleEnum.CAPTAIN)
+        self.assertEqual(deck, CountDeck([RoleEnum.DUKE] * 2, random.Random(1)))
+        self.assertEqual([deck.pop(), deck.pop()], [RoleEnum.DUKE, RoleEnum.DUKE])
+        self.assertRaises(IndexError, deck.pop)
+
+    def test_same_distribution_as_shuffled_list(self):
+        """ Returning a card then drawing gives each role with the same frequencies for both decks. """
+        rng = random.Random(0)
+        cards = [RoleEnum.DUKE] + [RoleEnum.CAPTAIN] * 2 + [RoleEnum.CONTESSA] * 5
+        n = 20000
+        shuffled = Counter()
+        counted = Counter()
+        for _ in range(n):
+            deck = list(cards)
+            rng.shuffle(deck)
+            shuffled[deck.pop()] += 1
+            counted[CountDeck(cards, rng).pop()] += 1
+        for role in set(cards):
+            expected = cards.count(role) / len(cards)
+            self.assertAlmostEqual(shuffled[role] / n, expected, delta=0.015)
+            self.assertAlmostEqual(counted[role] / n, expected, delta=0.015)
+
+
+class CountedGameTest(unittest.TestCase):
+
+    def test_games_keep_every_card(self):
+        rng = random.Random(1)
+        for seed in range(5):
+            game = GameObject(PLAYERS, seed=seed, counted_deck=True)
+            data = game.game_data
+            self.assertIsInstance(data.deck, CountDeck)
+            while not game.game_is_over():
+                exchange = game.get_exchanges or ()
+                hands = [inf.role for player in game.players for inf in player.hand]
+                kept = [inf.role for inf in data.active_player.hand if not inf.revealed] if exchange else []
+                for role in RoleEnum:
+                    self.assertEqual(data.deck.count(role) + hands.count(role) + list(exchange).count(role)
+                                     - kept.count(role), 3)
+                random_step(rng, game)
+
+    def test_seeded_and_cloned(self):
+        rng = random.Random(2)
+        game = GameObject(PLAYERS, seed=3, counted_deck=True)
+        for _ in range(20):
+            random_step(rng, game)
+        clone = game.clone()
+        self.assertIsInstance(clone.game_data.deck, CountDeck)
+        self.assertEqual(clone.snapshot(), game.snapshot())
+        self.assertEqual(GameObject(PLAYERS, seed=3, counted_deck=True).to_dict(),
+                         GameObject(PLAYERS, seed=3, counted_deck=True).to_dict())
+
+    def test_draw_probability(self):
+        for counted_deck in (False, True):
+            data = GameObject(PLAYERS, seed=0, counted_deck=counted_deck).game_data
+            distribution = data.draw_distribution()
+            self.assertAlmostEqual(sum(distribution.values()), 1)
+            for role in RoleEnum:
+                self.assertEqual(distribution[role], data.deck.count(role) / 3)
+            data.return_card(RoleEnum.DUKE)
+            self.assertEqual(data.draw_probability(RoleEnum.DUKE), (data.deck.count(RoleEnum.DUKE)) / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import random
+import unittest
+
+import numpy as np
+
+from mutiny.env import MutinyAEC, MutinyEnv
+from mutiny.exceptions import InvalidMove
+from mutiny.game_enum import ActionEnum
+
+
+def choose(rng, mask):
+    return rng.choice([i for i, ok in enumerate(mask) if ok and i > 0])
+
+
+class MutinyEnvTest(unittest.TestCase):
+
+    def test_episodes(self):
+        rng = random.Random(0)
+        env = MutinyEnv({"n_players": 4, "seed": 0})
+        for _ in range(5):
+            obs = env.reset()
+            totals = {p: 0.0 for p in range(4)}
+            finished = set()
+            dones = {"__all__": False}
+            while not dones["__all__"]:
+                acting = [p for p in obs if not dones.get(p)]
+                self.assertTrue(acting)
+                for p, o in obs.items():
+                    self.assertEqual(o["observation"].shape, (env.observation_size,))
+                    self.assertEqual(o["observation"].tolist(), env.game.encode_observation(p))
+                    self.assertEqual(o["action_mask"].tolist(), env.game.legal_actions(p))
+                    self.assertEqual(bool(o["action_mask"][1:].any()), p in acting)
+                obs, rewards, dones, infos = env.step({p: choose(rng, obs[p]["action_mask"]) for p in acting})
+                self.assertEqual(set(rewards), set(obs))
+                for p, reward in rewards.items():
+                    self.assertNotIn(p, finished)
+                    totals[p] += reward
+                    if dones[p]:
+                        finished.add(p)
+            self.assertEqual(finished, set(range(4)))
+            self.assertEqual(sorted(totals.values()), [-1.0, -1.0, -1.0, 1.0])
+            self.assertEqual(totals[env.game.game_data.winner_id], 1.0)
+
+    def test_invalid_action(self):
+        env = MutinyEnv({"n_players": 4, "seed": 5})
+        obs = env.reset()
+        turn, = obs
+        tax = env.game.action_space.actions[ActionEnum.TAX]
+        obs, _, _, _ = env.step({turn: tax})
+        first, second = sorted(obs)[:2]
+        allow = env.game.action_space.allow
+        view = env.game.to_dict()
+        self.assertRaises(InvalidMove, env.step, {first: allow, second: 0})
+        # nothing was issued, and the same players are asked again
+        self.assertEqual(env.game.to_dict(), view)
+        obs, _, _, _ = env.step({first: allow, second: allow})
+        self.assertNotIn(first, obs)
+
+    def test_seeded(self):
+        def run(seed):
+            rng = random.Random(1)
+            env = MutinyEnv({"seed": seed})
+            obs, dones, trace = env.reset(), {"__all__": False}, []
+            while not dones["__all__"]:
+                obs, rewards, dones, _ = env.step({p: choose(rng, o["action_mask"]) for p, o in obs.items()
+                                                   if not dones.get(p)})
+                trace.append(env.game.to_dict())
+            return trace
+        self.assertEqual(run(3), run(3))
+
+
+class MutinyAECTest(unittest.TestCase):
+
+    def test_cycle(self):
+        rng = random.Random(2)
+        env = MutinyAEC(n_players=5, seed=1)
+        buffer = np.zeros(env.game.observation_layout.size, np.float32)
+        while not env.done:
+            agent = env.agent_selection
+            self.assertIn(agent, env.agents)
+            observation, mask, reward, done = env.last(out=buffer)
+            self.assertIs(observation, buffer)
+            self.assertFalse(done)
+            env.step(choose(rng, mask))
+        self.assertIsNone(env.agent_selection)
+        self.assertEqual(env.agents, [])
+        self.assertRaises(RuntimeError, env.step, 0)
+        self.assertEqual(sorted(env.reward(p) for p in range(5)), [-1.0] * 4 + [1.0])
+
+    def test_invalid_action(self):
+        env = MutinyAEC(n_players=20, seed=4)
+        agent, waiting = env.agent_selection, list(env.waiting)
+        mask = env.action_mask(agent)
+        self.assertRaises(InvalidMove, env.step, mask.index(False, 1))
+        self.assertEqual(env.agent_selection, agent)
+        self.assertEqual(env.waiting, waiting)
+
+    def test_step_all(self):
+        rng = random.Random(3)
+        env = MutinyAEC(seed=2)
+        while not env.done:
+            env.step_all({agent: choose(rng, env.action_mask(agent)) for agent in env.waiting})
+        self.assertEqual(env.reward(env.game.game_data.winner_id), 1.0)
+        env.reset()
+        self.assertEqual(len(env.agents), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import random
+import unittest
+from collections import Counter
+
+from mutiny.constants import CASH_START
+from mutiny.events import ActionDeclared, Blocked, Challenged, CoinsMoved, GameWon, InfluenceRevealed, TurnEnded
+from mutiny.game_object import GameObject
+from mutiny.policy import random_policy
+
+PLAYERS = ["A", "B", "C", "D", "E"]
+
+
+def play(game, rng, trusted=False):
+    while not game.game_is_over():
+        player_id = rng.choice(game.pending_decisions())
+        action_idx = random_policy(game, player_id, rng)
+        if trusted:
+            game.step_trusted(player_id, action_idx)
+        else:
+            game.step_index(player_id, action_idx)
+
+
+class EventsTest(unittest.TestCase):
+
+    def test_history_matches_game(self):
+        kinds = Counter()
+        outcomes = set()
+        for seed in range(30):
+            game = GameObject(PLAYERS, seed=seed)
+            game.enable_pooling(seed % 2 == 0)
+            received = []
+            game.subscribe(received.append)
+            play(game, random.Random(seed), trusted=seed % 3 == 0)
+            events = list(game.events)
+            self.assertEqual(events, received)
+            kinds.update(type(event) for event in events)
+            outcomes.update(event.won for event in events if isinstance(event, Challenged))
+
+            # coins and reveals replayed from the events give the final table
+            cash = [CASH_START] * len(PLAYERS)
+            revealed = [Counter() for _ in PLAYERS]
+            for event in events:
+                if isinstance(event, CoinsMoved):
+                    if event.from_id is not None:
+                        cash[event.from_id] -= event.amount
+                    if event.to_id is not None:
+                        cash[event.to_id] += event.amount
+                if isinstance(event, InfluenceRevealed):
+                    revealed[event.player_id][event.role] += 1
+                    self.assertEqual(event.eliminated, sum(revealed[event.player_id].values()) == 2)
+            self.assertEqual(cash, [player.cash for player in game.players])
+            self.assertEqual(revealed, [Counter(i.role for i in player.hand if i.revealed) for player in game.players])
+            eliminated = [e.player_id for e in events if isinstance(e, InfluenceRevealed) and e.eliminated]
+            self.assertEqual(sorted(eliminated), [p for p in range(len(PLAYERS)) if p != game.game_data.winner_id])
+
+            self.assertEqual(events[-1], GameWon(events[-1].state_id, game.game_data.winner_id))
+            self.assertIsNone(events[-2].next_player_id)
+            turns = [e for e in events if isinstance(e, TurnEnded)]
+            self.assertEqual(len(turns), sum(isinstance(e, ActionDeclared) for e in events))
+            self.assertEqual([e.state_id for e in events], sorted(e.state_id for e in events))
+            json.dumps(game.events.to_list())
+        self.assertTrue(all(kinds[kind] for kind in (Blocked, Challenged, CoinsMoved)), kinds)
+        self.assertEqual(outcomes, {True, False})
+
+    def test_same_games(self):
+        for seed in range(10):
+            plain, listened = GameObject(PLAYERS, seed=seed), GameObject(PLAYERS, seed=seed)
+            listened.enable_events()
+            play(plain, random.Random(seed))
+            play(listened, random.Random(seed))
+            self.assertEqual(plain.to_dict(), listened.to_dict())
+            self.assertIsNone(plain.events)
+
+    def test_ring_buffer(self):
+        game = GameObject(PLAYERS, seed=1)
+        game.enable_events(capacity=8)
+        received = []
+        game.subscribe(received.append)
+        play(game, random.Random(1))
+        self.assertEqual(game.events.capacity, 8)
+        self.assertEqual(len(game.events), 8)
+        self.assertEqual(game.events.count, len(received))
+        self.assertEqual(list(game.events), received[-8:])
+
+        game.unsubscribe(received.append)
+        game.reset()
+        self.assertEqual(len(game.events), 0)
+        n_received = len(received)
+        play(game, random.Random(2))
+        self.assertGreater(game.events.count, 8)
+        self.assertEqual(len(received), n_received)
+        self.assertIsNone(game.clone().events)
+        game.enable_events(False)
+        self.assertIsNone(game.events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import random
+import unittest
+
+from mutiny.game_object import GameObject
+from mutiny.game_enum import ActionEnum, RoleEnum
+from mutiny.frozen_dict import FrozenDict
+from mutiny.game_data import role_copies, seats
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class ToDictTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = GameObject(PLAYERS)
+        self.space = self.game.action_space
+
+    def test_immutable(self):
+        d = self.game.to_dict(0)
+        self.assertIsInstance(d, FrozenDict)
+        self.assertRaises(TypeError, d.__setitem__, "stateId", 0)
+        self.assertRaises(TypeError, d["state"].update, {"name": "exchange"})
+        self.assertRaises(TypeError, d["players"][0].pop, "cash")
+        self.assertIsInstance(d["players"], tuple)
+        copy = d.copy()
+        copy["stateId"] = 0
+        self.assertEqual(d["stateId"], self.game.get_state_id())
+        self.assertEqual(json.loads(json.dumps(d))["playerIdx"], 0)
+
+    def test_redaction(self):
+        d = self.game.to_dict(1)
+        self.assertNotEqual(d["players"][1]["influence"][0]["role"], "unknown")
+        self.assertEqual(d["players"][0]["influence"][0]["role"], "unknown")
+        full = self.game.to_dict()
+        self.assertIsNone(full["playerIdx"])
+        self.assertTrue(all(inf["role"] != "unknown" for p in full["players"] for inf in p["influence"]))
+
+    def test_cached_until_state_changes(self):
+        d = self.game.to_dict(2)
+        self.assertIs(self.game.to_dict(2), d)
+        self.game.step_index(self.game.get_player_turn, self.space.actions[ActionEnum.TAX])
+        self.assertIsNot(self.game.to_dict(2), d)
+        self.assertEqual(self.game.to_dict(2)["state"]["action"], ActionEnum.TAX.value)
+
+    def test_player_views_reused(self):
+        turn = self.game.get_player_turn
+        other = (turn + 1) % len(PLAYERS)
+        before = self.game.to_dict(other)
+        self.game.step_index(turn, self.space.actions[ActionEnum.INCOME])
+        after = self.game.to_dict(other)
+        self.assertIsNot(after["players"][turn], before["players"][turn])
+        self.assertEqual(after["players"][turn]["cash"], before["players"][turn]["cash"] + 1)
+        self.assertIs(after["players"][other], before["players"][other])
+        # the hidden view of a player is shared by every other perspective
+        self.assertIs(self.game.to_dict(turn)["players"][other], self.game.to_dict((turn + 2) % len(PLAYERS))["players"][other])
+
+
+class AliveTest(unittest.TestCase):
+
+    def test_seats(self):
+        self.assertEqual(seats(0), [])
+        self.assertEqual(seats(0b101001), [0, 3, 5])
+
+    def test_large_tables(self):
+        """ Random games of up to 16 players keep the living players and the deck consistent. """
+        rng = random.Random(0)
+        for n_players in (2, 6, 7, 10, 16):
+            game = GameObject(["P{}".format(i) for i in range(n_players)], seed=n_players)
+            data = game.game_data
+            copies = role_copies(n_players)
+            self.assertGreaterEqual(copies * len(RoleEnum), 2 * n_players + 2)
+            while not game.game_is_over():
+                alive = [p for p in range(n_players) if game.players[p].alive]
+                self.assertEqual(seats(data.alive_mask), alive)
+                self.assertEqual(data.players_left, len(alive))
+                self.assertIn(data.player_turn, alive)
+                exchange = game.get_exchanges or ()
+                hands = [inf.role for player in game.players for inf in player.hand]
+                kept = [inf.role for inf in data.active_player.hand if not inf.revealed] if exchange else []
+                for role in RoleEnum:
+                    self.assertEqual(data.deck.count(role) + hands.count(role) + list(exchange).count(role)
+                                     - kept.count(role), copies)
+                p = rng.choice(game.pending_decisions())
+                mask = game.legal_actions(p)
+                game.step_index(p, rng.choice([i for i, ok in enumerate(mask) if ok]))
+            self.assertEqual(data.winner_id, seats(data.alive_mask)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import random
+import unittest
+
+from mutiny.exceptions import ErrorEnum, InvalidMove
+from mutiny.game_enum import StateEnum
+from mutiny.game_object import GameObject
+from mutiny.instrument import Instrument, TransitionStats
+from mutiny.policy import random_policy
+
+PLAYERS = ["A", "B", "C", "D"]
+
+
+def play(game, rng, sloppy=False):
+    """ Plays game to the end, half of the time with any command when sloppy. Returns the commands applied. """
+    steps = 0
+    while not game.game_is_over():
+        player_id = rng.choice(game.pending_decisions())
+        if sloppy and rng.random() < 0.5:
+            action_idx = rng.randrange(game.action_space.size)
+        else:
+            action_idx = random_policy(game, player_id, rng)
+        try:
+            game.step_index(player_id, action_idx)
+        except InvalidMove:
+            continue
+        steps += 1
+    return steps
+
+
+class InstrumentTest(unittest.TestCase):
+
+    def test_counts(self):
+        stats = TransitionStats()
+        rng = random.Random(0)
+        lengths = []
+        states = 0
+        for seed in range(10):
+            game = GameObject(PLAYERS, seed=seed)
+            game.enable_pooling(seed % 2 == 0)
+            game.set_instrument(stats)
+            lengths.append(play(game, rng, sloppy=True))
+            states += game.get_state_id() - 1
+        snapshot = json.loads(json.dumps(stats.snapshot()))
+        self.assertEqual(snapshot["games"], 10)
+        self.assertEqual(sum(int(length) * count for length, count in snapshot["game_length"].items()), sum(lengths))
+        self.assertEqual(snapshot["commands"], sum(lengths))
+        self.assertEqual(sum(snapshot["command_counts"].values()), sum(lengths))
+        # every state entered after the deal, pooled or not
+        self.assertEqual(sum(snapshot["states"].values()), states)
+        self.assertGreater(snapshot["invalid"], 0)
+        self.assertEqual(sum(snapshot["invalid_by_error"].values()), snapshot["invalid"])
+        self.assertIn(ErrorEnum.INVALID_TRANSITION.name, snapshot["invalid_by_error"])
+        self.assertEqual(sum(t["count"] for t in snapshot["transitions"].values()), sum(lengths))
+        seconds = [t["seconds"] for t in snapshot["transitions"].values()]
+        self.assertEqual(seconds, sorted(seconds, reverse=True))
+        self.assertIn(StateEnum.START_TURN.value + "/income", snapshot["transitions"])
+
+        merged = TransitionStats()
+        merged += stats
+        merged += stats
+        self.assertEqual(merged.snapshot()["commands"], 2 * snapshot["commands"])
+        stats.clear()
+        self.assertEqual(stats.snapshot()["commands"], 0)
+
+    def test_same_games(self):
+        # instrumented games play as the others, through every way of issuing commands
+        for seed in range(5):
+            plain, measured = GameObject(PLAYERS, seed=seed), GameObject(PLAYERS, seed=seed)
+            stats = TransitionStats()
+            measured.set_instrument(stats)
+            rng = random.Random(seed)
+            i = 0
+            while not plain.game_is_over():
+                player_id = rng.choice(plain.pending_decisions())
+                action_idx = random_policy(plain, player_id, rng)
+                emission = plain.action_space.to_emission(action_idx, plain.get_state_id())
+                plain.step_index(player_id, action_idx)
+                if i % 3 == 0:
+                    measured.command(player_id, measured.get_state_id(), emission)
+                elif i % 3 == 1:
+                    measured.step_trusted(player_id, action_idx)
+                else:
+                    measured.step_index(player_id, action_idx)
+                i += 1
+                self.assertEqual(measured.to_dict(), plain.to_dict())
+            self.assertEqual(stats.snapshot()["commands"], i)
+            # out of date commands are ignored, not counted
+            measured.step_index(0, measured.action_space.noop, measured.get_state_id() - 1)
+            self.assertEqual(stats.snapshot()["commands"], i)
+
+    def test_uninstall(self):
+        game = GameObject(PLAYERS, seed=1)
+        calls = []
+
+        class Calls(Instrument):
+            def on_state(self, state):
+                calls.append(state)
+
+        game.set_instrument(Calls())
+        game.step_index(game.get_player_turn, game.action_space.actions[next(iter(game.action_space.actions))])
+        self.assertTrue(calls)
+        self.assertIn("step_index", vars(game))
+        self.assertIsNone(game.clone()._instrument)
+        game.set_instrument(None)
+        self.assertFalse(set(vars(game)) & {"command", "step_index", "step_trusted"})
+        del calls[:]
+        play(game, random.Random(1))
+        self.assertEqual(calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from mutiny.exceptions import InvalidMove
+from mutiny.game_enum import ActionEnum
+from mutiny.game_object import GameObject
+from mutiny.machine import Machine
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+def issue(game, player_id, action_idx):
+    """ Issues a command, returning the code of the InvalidMove it raised, if any. """
+    try:
+        game.step_index(player_id, action_idx)
+    except InvalidMove as e:
+        return e.code
+    return None
+
+
+class MachineTest(unittest.TestCase):
+
+    def assertSameGame(self, machine, game):
+        self.assertEqual(machine.get_state_id(), game.get_state_id())
+        self.assertEqual(machine.get_state_name, game.get_state_name)
+        self.assertEqual(machine.pending_decisions(), game.pending_decisions())
+        self.assertEqual(machine.to_dict(), game.to_dict())
+        for p in range(len(game.players)):
+            self.assertEqual(machine.legal_actions(p), game.legal_actions(p))
+        self.assertEqual(machine.to_dict(1), game.to_dict(1))
+
+    def test_random_games(self):
+        """ Random legal and illegal commands are accepted or rejected alike (with the same errors), leading to the same games. """
+        rng = random.Random(0)
+        for seed in range(60):
+            names = PLAYERS[:rng.randint(2, len(PLAYERS))]
+            counted = seed % 3 == 2
+            game = GameObject(names, seed=seed, counted_deck=counted)
+            machine = Machine(names, seed=seed, counted_deck=counted)
+            self.assertSameGame(machine, game)
+            while not game.game_is_over():
+                p = rng.randrange(len(names))
+                if rng.random() < 0.3:
+                    action_idx = rng.randrange(game.action_space.size)
+                else:
+                    p = rng.choice(game.pending_decisions())
+                    action_idx = rng.choice([i for i, ok in enumerate(game.legal_actions(p)) if ok])
+                self.assertEqual(issue(machine, p, action_idx), issue(game, p, action_idx))
+                self.assertSameGame(machine, game)
+            self.assertTrue(machine.game_is_over())
+            self.assertEqual(machine.game_data.winner_id, game.game_data.winner_id)
+
+    def test_stale_commands(self):
+        machine = Machine(PLAYERS, seed=0)
+        space = machine.action_space
+        state_id = machine.get_state_id()
+        machine.step_index(machine.get_player_turn, space.actions[ActionEnum.INCOME])
+        # the next player must act now, but the command was issued for the previous turn
+        player_id = machine.get_player_turn
+        machine.step_index(player_id, space.noop, state_id)
+        self.assertRaises(InvalidMove, machine.step_index, player_id, space.noop, machine.get_state_id())
+        self.assertRaisesRegex(InvalidMove, "Cannot challenge", machine.step_index, player_id, space.challenge)
+
+
+if __name__ == '__main__':
+    unittest.main()
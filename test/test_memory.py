@@ -0,0 +1,60 @@
+import gc
+import random
+import sys
+import tracemalloc
+import unittest
+
+from mutiny.game_object import GameObject
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+def live_games(n_games, n_steps=10, seed=0):
+    """ n_games seeded games, each played for up to n_steps random commands. """
+    rng = random.Random(seed)
+    games = []
+    for i in range(n_games):
+        game = GameObject(PLAYERS, seed=i)
+        for _ in range(rng.randrange(n_steps + 1)):
+            if game.game_is_over():
+                break
+            p = rng.choice(game.pending_decisions())
+            mask = game.legal_actions(p)
+            game.step_index(p, rng.choice([j for j, ok in enumerate(mask) if ok]))
+        games.append(game)
+    return games
+
+
+def bytes_per_game(n_games=2000):
+    """ Memory held by a live game (with its players, state and random generator), in bytes. """
+    live_games(1)  # shared per-size data is not counted
+    gc.collect()
+    tracemalloc.start()
+    try:
+        games = live_games(n_games)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] / len(games)
+    finally:
+        tracemalloc.stop()
+
+
+class MemoryTest(unittest.TestCase):
+
+    def test_no_instance_dicts(self):
+        for game in live_games(50):
+            objects = [game.game_data, game._state_interface] + game.players + list(game.players[0].hand)
+            if game.get_queued_action is not None:
+                objects.append(game.get_queued_action)
+            for obj in objects:
+                self.assertFalse(hasattr(obj, "__dict__"), type(obj).__name__)
+
+    def test_bytes_per_game(self):
+        # mostly the random generator (about 2.5 kB); a game was over 22 kB with per-game action spaces and dicts
+        self.assertLess(bytes_per_game(500), 8000)
+
+
+if __name__ == '__main__':
+    if "--report" in sys.argv:
+        print("{:.0f} bytes per live game".format(bytes_per_game()))
+    else:
+        unittest.main()
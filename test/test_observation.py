@@ -0,0 +1,85 @@
+import random
+import unittest
+
+import numpy as np
+
+from mutiny.game_object import GameObject
+from mutiny.game_enum import ActionEnum, RoleEnum, StateEnum
+from mutiny.observation import ObservationLayout, ROLE_INDEX, STATE_INDEX, ACTION_INDEX, PLAYER_SIZE, INFLUENCE_SIZE
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+def from_dict(d, layout):
+    """ The observation expected for a GameObject.to_dict view. """
+    out = [0] * layout.size
+    for i, player in enumerate(d["players"]):
+        offset = layout.players + i * PLAYER_SIZE
+        out[offset] = player["cash"]
+        for j, inf in enumerate(player["influence"]):
+            slot = offset + 1 + j * INFLUENCE_SIZE
+            if inf["role"] != "unknown":
+                out[slot + ROLE_INDEX[RoleEnum(inf["role"])]] = 1
+            out[slot + INFLUENCE_SIZE - 1] = int(inf["revealed"])
+    if d["playerIdx"] is not None:
+        out[layout.observer + d["playerIdx"]] = 1
+    state = d["state"]
+    out[layout.player_turn + state["playerIdx"]] = 1
+    out[layout.state + STATE_INDEX[StateEnum(state["name"])]] = 1
+    if "action" in state:
+        out[layout.action + ACTION_INDEX[ActionEnum(state["action"])]] = 1
+    if "target" in state:
+        out[layout.target + state["target"]] = 1
+    if "blockingRole" in state:
+        out[layout.blocking_role + ROLE_INDEX[RoleEnum(state["blockingRole"])]] = 1
+    if "playerToReveal" in state:
+        out[layout.player_to_reveal + state["playerToReveal"]] = 1
+    for role in state.get("exchangeOptions", []):
+        out[layout.exchange_options + ROLE_INDEX[RoleEnum(role)]] += 1
+    return out
+
+
+class ObservationTest(unittest.TestCase):
+
+    def test_layout(self):
+        layout = ObservationLayout(6)
+        self.assertEqual(layout.size, 6 * PLAYER_SIZE + 4 * 6 + len(StateEnum) + len(ActionEnum) - 1 + 2 * len(RoleEnum))
+        self.assertEqual(layout.exchange_options + len(RoleEnum), layout.size)
+
+    def test_hidden_roles(self):
+        game = GameObject(PLAYERS)
+        obs = game.encode_observation(0)
+        layout = game.observation_layout
+        own = obs[layout.players + 1:layout.players + 1 + len(RoleEnum)]
+        other = obs[layout.players + PLAYER_SIZE + 1:layout.players + PLAYER_SIZE + 1 + len(RoleEnum)]
+        self.assertEqual(sum(own), 1)
+        self.assertEqual(sum(other), 0)
+
+    def test_matches_to_dict(self):
+        """ Every view of random games matches the dictionaries, with lists and NumPy buffers. """
+        rng = random.Random(0)
+        seen = set()
+        for _ in range(10):
+            game = GameObject(PLAYERS)
+            layout = game.observation_layout
+            buffer = np.full(layout.size, 9, dtype=np.int16)
+            batch = np.full((len(PLAYERS), layout.size), 9, dtype=np.float32)
+            while not game.game_is_over():
+                seen.add(game.get_state_name)
+                for p in [None] + list(range(len(PLAYERS))):
+                    expected = from_dict(game.to_dict(p), layout)
+                    self.assertEqual(game.encode_observation(p), expected)
+                    self.assertIs(game.encode_observation(p, out=buffer), buffer)
+                    self.assertEqual(buffer.tolist(), expected)
+                game.encode_observations(batch)
+                for p in range(len(PLAYERS)):
+                    self.assertEqual(batch[p].tolist(), from_dict(game.to_dict(p), layout))
+
+                masks = game.legal_actions_all()
+                p = rng.choice([p for p in range(len(PLAYERS)) if any(masks[p][1:])])
+                game.step_index(p, rng.choice([i for i, ok in enumerate(masks[p]) if ok and i > 0]))
+        self.assertEqual(seen, set(StateEnum))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+from collections import Counter
+
+from mutiny.game_enum import ActionEnum, CommandEnum
+from mutiny.game_object import GameObject
+from mutiny.policy import RandomPolicy, random_policy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class RandomPolicyTest(unittest.TestCase):
+
+    def test_plays_legal_games(self):
+        rng = random.Random(0)
+        for seed in range(20):
+            game = GameObject(PLAYERS, seed=seed)
+            while not game.game_is_over():
+                state_id = game.get_state_id()
+                commands = random_policy.sample_pending(game, rng)
+                self.assertEqual(list(commands), game.pending_decisions())
+                for player_id, action_idx in commands.items():
+                    self.assertTrue(game.legal_actions(player_id)[action_idx])
+                # commands issued after one that changed the state are ignored
+                for player_id, action_idx in commands.items():
+                    game.step_index(player_id, action_idx, state_id)
+
+    def test_uniform(self):
+        game = GameObject(PLAYERS, seed=0)
+        mask = game.legal_actions(game.get_player_turn)
+        legal = [i for i, ok in enumerate(mask) if ok]
+        rng = random.Random(1)
+        counts = Counter(random_policy(game, game.get_player_turn, rng) for _ in range(len(legal) * 500))
+        self.assertEqual(sorted(counts), legal)
+        self.assertTrue(all(350 < count < 650 for count in counts.values()), counts)
+        # a single legal command is returned without drawing
+        other = (game.get_player_turn + 1) % len(PLAYERS)
+        state = rng.getstate()
+        self.assertEqual(random_policy(game, other, rng), game.action_space.noop)
+        self.assertEqual(rng.getstate(), state)
+
+    def test_weights(self):
+        game = GameObject(PLAYERS, seed=0)
+        space = game.action_space
+        policy = RandomPolicy({ActionEnum.INCOME: 3, ActionEnum.TAX: 1, CommandEnum.ACTION: 5})
+        mask = [False] * space.size
+        mask[space.actions[ActionEnum.INCOME]] = mask[space.actions[ActionEnum.TAX]] = True
+        rng = random.Random(2)
+        counts = Counter(policy.sample(mask, rng, space) for _ in range(4000))
+        self.assertTrue(2800 < counts[space.actions[ActionEnum.INCOME]] < 3200, counts)
+        # commands left out keep a weight of 1, and zero weights fall back to uniform
+        policy = RandomPolicy({CommandEnum.CHALLENGE: 0, CommandEnum.ALLOW: 0})
+        mask = [False] * space.size
+        mask[space.challenge] = mask[space.allow] = True
+        self.assertEqual(len({policy.sample(mask, rng, space) for _ in range(100)}), 2)
+        mask[space.blocks[next(iter(space.blocks))]] = True
+        self.assertNotIn(space.challenge, {policy.sample(mask, rng, space) for _ in range(100)})
+
+    @unittest.skipIf(np is None, "requires NumPy")
+    def test_numpy_generator(self):
+        game = GameObject(PLAYERS, seed=3)
+        action_idx = random_policy(game, game.get_player_turn, np.random.default_rng(0))
+        self.assertTrue(game.legal_actions(game.get_player_turn)[action_idx])
+
+
+if __name__ == '__main__':
+    unittest.main()
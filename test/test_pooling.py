@@ -0,0 +1,78 @@
+import random
+import unittest
+
+from mutiny.exceptions import InvalidMove
+from mutiny.game_enum import ActionEnum
+from mutiny.game_object import GameObject
+
+from helpers import random_step
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class PoolingTest(unittest.TestCase):
+
+    def test_same_games(self):
+        """ Pooled games go through the same states, with the same ids, as plain ones. """
+        rng = random.Random(0)
+        for seed in range(20):
+            plain = GameObject(PLAYERS, seed=seed)
+            pooled = GameObject(PLAYERS, seed=seed)
+            pooled.enable_pooling()
+            while not plain.game_is_over():
+                p, action_idx = random_step(rng, plain)
+                pooled.step_index(p, action_idx)
+                self.assertEqual(pooled.to_dict(), plain.to_dict())
+                self.assertEqual(pooled.get_state_id(), plain.get_state_id())
+                self.assertEqual(pooled.get_queued_action is None, plain.get_queued_action is None)
+            self.assertEqual(pooled.game_data.winner_id, plain.game_data.winner_id)
+
+    def test_turns_reuse_objects(self):
+        game = GameObject(PLAYERS, seed=1)
+        game.enable_pooling()
+        space = game.action_space
+        game.step_index(game.get_player_turn, space.actions[ActionEnum.INCOME])
+        turn = game._state_interface
+        state_id = game.get_state_id()
+        game.step_index(game.get_player_turn, space.actions[ActionEnum.INCOME])
+        self.assertIs(game._state_interface, turn)
+        self.assertEqual(game.get_state_id(), state_id + 1)
+
+        player = game.get_player_turn
+        target = (player + 1) % len(PLAYERS)
+        game.step_index(player, space.action_index(ActionEnum.STEAL, target))
+        steal = game.get_queued_action
+        self.assertEqual(steal.target, target)
+        for p in game.pending_decisions():
+            game.step_index(p, space.allow)
+        self.assertIs(game._state_interface, turn)
+        # the pooled action is validated again: the target may not steal from itself
+        self.assertEqual(game.get_player_turn, target)
+        self.assertRaises(InvalidMove, game.step_index, target, space.action_index(ActionEnum.STEAL, target))
+        for _ in range(len(PLAYERS) - 1):
+            game.step_index(game.get_player_turn, space.actions[ActionEnum.INCOME])
+        self.assertEqual(game.get_player_turn, player)
+        game.step_index(player, space.action_index(ActionEnum.STEAL, target))
+        self.assertIs(game.get_queued_action, steal)
+
+    def test_journal_and_clone(self):
+        rng = random.Random(2)
+        game = GameObject(PLAYERS, seed=2)
+        game.enable_pooling()
+        game.enable_journal()
+        history = []
+        for _ in range(60):
+            if game.game_is_over():
+                break
+            history.append(game.snapshot())
+            random_step(rng, game)
+        clone = game.clone()
+        self.assertIsNotNone(clone.game_data.pool)
+        self.assertEqual(clone.snapshot(), game.snapshot())
+        while history:
+            game.undo()
+            self.assertEqual(game.snapshot(), history.pop())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from mutiny.exceptions import InvalidMove
+from mutiny.game_object import GameObject
+from mutiny.record import TrajectoryReader, TrajectoryWriter, MAGIC
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+def play(game, rng):
+    """ Plays random commands until the game ends, returning the full view after every applied command. """
+    views = []
+    space = game.action_space
+    while not game.game_is_over():
+        state_id = game.get_state_id()
+        p = rng.randrange(len(game.players))
+        i = rng.randrange(space.size)
+        try:
+            if rng.random() < 0.5:
+                game.step_index(p, i)
+            else:
+                game.command(p, state_id, space.to_emission(i, state_id))
+        except InvalidMove:
+            continue
+        views.append(game.to_dict())
+    return views
+
+
+class RecordTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+        out = io.BytesIO()
+        expected = []
+        with TrajectoryWriter(out) as writer:
+            for seed in (None, 0, 2 ** 256 - 1, 12345):
+                names = PLAYERS[:rng.randint(2, len(PLAYERS))]
+                game = writer.start_game(names, seed=seed)
+                expected.append((names, play(game, rng)))
+
+        out.seek(0)
+        trajectories = list(TrajectoryReader(out))
+        self.assertEqual(len(trajectories), len(expected))
+        for trajectory, (names, views) in zip(trajectories, expected):
+            self.assertEqual(trajectory.player_names, tuple(names))
+            self.assertEqual(len(trajectory.steps), len(views))
+            self.assertEqual(trajectory.replay().to_dict(), views[-1])
+            n = len(views) // 2
+            self.assertEqual(trajectory.replay(n).to_dict(), views[n - 1])
+        self.assertEqual(trajectories[2].seed, 2 ** 256 - 1)
+        self.assertEqual(len(out.getvalue()), len(MAGIC) + sum(
+            1 + 1 + len(names) * 2 + 32 + 8 * len(views) for names, views in expected))
+
+    def test_file(self):
+        rng = random.Random(1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.bin")
+            with TrajectoryWriter(path, buffer_size=64) as writer:
+                first = writer.start_game(PLAYERS, seed=1)
+                play(first, rng)
+                second = writer.start_game(PLAYERS, seed=2)
+                self.assertIsNone(first.recorder)
+            with TrajectoryReader(path) as reader:
+                trajectories = list(reader)
+        self.assertEqual([t.seed for t in trajectories], [1, 2])
+        self.assertEqual(trajectories[1].steps, [])
+        self.assertEqual(trajectories[1].replay().to_dict(), second.to_dict())
+
+    def test_rewind_stops_recording(self):
+        for rewind in ("reset", "restore", "undo"):
+            out = io.BytesIO()
+            with TrajectoryWriter(out) as writer:
+                game = writer.start_game(PLAYERS, seed=3)
+                game.enable_journal()
+                snapshot = game.snapshot()
+                play(game, random.Random(3))
+                views = game.to_dict()
+                if rewind == "reset":
+                    game.reset()
+                elif rewind == "restore":
+                    game.restore(snapshot)
+                else:
+                    game.undo()
+                self.assertIsNone(game.recorder)
+                play(game, random.Random(4))
+            trajectory, = TrajectoryReader(io.BytesIO(out.getvalue()))
+            self.assertEqual(trajectory.replay().to_dict(), views)
+
+    def test_unsorted_exchange(self):
+        """ Kept roles sent through command in any order replay to the same hands. """
+        rng = random.Random(5)
+        out = io.BytesIO()
+        finals, exchanges = [], 0
+        with TrajectoryWriter(out) as writer:
+            for seed in range(40):
+                game = writer.start_game(PLAYERS[:4], seed=seed)
+                while not game.game_is_over():
+                    p = rng.choice(game.pending_decisions())
+                    mask = game.legal_actions(p)
+                    state_id = game.get_state_id()
+                    emission = game.action_space.to_emission(rng.choice([i for i, ok in enumerate(mask) if ok]), state_id)
+                    if len(set(emission.get("roles", ()))) > 1:
+                        emission["roles"].reverse()
+                        exchanges += 1
+                    game.command(p, state_id, emission)
+                finals.append(game.to_dict())
+        self.assertGreater(exchanges, 0)
+        self.assertEqual([t.replay().to_dict() for t in TrajectoryReader(io.BytesIO(out.getvalue()))], finals)
+
+    def test_refused_while_recording(self):
+        """ Bad commands are refused with InvalidMove whether the game is recorded or not. """
+        bad = [{"command": "block", "blockingRole": "unknown"},
+               {"command": "exchange", "roles": ["duke", "unknown"]},
+               {"command": "exchange", "roles": ["duke", "duke", "duke"]},
+               {"command": "reveal", "role": "unknown"}]
+        out = io.BytesIO()
+        with TrajectoryWriter(out) as writer:
+            recorded = writer.start_game(PLAYERS, seed=6)
+            plain = GameObject(PLAYERS, seed=6)
+            for game in (recorded, plain):
+                turn = game.get_player_turn
+                game.command(turn, game.get_state_id(), {"command": "play-action", "action": "tax"})
+                other, state_id = (turn + 1) % len(PLAYERS), game.get_state_id()
+                for emission in bad:
+                    self.assertRaises(InvalidMove, game.command, other, state_id, emission)
+                # fields the command does not use are ignored
+                game.command(other, state_id, {"command": "allow", "role": "duke", "roles": "ignored"})
+        trajectory, = TrajectoryReader(io.BytesIO(out.getvalue()))
+        self.assertEqual(len(trajectory.steps), 2)
+        self.assertEqual(trajectory.replay().to_dict(), plain.to_dict())
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, TrajectoryReader, io.BytesIO(b"not a log"))
+        self.assertRaises(ValueError, list, TrajectoryReader(io.BytesIO(MAGIC + b"S\x00")))
+        self.assertRaises(ValueError, TrajectoryWriter(io.BytesIO()).start_game, PLAYERS, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from mutiny.game_object import GameObject
+from mutiny.rng import spawn, stream_seed
+
+from helpers import play
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class RngTest(unittest.TestCase):
+
+    def test_seeded_games_repeat(self):
+        for seed in range(5):
+            self.assertEqual(play(GameObject(PLAYERS, seed=seed), random.Random(0)),
+                             play(GameObject(PLAYERS, seed=seed), random.Random(0)))
+
+    def test_global_random_unused(self):
+        random.seed(0)
+        game = GameObject(PLAYERS, seed=1)
+        state = random.getstate()
+        play(game, random.Random(0))
+        self.assertEqual(random.getstate(), state)
+
+    def test_streams(self):
+        self.assertEqual(stream_seed(7, 3), stream_seed(7, 3))
+        seeds = {stream_seed(root, stream) for root in range(10) for stream in range(10)}
+        self.assertEqual(len(seeds), 100)
+        a, b = spawn(7, 2)
+        self.assertEqual(spawn(7, 1, start=1)[0].random(), b.random())
+        self.assertNotEqual(a.random(), spawn(8, 1)[0].random())
+
+    def test_snapshot_replays_shuffles(self):
+        game = GameObject(PLAYERS, seed=spawn(3, 1)[0])
+        snapshot = game.snapshot()
+        expected = play(game, random.Random(1))
+        game.restore(snapshot)
+        self.assertEqual(play(game, random.Random(1)), expected)
+        game = GameObject(PLAYERS)
+        clone = game.clone()
+        self.assertEqual(play(clone, random.Random(2)), play(game, random.Random(2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
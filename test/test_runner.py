@@ -0,0 +1,52 @@
+import contextlib
+import io
+import json
+import unittest
+
+from mutiny.policy import random_policy
+from mutiny.runner import Stats, iter_run, main, play_games, run
+
+
+def sloppy_policy(game, player_id, rng):
+    """ Half of the time any command, often illegal, and a legal one otherwise. """
+    if rng.random() < 0.5:
+        return rng.randrange(game.action_space.size)
+    return random_policy(game, player_id, rng)
+
+
+class RunnerTest(unittest.TestCase):
+
+    def test_same_games_with_any_number_of_workers(self):
+        totals = list(iter_run(30, 4, workers=1, seed=7, chunk_size=10))
+        self.assertEqual([t.games for t in totals], [30, 30, 30])
+        parallel = Stats(4)
+        for parallel in iter_run(30, 4, workers=3, seed=7, chunk_size=10):
+            pass
+        self.assertEqual(parallel, totals[-1])
+        self.assertEqual(sum(parallel.wins), 30)
+        self.assertEqual(sum(parallel.commands.values()), parallel.steps)
+        self.assertEqual(parallel.invalid, 0)
+        self.assertEqual(play_games(0, 30, 4, [random_policy] * 4, 7, trusted=True), parallel)
+
+    def test_invalid_moves_are_counted(self):
+        stats = play_games(0, 20, 3, [sloppy_policy, random_policy, random_policy], 1)
+        self.assertEqual(stats.games, 20)
+        self.assertGreater(stats.invalid, 0)
+        summary = stats.summary()
+        self.assertEqual(summary["invalid_moves"], stats.invalid)
+        self.assertAlmostEqual(sum(summary["command_frequency"].values()), 1)
+        self.assertRaises(ValueError, run, 1, 3, [random_policy])
+
+    def test_cli(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            summary = main(["--games", "12", "--players", "3", "--workers", "1", "--seed", "3", "--json",
+                            "--policy", "test_runner:sloppy_policy", "--policy", "mutiny.runner:random_policy",
+                            "--policy", "mutiny.runner:random_policy"])
+        self.assertEqual(json.loads(out.getvalue()), summary)
+        self.assertEqual(summary["games"], 12)
+        self.assertEqual(summary["seed"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import copy
+import pickle
+import random
+import timeit
+import unittest
+
+from mutiny.game_object import GameObject
+from mutiny.game_enum import ActionEnum, StateEnum
+from mutiny.exceptions import InvalidMove
+from mutiny.constants import CASH_START
+
+from helpers import play, random_step
+
+PLAYERS = ["A", "B", "C", "D", "E", "F"]
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def test_restore_replays(self):
+        """ Restoring in every state and replaying gives the same game as the original. """
+        rng = random.Random(1)
+        seen = set()
+        for _ in range(10):
+            game = GameObject(PLAYERS)
+            while not game.game_is_over():
+                seen.add(game.get_state_name)
+                snapshot = game.snapshot()
+                before = game.to_dict()
+                seed = rng.random()
+                expected = play(game, random.Random(seed), 5)
+                game.restore(snapshot)
+                self.assertEqual(game.to_dict(), before)
+                self.assertEqual(game.snapshot(), snapshot)
+                self.assertEqual(play(game, random.Random(seed), 5), expected)
+                game.restore(snapshot)
+                random_step(rng, game)
+        self.assertEqual(seen, set(StateEnum))
+
+    def test_clone_independent(self):
+        game = GameObject(PLAYERS)
+        play(game, random.Random(0), 20)
+        clone = game.clone()
+        self.assertEqual(clone.to_dict(), game.to_dict())
+        self.assertEqual(clone.legal_actions_all(), game.legal_actions_all())
+        snapshot = game.snapshot()
+        play(clone, random.Random(1), 20)
+        self.assertEqual(game.snapshot(), snapshot)
+
+    def test_pickle(self):
+        game = GameObject(PLAYERS)
+        play(game, random.Random(2), 30)
+        snapshot = game.snapshot()
+        self.assertEqual(pickle.loads(pickle.dumps(snapshot)), snapshot)
+
+    def test_clone_faster_than_deepcopy(self):
+        game = GameObject(PLAYERS)
+        play(game, random.Random(3), 10)
+        clone = timeit.timeit(game.clone, number=200)
+        deepcopy = timeit.timeit(lambda: copy.deepcopy(game), number=200)
+        self.assertLess(clone, deepcopy)
+
+
+class UndoTest(unittest.TestCase):
+
+    def test_undo_walk(self):
+        """ Walks random games forward and back, checking every undo against a snapshot. """
+        rng = random.Random(4)
+        seen = set()
+        for i in range(10):
+            game = GameObject(PLAYERS, counted_deck=i % 2 == 1)
+            game.enable_journal()
+            history = []
+            while not game.game_is_over():
+                seen.add(game.get_state_name)
+                history.append((game.snapshot(), game.to_dict()))
+                random_step(rng, game)
+                if rng.random() < 0.2:
+                    for _ in range(min(rng.randint(1, 3), len(history))):
+                        game.undo()
+                        snapshot, view = history.pop()
+                        self.assertEqual(game.snapshot(), snapshot)
+                        self.assertEqual(game.to_dict(), view)
+            while history:
+                game.undo()
+                self.assertEqual(game.snapshot(), history.pop()[0])
+            self.assertRaises(RuntimeError, game.undo)
+        self.assertEqual(seen, set(StateEnum))
+
+    def test_invalid_command_not_journaled(self):
+        game = GameObject(PLAYERS)
+        game.enable_journal()
+        turn = game.get_player_turn
+        space = game.action_space
+        game.step_index(turn, space.actions[ActionEnum.INCOME])
+        snapshot = game.snapshot()
+        self.assertRaises(InvalidMove, game.step_index, game.get_player_turn, space.challenge)
+        self.assertEqual(game.snapshot(), snapshot)
+        game.undo()
+        self.assertEqual(game.get_player_turn, turn)
+        self.assertEqual(game.players[turn].cash, CASH_START)
+
+    def test_reset_clears_journal(self):
+        game = GameObject(PLAYERS)
+        game.enable_journal()
+        play(game, random.Random(6), 10)
+        game.reset()
+        self.assertRaises(RuntimeError, game.undo)
+        snapshot = game.snapshot()
+        play(game, random.Random(6), 1)
+        game.undo()
+        self.assertEqual(game.snapshot(), snapshot)
+
+    def test_disabled(self):
+        game = GameObject(PLAYERS)
+        self.assertRaises(RuntimeError, game.undo)
+        game.enable_journal()
+        play(game, random.Random(5), 10)
+        game.enable_journal(False)
+        self.assertIsNone(game.game_data.journal)
+        self.assertRaises(RuntimeError, game.undo)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,6 +28,20 @@ class SpeedTest(unittest.TestCase):
                     raise RuntimeError("Something has gone horribly wrong! Steps exceeded 10^5")
                     return
 
+    def test_go_fast_pending(self):
+        """ Same games, but only the players returned by pending_decisions are sent a command. """
+        players = ["A", "B", "C", "D", "E", "F"]
+        for i in range(1000):
+            game = GameObject(players)
+            steps = 0
+            while not game.game_is_over():
+                steps += 1
+                states = get_states(game)
+                for p in game.pending_decisions():
+                    game.command(p, states[p].stateId, random_action(states[p]))
+                if steps > 10**5:
+                    raise RuntimeError("Something has gone horribly wrong! Steps exceeded 10^5")
+
 
 if __name__ == '__main__':
     unittest.main()
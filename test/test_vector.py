@@ -0,0 +1,269 @@
+import random
+import unittest
+
+import numpy as np
+
+from mutiny.game_object import GameObject
+from mutiny.game_enum import CommandEnum, ActionEnum, RoleEnum, StateEnum
+from mutiny.exceptions import InvalidMove
+from mutiny.vector import VectorGame, STATE_CODE, ACTION_CODE, ROLE_CODE, COMMAND_CODE, N_ROLES, ROLE_COPIES
+
+ROLES = list(RoleEnum)
+ACTIONS = [a for a in ActionEnum if a != ActionEnum.NOP]
+TARGETED = {ActionEnum.ASSASSINATE, ActionEnum.STEAL, ActionEnum.COUP}
+
+
+def load(vec, i, game):
+    """ Copies the state of a GameObject into row i of a VectorGame. """
+    data = game.game_data
+    state = game._state_interface
+    vec.cash[i] = [p.cash for p in data.players]
+    vec.roles[i] = [[ROLE_CODE[inf.role] for inf in p.hand] for p in data.players]
+    vec.revealed[i] = [[inf.revealed for inf in p.hand] for p in data.players]
+    vec.deck[i] = [data.deck.count(role) for role in RoleEnum]
+    vec.state[i] = STATE_CODE[state.state_name]
+    vec.state_id[i] = data.state_id
+    vec.player_turn[i] = data.player_turn
+    vec.winner[i] = -1 if data.winner_id is None else data.winner_id
+    vec._clear_action(np.array([i]))
+    action = getattr(state, "_action", None)
+    if state.state_name == StateEnum.EXCHANGE:
+        vec.action[i] = ACTION_CODE[ActionEnum.EXCHANGE]
+        vec.exchange_options[i, :len(state.exchange_options)] = [ROLE_CODE[r] for r in state.exchange_options]
+    elif action is not None:
+        vec.action[i] = ACTION_CODE[action.action_name]
+        vec.target[i] = -1 if action.target is None else action.target
+    if hasattr(state, "_allow"):
+        vec.allow[i] = [bool(state._allow & (1 << p)) for p in range(len(data.players))]
+    if state.state_name == StateEnum.WAIT_FOR_BLOCK_RESPONSE:
+        vec.blocker[i] = state._blocker_id
+        vec.block_role[i] = ROLE_CODE[state._block_role]
+    if state.state_name == StateEnum.REVEAL:
+        vec.reveal_id[i] = state._reveal_id
+        vec.block_next[i] = state._block_next
+
+
+def random_command(rng, game, seat):
+    """ A random command, biased towards the ones that make sense in the current state. """
+    n_players = len(game.players)
+    state = game.get_state_name
+    if rng.random() < 0.5:
+        command = rng.choice(list(CommandEnum))
+    elif state == StateEnum.START_TURN and seat == game.get_player_turn:
+        command = CommandEnum.ACTION
+    elif state == StateEnum.REVEAL and seat == game.get_player_to_reveal:
+        return {"command": CommandEnum.REVEAL.value, "role": rng.choice(game.players[seat].hand).role.value}
+    elif state == StateEnum.EXCHANGE and seat == game.get_player_turn:
+        keep = game.get_exchanges[:game.players[seat].influence_count]
+        return {"command": CommandEnum.EXCHANGE.value, "roles": [r.value for r in keep]}
+    else:
+        command = rng.choice([CommandEnum.NOOP, CommandEnum.ALLOW, CommandEnum.ALLOW,
+                              CommandEnum.CHALLENGE, CommandEnum.BLOCK])
+    emission = {"command": command.value}
+    if command == CommandEnum.ACTION:
+        action = rng.choice(ACTIONS)
+        emission["action"] = action.value
+        if action in TARGETED:
+            emission["target"] = rng.randrange(n_players)
+    if command in (CommandEnum.BLOCK, CommandEnum.REVEAL):
+        emission["blockingRole" if command == CommandEnum.BLOCK else "role"] = rng.choice(ROLES).value
+    if command == CommandEnum.EXCHANGE:
+        emission["roles"] = [rng.choice(ROLES).value for _ in range(rng.choice([1, 2]))]
+    return emission
+
+
+def encode(emission):
+    keep = [ROLE_CODE[RoleEnum(r)] for r in emission.get("roles", [])]
+    role = emission.get("blockingRole", emission.get("role"))
+    return (COMMAND_CODE[CommandEnum(emission["command"])],
+            ACTION_CODE[ActionEnum(emission["action"])] if "action" in emission else -1,
+            emission.get("target", -1),
+            -1 if role is None else ROLE_CODE[RoleEnum(role)],
+            keep + [-1] * (2 - len(keep)))
+
+
+class VectorGameTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vec = VectorGame(8, 6, seed=0)
+        self.vec.player_turn[:] = 0
+
+    def command(self, player_id, command, **kwargs):
+        """ Issues the same command from player_id in every game. """
+        n, p = self.vec.n_games, self.vec.n_players
+        commands = np.full((n, p), COMMAND_CODE[CommandEnum.NOOP])
+        commands[:, player_id] = COMMAND_CODE[command]
+        args = {k: np.full((n, p), v) for k, v in kwargs.items()}
+        return self.vec.step(commands, **args)
+
+    def allow_all(self):
+        return self.vec.step(np.where(self.vec.allow, COMMAND_CODE[CommandEnum.NOOP], COMMAND_CODE[CommandEnum.ALLOW]))
+
+    def test_reset(self):
+        self.assertTrue((self.vec.state == STATE_CODE[StateEnum.START_TURN]).all())
+        self.assertTrue((self.vec.state_id == 1).all())
+        self.assertTrue((self.vec.cash == 2).all())
+        counts = self.vec.deck + (self.vec.roles.reshape(8, -1)[:, :, None] == np.arange(N_ROLES)).sum(1)
+        self.assertTrue((counts == ROLE_COPIES).all())
+
+    def test_income(self):
+        invalid = self.command(0, CommandEnum.ACTION, action=ACTION_CODE[ActionEnum.INCOME])
+        self.assertFalse(invalid.any())
+        self.assertTrue((self.vec.cash[:, 0] == 3).all())
+        self.assertTrue((self.vec.player_turn == 1).all())
+        self.assertTrue((self.vec.state_id == 2).all())
+
+    def test_step_index(self):
+        space = self.vec.action_space
+        index = np.full((8, 6), space.noop)
+        index[:, 0] = space.action_index(ActionEnum.STEAL, 2)
+        self.assertFalse(self.vec.step_index(index).any())
+        self.assertTrue((self.vec.target == 2).all())
+        index[:, 0] = space.noop
+        index[:, 1] = space.allow
+        index[:, 2] = space.blocks[RoleEnum.CAPTAIN]
+        self.assertFalse(self.vec.step_index(index).any())
+        self.assertTrue((self.vec.block_role == ROLE_CODE[RoleEnum.CAPTAIN]).all())
+
+    def test_wrong_turn(self):
+        invalid = self.command(1, CommandEnum.ACTION, action=ACTION_CODE[ActionEnum.INCOME])
+        self.assertTrue(invalid[:, 1].all())
+        self.assertTrue((self.vec.state_id == 1).all())
+
+    def test_foreign_aid_allow(self):
+        self.command(0, CommandEnum.ACTION, action=ACTION_CODE[ActionEnum.F_AID])
+        self.assertTrue((self.vec.state == STATE_CODE[StateEnum.WAIT_FOR_ACTION_RESPONSE]).all())
+        self.assertFalse(self.allow_all().any())
+        self.assertTrue((self.vec.cash[:, 0] == 4).all())
+        self.assertTrue((self.vec.state == STATE_CODE[StateEnum.START_TURN]).all())
+
+    def test_foreign_aid_block(self):
+        self.command(0, CommandEnum.ACTION, action=ACTION_CODE[ActionEnum.F_AID])
+        self.command(3, CommandEnum.BLOCK, role=ROLE_CODE[RoleEnum.DUKE])
+        self.assertTrue((self.vec.state == STATE_CODE[StateEnum.WAIT_FOR_BLOCK_RESPONSE]).all())
+        self.assertTrue((self.vec.blocker == 3).all())
+        self.allow_all()
+        self.assertTrue((self.vec.cash[:, 0] == 2).all())
+        self.assertTrue((self.vec.player_turn == 1).all())
+
+    def test_challenge_tax_without_duke(self):
+        self.vec.roles[:, 0] = ROLE_CODE[RoleEnum.CONTESSA]
+        self.command(0, CommandEnum.ACTION, action=ACTION_CODE[ActionEnum.TAX])
+        self.command(2, CommandEnum.CHALLENGE)
+        self.assertTrue((self.vec.state == STATE_CODE[StateEnum.REVEAL]).all())
+        self.assertTrue((self.vec.reveal_id == 0).all())
+        self.command(0, CommandEnum.REVEAL, role=ROLE_CODE[RoleEnum.CONTESSA])
+        self.assertTrue(self.vec.revealed[:, 0, 0].all())
+        self.assertTrue((self.vec.cash[:, 0] == 2).all())
+        self.assertTrue((self.vec.player_turn == 1).all())
+
+    def test_coup_last_influence(self):
+        self.vec.cash[:, 0] = 7
+        self.vec.revealed[:, 1, 1] = True
+        invalid = self.command(0, CommandEnum.ACTION, action=ACTION_CODE[ActionEnum.COUP], target=1)
+        self.assertFalse(invalid.any())
+        self.assertFalse(self.vec.alive[:, 1].any())
+        self.assertTrue((self.vec.cash[:, 0] == 0).all())
+        self.assertTrue((self.vec.player_turn == 2).all())
+
+    def test_matches_game_object(self):
+        """ Plays random commands on GameObjects and on a VectorGame and compares them after every step. """
+        rng = random.Random(0)
+        n, p = 16, 6
+        games = [GameObject(["A", "B", "C", "D", "E", "F"]) for _ in range(n)]
+        vec = VectorGame(n, p, seed=0)
+        for i, game in enumerate(games):
+            load(vec, i, game)
+
+        for _ in range(300):
+            columns = np.zeros((5, n, p), int)
+            keep = np.full((n, p, 2), -1)
+            expected = np.zeros((n, p), bool)
+            redraw = np.zeros(n, bool)
+            for i, game in enumerate(games):
+                deck = list(game.game_data.deck)
+                state_id = game.get_state_id()
+                for seat in range(p):
+                    emission = random_command(rng, game, seat)
+                    code, action, target, role, kept = encode(emission)
+                    columns[:, i, seat] = (code, action, target, role, 0)
+                    keep[i, seat] = kept
+                    if game.game_is_over():
+                        continue
+                    try:
+                        game.command(seat, state_id, emission)
+                    except InvalidMove:
+                        expected[i, seat] = True
+                    if code == COMMAND_CODE[CommandEnum.CHALLENGE] and game.get_state_id() != state_id:
+                        redraw[i] = True
+                # cards drawn from the deck are random, so they are copied over instead of compared
+                redraw[i] |= deck != game.game_data.deck
+
+            invalid = vec.step(columns[0], action=columns[1], target=columns[2], role=columns[3], keep=keep)
+            np.testing.assert_array_equal(invalid, expected)
+
+            for i, game in enumerate(games):
+                other = VectorGame(1, p)
+                load(other, 0, game)
+                for field in ("cash", "revealed", "state", "state_id", "player_turn", "winner",
+                              "action", "target", "blocker", "block_role", "reveal_id", "allow"):
+                    np.testing.assert_array_equal(getattr(vec, field)[i], getattr(other, field)[0], field)
+                if redraw[i]:
+                    load(vec, i, game)
+                else:
+                    for field in ("roles", "deck", "exchange_options"):
+                        np.testing.assert_array_equal(getattr(vec, field)[i], getattr(other, field)[0], field)
+
+        self.assertGreater(vec.done.sum(), n // 2)
+
+    def test_random_games_finish(self):
+        self.random_games(256, 6)
+
+    def test_large_table(self):
+        vec = self.random_games(64, 12)
+        self.assertGreater(vec.role_copies, ROLE_COPIES)
+
+    def random_games(self, n, p):
+        vec = VectorGame(n, p, seed=1)
+        rng = np.random.default_rng(1)
+        rows = np.arange(n)
+        for _ in range(2000):
+            if vec.done.all():
+                break
+            # mostly sensible commands: the active player acts, the others respond, the revealer reveals
+            command = np.full((n, p), COMMAND_CODE[CommandEnum.NOOP])
+            command[~vec.allow] = rng.choice([COMMAND_CODE[c] for c in (CommandEnum.ALLOW, CommandEnum.ALLOW,
+                                                                      CommandEnum.CHALLENGE, CommandEnum.BLOCK)],
+                                             size=(~vec.allow).sum())
+            turn = vec.state == STATE_CODE[StateEnum.START_TURN]
+            command[rows[turn], vec.player_turn[turn]] = COMMAND_CODE[CommandEnum.ACTION]
+            reveal = vec.state == STATE_CODE[StateEnum.REVEAL]
+            command[rows[reveal], vec.reveal_id[reveal]] = COMMAND_CODE[CommandEnum.REVEAL]
+            exchange = vec.state == STATE_CODE[StateEnum.EXCHANGE]
+            command[rows[exchange], vec.player_turn[exchange]] = COMMAND_CODE[CommandEnum.EXCHANGE]
+            influence = 2 - vec.revealed[rows, vec.player_turn].sum(1)
+            keep = np.where(np.arange(2) < influence[:, None], vec.exchange_options[:, :2], -1)[:, None].repeat(p, 1)
+            role = vec.roles[rows[:, None], np.arange(p), rng.integers(2, size=(n, p))]
+            invalid = vec.step(command,
+                               action=rng.integers(len(ActionEnum) - 1, size=(n, p)),
+                               target=rng.integers(p, size=(n, p)),
+                               role=np.where(command == COMMAND_CODE[CommandEnum.BLOCK],
+                                             rng.integers(N_ROLES, size=(n, p)), role),
+                               keep=keep)
+            self.assertFalse(invalid[command == COMMAND_CODE[CommandEnum.NOOP]].any())
+
+            in_hand = (vec.roles.reshape(n, -1)[:, :, None] == np.arange(N_ROLES)).sum(1)
+            offered = (vec.exchange_options[:, :, None] == np.arange(N_ROLES)).sum(1)
+            hand = vec.roles[rows, vec.player_turn][:, :, None] == np.arange(N_ROLES)
+            hand &= ~vec.revealed[rows, vec.player_turn][:, :, None]
+            offered -= np.where(vec.state[:, None] == STATE_CODE[StateEnum.EXCHANGE], hand.sum(1), 0)
+            np.testing.assert_array_equal(vec.deck + in_hand + offered, vec.role_copies)
+            self.assertTrue((vec.cash >= 0).all())
+        self.assertTrue(vec.done.all())
+        self.assertTrue((vec.alive.sum(1) == 1).all())
+        np.testing.assert_array_equal(vec.alive.argmax(1), vec.winner)
+        return vec
+
+
+if __name__ == '__main__':
+    unittest.main()